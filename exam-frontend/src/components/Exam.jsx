@@ -3,9 +3,10 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { examService, userService, compileAndRunCode } from '../services/api';
 import HamburgerMenu from './HamburgerMenu';
 import Editor from '@monaco-editor/react';
-import { shuffle } from "../utils/shuffle"; // Import a utility function for shuffling arrays
 
 
+const CODE_AUTOSAVE_DELAY_MS = 1500;
+
 const Exam = () => {
   const { examId } = useParams();
   const navigate = useNavigate();
@@ -19,7 +20,6 @@ const Exam = () => {
   const [isSubmitted, setIsSubmitted] = useState(false); // Added state to track submission
   const [timerId, setTimerId] = useState(null); // Track the timer ID
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0); // Track the current question index
-  const [selectedLanguage, setSelectedLanguage] = useState('python'); // Default to Python
   const [testInput, setTestInput] = useState(''); // State to manage test input
   const [markedForReview, setMarkedForReview] = useState([]); // Track questions marked for review
   const [isNavOpen, setIsNavOpen] = useState(false); // State to track navigation menu visibility
@@ -28,6 +28,10 @@ const Exam = () => {
   const [executionError, setExecutionError] = useState(null); // State to store execution error
 
   const isAutoSubmitTriggered = useRef(false); // Ref to track auto-submit state
+  // Changes not yet confirmed by the draft endpoint, and whether a draft exists
+  const unsavedAnswers = useRef({});
+  const hasDraft = useRef(false);
+  const codeSaveTimers = useRef({});
 
   const toggleNav = () => {
     setIsNavOpen((prev) => !prev);
@@ -59,14 +63,25 @@ const Exam = () => {
     const fetchExam = async () => {
       try {
         const data = await examService.getExam(examId);
-        // Shuffle the questions to randomize their order
-        data.questions = shuffle(data.questions);
+        // Restore autosaved answers after a reload; start empty if there are none
+        const draft = await examService.getDraft(examId).catch(() => null);
+        const savedAnswers = draft?.answers || {};
+        hasDraft.current = Boolean(draft?.version);
+        // Questions arrive already drawn and ordered for this student by the server
         setExam(data);
         const initialAnswers = {};
+        const initialCode = {};
         data.questions.forEach((question) => {
-          initialAnswers[question.id] = '';
+          const saved = savedAnswers[question.id] ?? '';
+          if (data.exam_type === 'CODING') {
+            initialAnswers[question.id] = '';
+            if (saved) initialCode[question.id] = saved;
+          } else {
+            initialAnswers[question.id] = saved;
+          }
         });
         setAnswers(initialAnswers);
+        setCodePerQuestion(initialCode);
         setTimeLeft(data.duration * 60);
         setLoading(false);
       } catch (err) {
@@ -164,11 +179,26 @@ const Exam = () => {
     };
   }, [isNavOpen]);
 
+  // Autosave only the changed answer; the server merges it into the draft
+  const saveAnswer = (questionId, answer) => {
+    unsavedAnswers.current[questionId] = answer;
+    examService
+      .saveDraft(examId, { [questionId]: answer })
+      .then(() => {
+        hasDraft.current = true;
+        if (unsavedAnswers.current[questionId] === answer) {
+          delete unsavedAnswers.current[questionId];
+        }
+      })
+      .catch(() => {});
+  };
+
   const handleAnswerChange = (questionId, answer) => {
     setAnswers((prev) => ({
       ...prev,
       [questionId]: answer,
     }));
+    saveAnswer(questionId, answer);
   };
 
   const handleMarkForReview = (questionId) => {
@@ -280,6 +310,33 @@ const Exam = () => {
     </div>
   );
 
+  // Coding answers are the code in each question's editor
+  const submissionAnswers = () =>
+    exam.exam_type === 'CODING' ? { ...answers, ...codePerQuestion } : answers;
+
+  // Submit the saved draft once any changes it is missing are saved; send
+  // every answer only if that fails or nothing was ever saved
+  const submissionPayload = async () => {
+    Object.values(codeSaveTimers.current).forEach(clearTimeout);
+    codeSaveTimers.current = {};
+    const current = submissionAnswers();
+    const unsaved = {};
+    Object.keys(unsavedAnswers.current).forEach((questionId) => {
+      unsaved[questionId] = current[questionId] ?? '';
+    });
+    try {
+      if (Object.keys(unsaved).length > 0) {
+        await examService.saveDraft(examId, unsaved);
+        hasDraft.current = true;
+        unsavedAnswers.current = {};
+      }
+      if (hasDraft.current) return {};
+    } catch (err) {
+      console.error('Error saving draft before submitting:', err);
+    }
+    return { answers: current };
+  };
+
   // Ensure duplicate submissions are avoided when the timer ends
   const handleAutoSubmit = async () => {
     if (isAutoSubmitTriggered.current) return; // Prevent duplicate submissions
@@ -289,7 +346,7 @@ const Exam = () => {
       const timeTaken = exam.duration * 60 - timeLeft;
       await examService.submitExam(examId, {
         exam: examId,
-        answers: answers,
+        ...(await submissionPayload()),
         time_taken: Math.floor(timeTaken / 60),
       });
       navigate('/dashboard');
@@ -310,7 +367,7 @@ const Exam = () => {
       const timeTaken = exam.duration * 60 - timeLeft;
       await examService.submitExam(examId, {
         exam: examId,
-        answers: answers,
+        ...(await submissionPayload()),
         time_taken: Math.floor(timeTaken / 60),
       });
       navigate('/dashboard');
@@ -341,19 +398,25 @@ const Exam = () => {
       ...prev,
       [questionId]: newCode,
     }));
+    // Code is autosaved once typing pauses rather than on every keystroke
+    unsavedAnswers.current[questionId] = newCode;
+    clearTimeout(codeSaveTimers.current[questionId]);
+    codeSaveTimers.current[questionId] = setTimeout(() => {
+      delete codeSaveTimers.current[questionId];
+      saveAnswer(questionId, newCode);
+    }, CODE_AUTOSAVE_DELAY_MS);
   };
 
+  // Coding answers are judged in the language set on the question
+  const questionLanguage = () => exam.questions[currentQuestionIndex].language || 'python';
+
   const handleCompileAndRun = async () => {
     try {
       const currentQuestionId = exam.questions[currentQuestionIndex].id;
-      const serializedTestCases = exam.questions[currentQuestionIndex].test_cases.map((testCase) => {
-        return typeof testCase === 'object' ? JSON.stringify(testCase) : testCase;
-      });
-
       const results = await compileAndRunCode(
         codePerQuestion[currentQuestionId] || '',
-        selectedLanguage,
-        serializedTestCases
+        questionLanguage(),
+        currentQuestionId
       );
 
       setExecutionResultsPerQuestion((prev) => ({
@@ -478,10 +541,10 @@ const Exam = () => {
                       </div>
                 
                       <div>
-                        <label className="block text-gray-700 text-sm font-semibold mb-2">Select Language</label>
+                        <label className="block text-gray-700 text-sm font-semibold mb-2">Language</label>
                         <select
-                          value={selectedLanguage}
-                          onChange={(e) => setSelectedLanguage(e.target.value)}
+                          value={questionLanguage()}
+                          disabled
                           className="w-full border border-gray-300 rounded-lg px-3 py-2 text-sm focus:ring-2 focus:ring-blue-500 focus:outline-none"
                         >
                           <option value="python">Python</option>
@@ -495,7 +558,7 @@ const Exam = () => {
                         <div className="border rounded-lg overflow-hidden shadow-sm">
                           <Editor
                             height="400px"
-                            defaultLanguage={selectedLanguage}
+                            language={questionLanguage()}
                             value={codePerQuestion[exam.questions[currentQuestionIndex].id] || ''}
                             theme="vs-dark"
                             onChange={(value) => handleCodeChange(exam.questions[currentQuestionIndex].id, value)}
@@ -529,7 +592,7 @@ const Exam = () => {
                             <ul className="list-disc list-inside text-sm text-gray-800">
                               {executionResultsPerQuestion[exam.questions[currentQuestionIndex].id].map((result, index) => (
                                 <li key={index}>
-                                  <p><strong>Test Case {index + 1}:</strong> {result.test_case}</p>
+                                  <p><strong>Test Case {index + 1}:</strong> {result.test_case === undefined ? '(hidden)' : typeof result.test_case === 'string' ? result.test_case : `(${result.test_case.size} bytes)`}</p>
                                   <p><strong>Output:</strong> {result.output}</p>
                                   {result.error && (
                                     <p className="text-red-600"><strong>Error:</strong> {result.error}</p>
@@ -20,6 +20,11 @@ const ManageQuestions = () => {
     correct_answer: 'A',
   });
   const [testCases, setTestCases] = useState([]);
+  // Changes are kept locally and sent in one bulk request on save
+  const [pendingQuestions, setPendingQuestions] = useState([]);
+  const [pendingDeletes, setPendingDeletes] = useState([]);
+  const [saving, setSaving] = useState(false);
+  const hasPendingChanges = pendingQuestions.length > 0 || pendingDeletes.length > 0;
 
   useEffect(() => {
     fetchExams();
@@ -51,48 +56,77 @@ const ManageQuestions = () => {
     }
   };
 
-  const handleSubmit = async (e) => {
+  const handleSubmit = (e) => {
     e.preventDefault();
-    try {
-      await examService.createQuestion({
+    setPendingQuestions([
+      ...pendingQuestions,
+      {
         ...formData,
-        exam: selectedExam.id,
-        testCases,
-      });
-      setShowForm(false);
-      setFormData({
-        exam: selectedExam.id,
-        text: '',
-        option_a: '',
-        option_b: '',
-        option_c: '',
-        option_d: '',
-        correct_answer: 'A',
-      });
-      setTestCases([]);
-      fetchQuestions();
-    } catch (err) {
-      setError('Failed to create question');
-    }
+        key: `new-${Date.now()}`,
+        test_cases: testCases.map((testCase) => testCase.input),
+        correct_output: testCases.map((testCase) => testCase.output),
+      },
+    ]);
+    setShowForm(false);
+    setFormData({
+      exam: selectedExam.id,
+      text: '',
+      option_a: '',
+      option_b: '',
+      option_c: '',
+      option_d: '',
+      correct_answer: 'A',
+    });
+    setTestCases([]);
   };
 
-  const handleDelete = async (id) => {
+  const handleDelete = (question) => {
     if (window.confirm('Are you sure you want to delete this question?')) {
-      try {
-        await examService.deleteQuestion(id);
-        fetchQuestions();
-      } catch (err) {
-        setError('Failed to delete question');
+      if (question.key) {
+        setPendingQuestions(pendingQuestions.filter((pending) => pending.key !== question.key));
+      } else {
+        setPendingDeletes([...pendingDeletes, question.id]);
       }
     }
   };
 
+  const discardPendingChanges = () => {
+    setPendingQuestions([]);
+    setPendingDeletes([]);
+  };
+
+  const handleSave = async () => {
+    setSaving(true);
+    try {
+      const data = await examService.bulkSaveQuestions(selectedExam.id, {
+        upsert: pendingQuestions.map(({ key, ...question }) => question),
+        remove: pendingDeletes,
+      });
+      setQuestions(data);
+      discardPendingChanges();
+      setError(null);
+    } catch (err) {
+      setError('Failed to save questions');
+    } finally {
+      setSaving(false);
+    }
+  };
+
   const handleBack = () => {
+    if (hasPendingChanges && !window.confirm('Discard unsaved question changes?')) {
+      return;
+    }
+    discardPendingChanges();
     setSelectedExam(null);
     setQuestions([]);
     setShowForm(false);
   };
 
+  const visibleQuestions = [
+    ...questions.filter((question) => !pendingDeletes.includes(question.id)),
+    ...pendingQuestions,
+  ];
+
   const handleAddTestCase = () => {
     setTestCases([...testCases, { input: '', output: '' }]);
   };
@@ -137,6 +171,13 @@ const ManageQuestions = () => {
                 >
                   {showForm ? 'Cancel' : 'Add New Question'}
                 </button>
+                <button
+                  onClick={handleSave}
+                  disabled={!hasPendingChanges || saving}
+                  className="bg-green-600 text-white px-4 py-2 rounded-md hover:bg-green-700 disabled:opacity-50"
+                >
+                  {saving ? 'Saving...' : 'Save Changes'}
+                </button>
               </div>
             ) : null}
           </div>
@@ -278,18 +319,21 @@ const ManageQuestions = () => {
                     type="submit"
                     className="bg-blue-600 text-white px-4 py-2 rounded-md hover:bg-blue-700"
                   >
-                    Create Question
+                    Add Question
                   </button>
                 </form>
               )}
 
               <div className="space-y-4">
-                {questions.length > 0 ? (
-                  questions.map((question) => (
-                    <div key={question.id} className="bg-white rounded-lg shadow-md p-6">
+                {visibleQuestions.length > 0 ? (
+                  visibleQuestions.map((question) => (
+                    <div key={question.key || question.id} className="bg-white rounded-lg shadow-md p-6">
                       <div className="flex justify-between items-start">
                         <div>
-                          <p className="text-gray-800 font-medium mb-2">{question.text}</p>
+                          <p className="text-gray-800 font-medium mb-2">
+                            {question.text}
+                            {question.key && <span className="ml-2 text-xs text-yellow-600">(unsaved)</span>}
+                          </p>
                           <div className="grid grid-cols-2 gap-4">
                             <div>
                               <p className="text-sm text-gray-600">A. {question.option_a}</p>
@@ -316,7 +360,7 @@ const ManageQuestions = () => {
                           )}
                         </div>
                         <button
-                          onClick={() => handleDelete(question.id)}
+                          onClick={() => handleDelete(question)}
                           className="text-red-600 hover:text-red-900"
                         >
                           Delete
@@ -1,18 +1,45 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import AdminMenu from './AdminMenu';
-import { authService } from '../services/api';
+import { authService, examService, streamLiveExamStats } from '../services/api';
 
 const StaffDashboard = () => {
   const navigate = useNavigate();
+  const [exams, setExams] = useState([]);
+  const [liveExamId, setLiveExamId] = useState('');
+  const [liveStats, setLiveStats] = useState(null);
+  const [liveStatsDisabled, setLiveStatsDisabled] = useState('');
 
   useEffect(() => {
     const currentUser = authService.getCurrentUser();
     if (!currentUser || !currentUser.is_staff) {
       navigate('/login');
+      return;
     }
+    examService.getExams().then(setExams).catch(() => setExams([]));
   }, [navigate]);
 
+  // Live counters of the selected exam, pushed by the server while it is open
+  useEffect(() => {
+    setLiveStats(null);
+    setLiveStatsDisabled('');
+    if (!liveExamId) return undefined;
+    return streamLiveExamStats(liveExamId, setLiveStats, setLiveStatsDisabled);
+  }, [liveExamId]);
+
+  const liveCounters = liveStats
+    ? [
+        { label: 'Started', value: liveStats.started },
+        { label: 'In progress', value: liveStats.in_progress },
+        { label: 'Submitted', value: liveStats.submitted },
+        { label: 'Graded', value: liveStats.graded },
+        {
+          label: 'Average score',
+          value: liveStats.average_score === null ? '-' : `${liveStats.average_score}%`,
+        },
+      ]
+    : [];
+
   const menuItems = [
     {
       title: 'Manage Exams',
@@ -57,6 +84,37 @@ const StaffDashboard = () => {
               </div>
             ))}
           </div>
+          <div className="bg-white rounded-lg shadow-xl p-6 mt-12">
+            <div className="flex flex-col md:flex-row md:items-center md:justify-between mb-6">
+              <h2 className="text-2xl font-bold text-gray-800 mb-4 md:mb-0">Live Exam Monitor</h2>
+              <select
+                value={liveExamId}
+                onChange={(e) => setLiveExamId(e.target.value)}
+                className="border border-gray-300 rounded-lg px-3 py-2 text-sm focus:ring-2 focus:ring-blue-500 focus:outline-none"
+              >
+                <option value="">Select an exam</option>
+                {exams.map((exam) => (
+                  <option key={exam.id} value={exam.id}>
+                    {exam.title}
+                  </option>
+                ))}
+              </select>
+            </div>
+            {liveStatsDisabled && <p className="text-gray-500 text-center">{liveStatsDisabled}</p>}
+            {liveExamId && !liveStats && !liveStatsDisabled && (
+              <p className="text-gray-500 text-center">Connecting...</p>
+            )}
+            {liveStats && (
+              <div className="grid grid-cols-2 md:grid-cols-5 gap-4">
+                {liveCounters.map((counter) => (
+                  <div key={counter.label} className="bg-gray-100 rounded-lg p-4 text-center">
+                    <p className="text-3xl font-bold text-gray-800">{counter.value}</p>
+                    <p className="text-sm text-gray-600">{counter.label}</p>
+                  </div>
+                ))}
+              </div>
+            )}
+          </div>
         </div>
       </div>
     </div>
@@ -2,6 +2,12 @@ import React, { useState, useEffect } from 'react';
 import { examService } from '../services/api';
 import AdminMenu from './AdminMenu';
 
+// Large test case data is stored out of row and returned as {"$ref", "size"}
+const formatCaseData = (value) =>
+  value && typeof value === 'object' && value.$ref
+    ? `[stored data, ${value.size} bytes, ${value.$ref.slice(0, 12)}]`
+    : value;
+
 const StaffExamManagement = () => {
   const [exams, setExams] = useState([]);
   const [selectedExam, setSelectedExam] = useState(null);
@@ -14,6 +20,7 @@ const StaffExamManagement = () => {
     title: '',
     duration: '',
     exam_type: 'APTITUDE',
+    questions_per_attempt: null, // null: every student gets the whole bank
   });
   const [questionFormData, setQuestionFormData] = useState({
     text: '',
@@ -24,6 +31,7 @@ const StaffExamManagement = () => {
     correct_answer: 'A',
     correct_output: [], // For coding exams
     test_cases: [], // Array to hold random inputs for coding exams
+    output_comparison: 'exact', // How program output is checked against correct_output
   });
   const [csvFile, setCsvFile] = useState(null);
   const [uploadError, setUploadError] = useState(null);
@@ -64,7 +72,7 @@ const StaffExamManagement = () => {
     try {
       await examService.createExam(examFormData);
       setShowExamForm(false);
-      setExamFormData({ title: '', duration: '', exam_type: 'APTITUDE' });
+      setExamFormData({ title: '', duration: '', exam_type: 'APTITUDE', questions_per_attempt: null });
       fetchExams();
     } catch (err) {
       setError('Failed to create exam');
@@ -88,6 +96,7 @@ const StaffExamManagement = () => {
         correct_answer: 'A',
         correct_output: '',
         test_cases: [],
+        output_comparison: 'exact',
       });
       fetchQuestions();
     } catch (err) {
@@ -262,6 +271,19 @@ const StaffExamManagement = () => {
                       <option value="CODING">Coding Exam</option>
                     </select>
                   </div>
+                  <div className="mb-4">
+                    <label className="block text-gray-700 text-sm font-bold mb-2">
+                      Questions per Student
+                    </label>
+                    <input
+                      type="number"
+                      value={examFormData.questions_per_attempt ?? ''}
+                      onChange={(e) => setExamFormData({ ...examFormData, questions_per_attempt: e.target.value ? parseInt(e.target.value) : null })}
+                      className="shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline"
+                      min="1"
+                      placeholder="All questions"
+                    />
+                  </div>
                   <button
                     type="submit"
                     className="bg-blue-600 text-white px-4 py-2 rounded-md hover:bg-blue-700"
@@ -345,6 +367,20 @@ const StaffExamManagement = () => {
                               required
                             />
                           </div>
+                          <div className="mb-4">
+                            <label className="block text-gray-700 text-sm font-bold mb-2">
+                              Output Comparison
+                            </label>
+                            <select
+                              value={questionFormData.output_comparison}
+                              onChange={(e) => setQuestionFormData({ ...questionFormData, output_comparison: e.target.value })}
+                              className="shadow appearance-none border rounded w-full py-2 px-3 text-gray-700 leading-tight focus:outline-none focus:shadow-outline"
+                            >
+                              <option value="exact">Exact (ignoring surrounding whitespace)</option>
+                              <option value="whitespace">Whitespace-insensitive</option>
+                              <option value="float">Float tolerance</option>
+                            </select>
+                          </div>
                         </>
                       ) : (
                         <>
@@ -441,7 +477,7 @@ const StaffExamManagement = () => {
                             </p>
                             <ul className="list-disc list-inside text-sm text-gray-600">
                               {question.correct_output.map((correctOutput, index) => (
-                                <li key={index}>{correctOutput}</li>
+                                <li key={index}>{formatCaseData(correctOutput)}</li>
                               ))}
                             </ul>
                             <p className="text-sm text-gray-600">
@@ -449,7 +485,7 @@ const StaffExamManagement = () => {
                             </p>
                             <ul className="list-disc list-inside text-sm text-gray-600">
                               {question.test_cases.map((testCase, index) => (
-                                <li key={index}>{testCase}</li>
+                                <li key={index}>{formatCaseData(testCase)}</li>
                               ))}
                             </ul>
                             
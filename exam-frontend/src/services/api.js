@@ -286,6 +286,20 @@ export const examService = {
       throw error;
     }
   },
+  // Create/update (items with an id) and delete many questions of one exam
+  // in a single request; resolves to the exam's questions after the change
+  bulkSaveQuestions: async (examId, { upsert = [], remove = [] }) => {
+    try {
+      const response = await api.post(`/questions/bulk/?exam=${examId}`, {
+        upsert,
+        delete: remove,
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error saving questions:', error.response?.data);
+      throw error;
+    }
+  },
   deleteQuestion: async (id) => {
     try {
       await api.delete(`/questions/${id}/`);
@@ -296,9 +310,10 @@ export const examService = {
   },
   submitExam: async (examId, data) => {
     try {
+      // Without answers the server submits the saved draft
       const response = await api.post(`/submissions/`, {
         exam: examId,
-        answers: data.answers,
+        ...(data.answers !== undefined && { answers: data.answers }),
         time_taken: data.time_taken
       });
       return response.data;
@@ -307,6 +322,24 @@ export const examService = {
       throw error;
     }
   },
+  getDraft: async (examId) => {
+    try {
+      const response = await api.get(`/exams/${examId}/draft/`);
+      return response.data;
+    } catch (error) {
+      console.error('Error fetching draft:', error.response?.data);
+      throw error;
+    }
+  },
+  saveDraft: async (examId, answers) => {
+    try {
+      const response = await api.patch(`/exams/${examId}/draft/`, { answers });
+      return response.data;
+    } catch (error) {
+      console.error('Error saving draft:', error.response?.data);
+      throw error;
+    }
+  },
   uploadExamsCsv: async (formData) => {
     try {
       const response = await api.post(`/upload-exams-csv/`, formData, {
@@ -337,12 +370,14 @@ export const uploadProctorFrame = async (formData) => {
   }
 };
 
-export const compileAndRunCode = async (code, language, testCases) => {
+// Without testCases the server runs the question's own test cases
+export const compileAndRunCode = async (code, language, questionId, testCases) => {
   try {
     const response = await api.post('/execute-code/', {
       code,
       language,
       test_cases: testCases,
+      question: questionId,
     });
     return response.data.results;
   } catch (error) {
@@ -351,4 +386,69 @@ export const compileAndRunCode = async (code, language, testCases) => {
   }
 };
 
+const LIVE_STATS_POLL_MS = 5000;
+
+// Calls onUpdate with each live stats snapshot of an exam until the returned
+// function is called. EventSource cannot send the Authorization header, so
+// the event stream is read with fetch. The stream is only served under ASGI;
+// otherwise the snapshot endpoint is polled instead. onDisabled is called
+// with the server's message, and updates stop, if live stats are turned off.
+export const streamLiveExamStats = (examId, onUpdate, onDisabled) => {
+  const controller = new AbortController();
+  let pollTimer = null;
+  const poll = async () => {
+    try {
+      const response = await api.get(`/exams/${examId}/live-stats/`);
+      onUpdate(response.data);
+    } catch (error) {
+      if (error.response?.status === 503) {
+        onDisabled?.(error.response.data.detail);
+        return;
+      }
+      console.error('Error fetching live exam stats:', error.response?.data);
+    }
+    if (!controller.signal.aborted) {
+      pollTimer = setTimeout(poll, LIVE_STATS_POLL_MS);
+    }
+  };
+  const read = async () => {
+    const response = await fetch(`${baseURL}/exams/${examId}/live-stats/stream/`, {
+      headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` },
+      signal: controller.signal,
+    });
+    if (response.status === 404) {
+      poll();
+      return;
+    }
+    if (response.status === 503) {
+      onDisabled?.((await response.json()).detail);
+      return;
+    }
+    if (!response.ok) {
+      throw new Error(`Live stats stream failed with status ${response.status}`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      for (const event of events) {
+        const data = event.split('\n').find((line) => line.startsWith('data: '));
+        if (data) onUpdate(JSON.parse(data.slice(6)));
+      }
+    }
+  };
+  read().catch((error) => {
+    if (error.name !== 'AbortError') console.error('Error streaming live exam stats:', error);
+  });
+  return () => {
+    controller.abort();
+    clearTimeout(pollTimer);
+  };
+};
+
 export default api;
\ No newline at end of file
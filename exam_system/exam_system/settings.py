@@ -47,10 +47,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "exams.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "exams.db_router.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     
@@ -92,11 +94,149 @@ DATABASES = {
         "USER": "postgres",
         "PASSWORD": "450506",
         "HOST": "localhost",
-        "PORT": 5432
-        
+        "PORT": 5432,
+        # Reuse connections across requests instead of reconnecting each time
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Live stats counters and replica pins are kept in the default cache. The
+# local memory cache below is per process, so it only suits a single process
+# (runserver). With several workers use a shared cache with atomic
+# increments, e.g. Redis (pip install redis):
+#   CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+#                         "LOCATION": "redis://127.0.0.1:6379/0"}}
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Analytics, dashboard and export reads go to a read replica when DATABASES
+# has an entry named READ_REPLICA_DATABASE, e.g.
+#   DATABASES["replica"] = {**DATABASES["default"], "HOST": "replica-host",
+#                           "TEST": {"MIRROR": "default"}}
+# A user is pinned to the primary for REPLICA_PIN_SECONDS after each write
+# (tracked in the cache, which must be shared when running several workers).
+DATABASE_ROUTERS = ["exams.db_router.ReplicaRouter"]
+READ_REPLICA_DATABASE = "replica"
+REPLICA_PIN_SECONDS = 10
+
+# Serve the read-heavy endpoints (dashboard, analytics, exam retrieve,
+# submission list) with async views, and add the live stats event stream.
+# Enable when running under ASGI, e.g. `uvicorn exam_system.asgi:application`.
+ASYNC_READ_VIEWS = False
+
+# Serve /api/execute-code/ with asyncio subprocesses instead of blocking a
+# worker thread per run. Also meant for ASGI deployments.
+ASYNC_CODE_EXECUTION = False
+
+# Per-process cache of execution results keyed by language, toolchain
+# version, code and stdin. Runs that hit the time limit are not cached, as
+# they depend on host load. Set EXECUTION_CACHE_MAX_ENTRIES = 0 to disable.
+EXECUTION_CACHE_MAX_ENTRIES = 2048
+EXECUTION_CACHE_TTL = 600  # seconds
+
+# Default per-test-case limits for submitted code. Questions can override the
+# time and memory limits. RLIMIT_NPROC counts every process of the OS user,
+# so run the judge as a dedicated user; it is not enforced for root.
+JUDGE_TIME_LIMIT = 5  # CPU seconds; the wall clock limit is twice this
+JUDGE_MEMORY_LIMIT_MB = 256
+JUDGE_MAX_PROCESSES = 64
+JUDGE_MAX_OUTPUT_BYTES = 1024 * 1024
+JUDGE_MAX_FILE_BYTES = 10 * 1024 * 1024
+JUDGE_COMPILE_TIME_LIMIT = 10
+JUDGE_COMPILE_MEMORY_LIMIT_MB = 1024
+
+# Admission control for code runs, shared by all workers on the host through
+# lock files in EXECUTION_LOCK_DIR. EXECUTION_SLOTS programs run at once
+# (None = CPU count); at most EXECUTION_QUEUE_SIZE run requests wait for a
+# slot and each user may have EXECUTION_USER_CONCURRENCY in flight. Others
+# get 429 with Retry-After.
+EXECUTION_LOCK_DIR = BASE_DIR / 'run' / 'execution'
+EXECUTION_SLOTS = None
+EXECUTION_QUEUE_SIZE = 32
+EXECUTION_USER_CONCURRENCY = 2
+
+# 'local' runs code inside the web process; 'queue' hands runs and coding
+# exam grading to judge workers (`manage.py judge_worker --processes N`)
+# through the JudgeJob table. Workers need the database and CASE_STORE_DIR.
+JUDGE_BACKEND = 'local'
+JUDGE_JOB_TIMEOUT = 120  # seconds the web process waits for a run
+JUDGE_JOB_LEASE_SECONDS = 60  # a running job without a heartbeat this long is retried
+JUDGE_JOB_MAX_ATTEMPTS = 3
+JUDGE_WORKER_POLL_INTERVAL = 0.5
+
+# Test case inputs/outputs larger than CASE_STORE_INLINE_LIMIT bytes are kept
+# once per distinct content under CASE_STORE_DIR; question rows hold a reference.
+CASE_STORE_DIR = BASE_DIR / 'case_store'
+CASE_STORE_INLINE_LIMIT = 4096
+
+# Proctoring webcam frames: one append-only archive per exam session under
+# PROCTORING_ARCHIVE_DIR. Frames are downscaled to PROCTORING_FRAME_MAX_WIDTH
+# pixels and re-encoded as JPEG; `manage.py prune_proctoring_frames` removes
+# sessions older than PROCTORING_RETENTION_DAYS.
+PROCTORING_ARCHIVE_DIR = BASE_DIR / 'proctoring'
+PROCTORING_FRAME_MAX_WIDTH = 320
+PROCTORING_JPEG_QUALITY = 60
+PROCTORING_FRAME_GRAYSCALE = False
+PROCTORING_SEGMENT_BYTES = 64 * 1024 * 1024
+PROCTORING_MAX_UPLOAD_BYTES = 2 * 1024 * 1024
+PROCTORING_RETENTION_DAYS = 30
+
+# Frame verdicts are folded into a per-session timeline as they arrive.
+# Frames of the same verdict less than PROCTORING_INTERVAL_GAP_MS apart form
+# one interval. A session is flagged once it has that many frames with more
+# than one face, a face missing for PROCTORING_FLAG_NO_FACE_MS, or a risk
+# score (anomalous frames / frames, multiple faces counting twice) at or
+# above PROCTORING_FLAG_RISK_SCORE.
+PROCTORING_FACE_DETECTOR_MODEL = None  # path to a YuNet .onnx model; Haar cascade otherwise
+PROCTORING_MIN_FACE_PIXELS = 30
+PROCTORING_INTERVAL_GAP_MS = 60000
+PROCTORING_FLAG_MULTIPLE_FACES_FRAMES = 1
+PROCTORING_FLAG_NO_FACE_MS = 60000
+PROCTORING_FLAG_RISK_SCORE = 0.2
+
+# Code similarity for coding exams: submissions are fingerprinted as they
+# arrive (k-grams of SIMILARITY_KGRAM tokens, winnowed over
+# SIMILARITY_WINDOW), and pairs sharing at least SIMILARITY_MIN_SHARED
+# fingerprints with a score of SIMILARITY_MIN_SCORE or more are recorded.
+# Fingerprints in SIMILARITY_COMMON_FINGERPRINT_LIMIT submissions are ignored.
+SIMILARITY_INDEXING = True
+SIMILARITY_KGRAM = 10
+SIMILARITY_WINDOW = 6
+SIMILARITY_MIN_SHARED = 5
+SIMILARITY_MIN_SCORE = 0.5
+SIMILARITY_COMMON_FINGERPRINT_LIMIT = 50
+
+# MCQ collusion report: response probabilities are estimated per
+# COLLUSION_SCORE_BANDS ability bands, pairs need COLLUSION_MIN_SHARED_WRONG
+# identical wrong answers to be ranked, and pairwise products run
+# COLLUSION_BLOCK_SIZE rows at a time.
+COLLUSION_SCORE_BANDS = 10
+COLLUSION_MIN_SHARED_WRONG = 3
+COLLUSION_BLOCK_SIZE = 1024
+
+# Live exam counters (exams/<id>/live-stats/) are kept in the cache; their
+# SSE stream (ASGI only, see ASYNC_READ_VIEWS) checks it every LIVE_STATS_POLL_INTERVAL seconds and sends a
+# keepalive comment after LIVE_STATS_KEEPALIVE_SECONDS without changes.
+# Enable once CACHES is shared: system check exams.E001 rejects the local
+# memory cache (silence it to run live stats from a single process).
+LIVE_STATS_ENABLED = False
+LIVE_STATS_POLL_INTERVAL = 1.0
+LIVE_STATS_KEEPALIVE_SECONDS = 15
+
+# Rows fetched per round trip by the streaming CSV/JSONL exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Submissions scored per batch (one bulk_update each) when re-grading
+REGRADE_BATCH_SIZE = 2000
+
+# Store new MCQ submissions as one byte per question aligned to a frozen
+# per-exam question order (AnswerLayout) instead of a JSON object.
+COMPACT_SUBMISSION_ANSWERS = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -142,13 +282,39 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
-
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'exams.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'exams.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# 'orjson' renders and parses API JSON with orjson (when installed);
+# 'json' uses DRF's standard library based renderer and parser.
+JSON_BACKEND = 'orjson'
+
+# Responses are compressed with the first of these encodings the client
+# accepts ('br' needs the brotli package). Smaller bodies are sent as is.
+RESPONSE_COMPRESSION_ENCODINGS = ['br', 'gzip']
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
 from datetime import timedelta
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'AUTH_HEADER_TYPES': ('Bearer',),
-}
\ No newline at end of file
+}
+
+# Submission ingestion: 'sync' grades and inserts inside the request;
+# 'write_behind' queues to SUBMISSION_SPOOL_DIR and relies on
+# `manage.py flush_submissions` to grade and bulk insert.
+SUBMISSION_INGESTION_MODE = 'sync'
+SUBMISSION_SPOOL_DIR = BASE_DIR / 'spool' / 'submissions'
+SUBMISSION_FLUSH_BATCH_SIZE = 500
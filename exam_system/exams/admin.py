@@ -5,3 +5,9 @@ from .models import *
 admin.site.register(Exam)
 admin.site.register(Question)
 admin.site.register(Submission)
+admin.site.register(SubmissionDraft)
+admin.site.register(AnswerLayout)
+admin.site.register(ExamAttempt)
+admin.site.register(JudgeJob)
+admin.site.register(ProctoringSession)
+admin.site.register(SimilarityPair)
@@ -0,0 +1,273 @@
+"""
+Admission control for code execution, shared by every worker process on
+the host.
+
+Capacity is a set of lock files under EXECUTION_LOCK_DIR, held with
+flock(). A lock is dropped by the kernel when its holder exits, so a
+crashed worker never leaks capacity.
+
+- slots: EXECUTION_SLOTS (default: CPU count) programs may run at once.
+  The judge holds one per execution that misses the result cache, and
+  coding exam grading takes them as well.
+- tickets: a run/stream request needs one of EXECUTION_SLOTS +
+  EXECUTION_QUEUE_SIZE tickets for its whole duration, so at most
+  EXECUTION_QUEUE_SIZE requests wait for a slot.
+- per user: EXECUTION_USER_CONCURRENCY requests per user may be
+  admitted at once.
+
+A request that cannot get a user token or a ticket is rejected at once
+(ExecutionRejected -> 429 with Retry-After) instead of piling up threads.
+Platforms without fcntl run without admission control.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+POLL_MIN_SECONDS = 0.005
+POLL_MAX_SECONDS = 0.05
+
+
+class ExecutionRejected(Exception):
+    def __init__(self, detail, retry_after):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def lock_dir():
+    path = Path(getattr(settings, 'EXECUTION_LOCK_DIR', Path(settings.BASE_DIR) / 'run' / 'execution'))
+    for sub in ('slots', 'tickets', 'users', 'waiting'):
+        (path / sub).mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def slot_count():
+    return getattr(settings, 'EXECUTION_SLOTS', None) or os.cpu_count() or 1
+
+
+def ticket_count():
+    return slot_count() + getattr(settings, 'EXECUTION_QUEUE_SIZE', 32)
+
+
+def _try_lock(path):
+    """An fd holding an exclusive flock on path, or None if it is taken."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _try_any(directory, prefix, count):
+    # Start at a random index so processes do not all contend for lock 0
+    start = uuid.uuid4().int % count
+    for offset in range(count):
+        fd = _try_lock(directory / f'{prefix}{(start + offset) % count}.lock')
+        if fd is not None:
+            return fd
+    return None
+
+
+def _count_locked(directory, prefix, count):
+    locked = 0
+    for index in range(count):
+        fd = _try_lock(directory / f'{prefix}{index}.lock')
+        if fd is None:
+            locked += 1
+        else:
+            os.close(fd)
+    return locked
+
+
+def _release(fd):
+    # Closing the descriptor drops the flock
+    if fd is not None:
+        os.close(fd)
+
+
+class AdmissionStats:
+    """This worker's admission counters and recent slot wait/hold times."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = {'user_limit': 0, 'queue_full': 0}
+        self.waits = deque(maxlen=window)
+        self.holds = deque(maxlen=window)
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_admitted(self):
+        with self._lock:
+            self.admitted += 1
+
+    def record_rejected(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits.append(seconds)
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_hold(self, seconds):
+        with self._lock:
+            self.holds.append(seconds)
+
+    def mean_hold(self):
+        with self._lock:
+            return sum(self.holds) / len(self.holds) if self.holds else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            return {
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+                'slot_waits': len(waits),
+                'wait_seconds_total': round(self.wait_seconds_total, 4),
+                'wait_seconds_max': round(self.wait_seconds_max, 4),
+                'recent_wait_p50': round(waits[len(waits) // 2], 4) if waits else 0.0,
+                'recent_wait_p95': round(waits[max(math.ceil(len(waits) * 0.95) - 1, 0)], 4) if waits else 0.0,
+            }
+
+
+stats = AdmissionStats()
+
+
+def queue_depth():
+    """Processes on this host currently waiting for an execution slot."""
+    directory = lock_dir() / 'waiting'
+    depth = 0
+    for path in directory.iterdir():
+        fd = _try_lock(path)
+        if fd is None:
+            depth += 1
+            continue
+        # Left behind by a waiter that died
+        os.close(fd)
+        path.unlink(missing_ok=True)
+    return depth
+
+
+def retry_after():
+    """Seconds until capacity is likely free, from recent run times and the queue length."""
+    estimate = stats.mean_hold() * (queue_depth() + 1) / slot_count()
+    return min(max(math.ceil(estimate), 1), 60)
+
+
+class Ticket:
+    """Admission of one run request; release() when its response is finished."""
+
+    def __init__(self, user_fd=None, ticket_fd=None):
+        self.user_fd = user_fd
+        self.ticket_fd = ticket_fd
+
+    def release(self):
+        _release(self.ticket_fd)
+        _release(self.user_fd)
+        self.user_fd = self.ticket_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def admit(client_key):
+    """Admit a run request for client_key without waiting, or raise ExecutionRejected."""
+    if fcntl is None:
+        return Ticket()
+    directory = lock_dir()
+    user_fd = _try_any(directory / 'users', f'{client_key}-', getattr(settings, 'EXECUTION_USER_CONCURRENCY', 2))
+    if user_fd is None:
+        stats.record_rejected('user_limit')
+        raise ExecutionRejected("Too many runs in progress for this user.", retry_after())
+    ticket_fd = _try_any(directory / 'tickets', 'ticket-', ticket_count())
+    if ticket_fd is None:
+        _release(user_fd)
+        stats.record_rejected('queue_full')
+        raise ExecutionRejected("The code runner is busy, try again shortly.", retry_after())
+    stats.record_admitted()
+    return Ticket(user_fd, ticket_fd)
+
+
+def release_after(events, ticket):
+    """Yield from a streamed run's events and release its ticket when the stream ends."""
+    try:
+        yield from events
+    finally:
+        ticket.release()
+
+
+async def arelease_after(events, ticket):
+    try:
+        async for event in events:
+            yield event
+    finally:
+        ticket.release()
+
+
+@asynccontextmanager
+async def execution_slot():
+    """Hold one of the host's execution slots, waiting for one if all are busy."""
+    if fcntl is None:
+        yield
+        return
+    directory = lock_dir()
+    slot_fd = _try_any(directory / 'slots', 'slot-', slot_count())
+    if slot_fd is None:
+        waiting_path = directory / 'waiting' / f'{os.getpid()}-{uuid.uuid4().hex}.lock'
+        waiting_fd = _try_lock(waiting_path)
+        started = time.monotonic()
+        delay = POLL_MIN_SECONDS
+        try:
+            while slot_fd is None:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, POLL_MAX_SECONDS)
+                slot_fd = _try_any(directory / 'slots', 'slot-', slot_count())
+        finally:
+            _release(waiting_fd)
+            waiting_path.unlink(missing_ok=True)
+        stats.record_wait(time.monotonic() - started)
+    else:
+        stats.record_wait(0.0)
+    held_since = time.monotonic()
+    try:
+        yield
+    finally:
+        _release(slot_fd)
+        stats.record_hold(time.monotonic() - held_since)
+
+
+def snapshot():
+    """Host-wide slot and queue usage plus this worker's counters."""
+    if fcntl is None:
+        return {'enabled': False}
+    directory = lock_dir()
+    return {
+        'enabled': True,
+        'slots': slot_count(),
+        'running': _count_locked(directory / 'slots', 'slot-', slot_count()),
+        'queue_size': getattr(settings, 'EXECUTION_QUEUE_SIZE', 32),
+        'queue_depth': queue_depth(),
+        'admitted_requests': _count_locked(directory / 'tickets', 'ticket-', ticket_count()),
+        'worker': stats.snapshot(),
+    }
@@ -0,0 +1,102 @@
+"""
+Compact positional encoding of MCQ answers.
+
+An exam's questions are frozen into an AnswerLayout (an ordered list of
+question ids). Answers are then one byte per position: 0 for unanswered,
+1-4 for options A-D. A 50 question submission is 50 bytes instead of a
+~700 byte JSON object, and rows can be stacked into an (n, q) uint8
+matrix so grading and item analysis become array comparisons.
+"""
+import numpy as np
+
+OPTIONS = ['A', 'B', 'C', 'D']
+OPTION_CODES = {option: code for code, option in enumerate(OPTIONS, start=1)}
+UNANSWERED = 0
+
+
+def pack_answers(answers, question_ids, strict=True):
+    """
+    {str(question_id): 'A'..'D'} -> bytes aligned to question_ids, or None
+    when an answer is not an option letter or its question is not in the
+    layout (such submissions keep the JSON form). With strict=False those
+    answers are dropped instead. Empty answers ('' or None) are packed as
+    unanswered.
+    """
+    positions = {str(question_id): index for index, question_id in enumerate(question_ids)}
+    vector = bytearray(len(question_ids))
+    for question_id, answer in answers.items():
+        if answer is None or answer == '':
+            continue
+        position = positions.get(str(question_id))
+        code = OPTION_CODES.get(answer)
+        if position is None or code is None:
+            if strict:
+                return None
+            continue
+        vector[position] = code
+    return bytes(vector)
+
+
+def unpack_answers(packed, question_ids):
+    """Inverse of pack_answers: the {str(question_id): answer} API shape."""
+    return {
+        str(question_id): OPTIONS[code - 1]
+        for question_id, code in zip(question_ids, bytes(packed))
+        if code != UNANSWERED
+    }
+
+
+def pack_key(answer_key, question_ids):
+    """Answer key as a vector; questions without a valid correct answer get 0 and never match."""
+    return np.array(
+        [OPTION_CODES.get(answer_key.get(str(question_id)), UNANSWERED) for question_id in question_ids],
+        dtype=np.uint8,
+    )
+
+
+def answer_matrix(packed_rows, question_count):
+    """Stack packed answers (all from one layout) into an (n, question_count) uint8 matrix."""
+    if not packed_rows:
+        return np.zeros((0, question_count), dtype=np.uint8)
+    return np.frombuffer(b''.join(bytes(row) for row in packed_rows), dtype=np.uint8).reshape(-1, question_count)
+
+
+def paper_mask(question_ids, papers):
+    """(len(papers), len(question_ids)) bool matrix, True where a layout question is on that row's paper."""
+    positions = {str(question_id): index for index, question_id in enumerate(question_ids)}
+    mask = np.zeros((len(papers), len(question_ids)), dtype=bool)
+    for row, paper in enumerate(papers):
+        mask[row, [positions[str(question_id)] for question_id in paper if str(question_id) in positions]] = True
+    return mask
+
+
+def grade_matrix(matrix, key, mask=None):
+    """
+    Per-row (answered, correct) counts, matching Submission.grade(). Only
+    positions set in mask (see paper_mask) are counted when it is given.
+    """
+    answered = matrix != UNANSWERED
+    if mask is not None:
+        answered &= mask
+    correct = answered & (matrix == key)
+    return answered.sum(axis=1), correct.sum(axis=1)
+
+
+def item_statistics(matrix, key, question_ids):
+    """
+    Per-question difficulty and answer distribution: the share of all
+    students who answered correctly, how many skipped, and the count for
+    each option.
+    """
+    students = matrix.shape[0]
+    correct = ((matrix == key) & (matrix != UNANSWERED)).sum(axis=0)
+    counts = np.stack([(matrix == code).sum(axis=0) for code in range(len(OPTIONS) + 1)])
+    return [
+        {
+            "question": question_id,
+            "correct_rate": round(float(correct[index]) / students, 4) if students else 0.0,
+            "unanswered": int(counts[UNANSWERED, index]),
+            "options": {option: int(counts[code, index]) for option, code in OPTION_CODES.items()},
+        }
+        for index, question_id in enumerate(question_ids)
+    ]
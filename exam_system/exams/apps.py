@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExamsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "exams"
+
+    def ready(self):
+        # Registers the system checks
+        from . import checks
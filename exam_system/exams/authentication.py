@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .renderers import dumps
+
+User = get_user_model()
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of JWTAuthentication.authenticate.
+
+    Token parsing is pure CPU; only the user lookup touches the database,
+    and it goes through the async ORM. Returns None when no token is sent.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    try:
+        user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise InvalidToken("User not found")
+    if not user.is_active:
+        raise InvalidToken("User is inactive")
+    return user
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+class AsyncAPIView(View):
+    """
+    Base for natively async read endpoints served under ASGI.
+
+    GET/HEAD requests are authenticated with the JWT bearer token and must
+    be handled by async methods on the subclass. Other methods can be
+    forwarded to an existing DRF view with ``delegate``.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # Auth is token based, as with DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            try:
+                user = await aauthenticate(request)
+            except (InvalidToken, TokenError) as e:
+                detail = getattr(e, 'detail', str(e))
+                return json_response(detail if isinstance(detail, dict) else {"detail": detail}, status=401)
+            if user is None:
+                return json_response({"detail": "Authentication credentials were not provided."}, status=401)
+            request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+    async def delegate(self, sync_view, request, *args, **kwargs):
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
@@ -0,0 +1,101 @@
+"""
+Content-addressed file store for large coding test case data.
+
+Question.test_cases and Question.correct_output keep small entries inline.
+Entries larger than CASE_STORE_INLINE_LIMIT bytes are written once to
+CASE_STORE_DIR under their SHA-256 and replaced by a reference of the form
+{"$ref": "<sha256>", "size": <bytes>}. Identical data is stored once no
+matter how many questions use it. The judge memory-maps the file and
+streams it to the program's stdin.
+"""
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+REF_KEY = '$ref'
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def get_store_dir():
+    return str(getattr(settings, 'CASE_STORE_DIR', settings.BASE_DIR / 'case_store'))
+
+
+def is_ref(value):
+    return isinstance(value, dict) and isinstance(value.get(REF_KEY), str)
+
+
+def _blob_path(digest):
+    if not _DIGEST_RE.match(digest):
+        raise ValueError(f"Invalid case data reference: {digest!r}")
+    return os.path.join(get_store_dir(), digest[:2], digest)
+
+
+def exists(ref):
+    return os.path.exists(_blob_path(ref[REF_KEY]))
+
+
+def put(data):
+    """Store text or bytes and return its reference. Existing blobs are reused."""
+    if isinstance(data, str):
+        data = data.encode()
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as blob:
+                blob.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return {REF_KEY: digest, 'size': len(data)}
+
+
+def open_file(ref):
+    return open(_blob_path(ref[REF_KEY]), 'rb')
+
+
+def open_buffer(ref):
+    """
+    Return a read-only buffer over the referenced blob: an mmap, or b''
+    for empty blobs (which cannot be mapped). Close mmaps when done.
+    """
+    with open_file(ref) as blob:
+        if os.fstat(blob.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(blob.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_text(ref):
+    buffer = open_buffer(ref)
+    try:
+        return bytes(buffer).decode(errors='replace')
+    finally:
+        if isinstance(buffer, mmap.mmap):
+            buffer.close()
+
+
+def digest_of(value):
+    """SHA-256 of a case entry without reading referenced blobs."""
+    if is_ref(value):
+        return value[REF_KEY]
+    return hashlib.sha256(str(value).encode()).hexdigest()
+
+
+def externalize(values):
+    """Replace entries larger than the inline limit with references."""
+    limit = getattr(settings, 'CASE_STORE_INLINE_LIMIT', 4096)
+    externalized = []
+    for value in values or []:
+        if isinstance(value, str) and len(value.encode()) > limit:
+            value = put(value)
+        externalized.append(value)
+    return externalized
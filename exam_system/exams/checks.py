@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Caches that keep separate data in each worker process
+PER_PROCESS_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@register()
+def check_live_stats_cache(app_configs, **kwargs):
+    """Live stats counters must be shared by every worker process."""
+    if not getattr(settings, 'LIVE_STATS_ENABLED', False):
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [
+        Error(
+            'LIVE_STATS_ENABLED needs a cache shared by all worker processes.',
+            hint=(
+                f'The default cache is {backend}, so each process would count '
+                'on its own. Configure Redis or Memcached in CACHES, or silence '
+                'exams.E001 when serving from a single process.'
+            ),
+            id='exams.E001',
+        )
+    ]
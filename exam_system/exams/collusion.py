@@ -0,0 +1,151 @@
+"""
+Answer-copying screen for MCQ exams.
+
+Students are split into COLLUSION_SCORE_BANDS bands by number correct, and
+for each band and question the share of each response (blank, A-D) gives
+the chance that a student of that ability picks it. If student i answered
+independently of j, the number of questions where i's response equals j's
+has mean sum_q P_i(x_jq) and variance sum_q P_i(x_jq) * (1 - P_i(x_jq)).
+A match on a popular correct answer is expected; a match on a rarely
+chosen wrong option is strong evidence. Each pair's z is the larger of
+the two directions (with a continuity correction), reported as surprise =
+-log10 of the one-sided normal tail probability.
+
+Matches, expectations and variances are matrix products of (n, 5q)
+one-hot responses and per-student probabilities, computed in blocks of
+COLLUSION_BLOCK_SIZE rows, so memory stays at a few block x n float32
+matrices. 5,000 students (12.5M pairs) take a few seconds.
+"""
+import heapq
+import math
+
+import numpy as np
+from django.conf import settings
+
+from .answer_codec import OPTIONS, UNANSWERED, pack_key
+from .grading import exam_answer_matrix
+
+RESPONSES = len(OPTIONS) + 1  # blank, A-D
+LOG10_SQRT_2PI = math.log10(math.sqrt(2 * math.pi))
+
+
+def surprise(z):
+    """-log10 of the standard normal upper tail at z."""
+    p = 0.5 * math.erfc(z / math.sqrt(2))
+    if p > 0:
+        return -math.log10(p)
+    # Far in the tail erfc underflows; use its asymptotic form
+    return z * z / 2 / math.log(10) + math.log10(z) + LOG10_SQRT_2PI
+
+
+def response_model(matrix, key, bands=None):
+    """
+    (responses, probabilities): each student's one-hot responses and the
+    chance of each response given their score band, both (n, 5q) with
+    column q * 5 + response.
+    """
+    students, questions = matrix.shape
+    bands = bands or getattr(settings, 'COLLUSION_SCORE_BANDS', 10)
+    bands = max(1, min(bands, students // 20))
+    correct = ((matrix == key) & (matrix != UNANSWERED)).sum(axis=1)
+    band = np.empty(students, dtype=np.intp)
+    band[np.argsort(correct, kind='stable')] = np.arange(students) * bands // max(students, 1)
+
+    responses = (matrix[:, :, None] == np.arange(RESPONSES, dtype=np.uint8)).reshape(students, questions * RESPONSES).astype(np.float32)
+    counts = np.stack([responses[band == index].sum(axis=0) for index in range(bands)]).reshape(bands, questions, RESPONSES)
+    # A little smoothing so a response no one else in the band chose is unlikely, not impossible
+    counts += 0.5
+    probabilities = (counts / counts.sum(axis=2, keepdims=True)).reshape(bands, -1).astype(np.float32)
+    return responses, probabilities[band]
+
+
+def collusion_pairs(matrix, key, limit=50, min_shared_wrong=None, block_size=None):
+    """
+    The limit most surprising pairs (i < j, row indices of matrix) with at
+    least min_shared_wrong identical wrong answers, most surprising first.
+    """
+    if min_shared_wrong is None:
+        min_shared_wrong = getattr(settings, 'COLLUSION_MIN_SHARED_WRONG', 3)
+    block_size = block_size or getattr(settings, 'COLLUSION_BLOCK_SIZE', 1024)
+    students = matrix.shape[0]
+    if students < 2:
+        return []
+    responses, probabilities = response_model(matrix, key)
+    variances = probabilities * (1 - probabilities)
+    codes = np.arange(RESPONSES)[None, :]
+    wrong_columns = (codes != UNANSWERED) & (codes != key[:, None]) & (key[:, None] != UNANSWERED)
+    wrong_responses = responses * wrong_columns.reshape(-1).astype(np.float32)
+
+    responses_t = np.ascontiguousarray(responses.T)
+    probabilities_t = np.ascontiguousarray(probabilities.T)
+    variances_t = np.ascontiguousarray(variances.T)
+    wrong_t = np.ascontiguousarray(wrong_responses.T)
+    columns = np.arange(students)
+
+    best = []  # min-heap of (z, i, j)
+    for start in range(0, students, block_size):
+        stop = min(start + block_size, students)
+        block = slice(start, stop)
+        shared_wrong = wrong_responses[block] @ wrong_t
+        matches = responses[block] @ responses_t
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Block rows as the copier, then as the source
+            z = (matches - probabilities[block] @ responses_t - 0.5) / np.sqrt(variances[block] @ responses_t)
+            np.fmax(z, (matches - responses[block] @ probabilities_t - 0.5) / np.sqrt(responses[block] @ variances_t), out=z)
+        # Each pair once, above the diagonal, and only with enough shared wrong answers
+        z[(columns <= np.arange(start, stop)[:, None]) | (shared_wrong < min_shared_wrong) | np.isnan(z)] = -np.inf
+
+        flat = z.ravel()
+        top = min(limit, flat.size)
+        candidates = np.argpartition(flat, -top)[-top:]
+        for position in candidates[np.isfinite(flat[candidates])]:
+            entry = (float(flat[position]), start + int(position) // students, int(position) % students)
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+
+    wrong = (matrix != UNANSWERED) & (key != UNANSWERED) & (matrix != key)
+    pair_count = students * (students - 1) // 2
+    results = []
+    for z, i, j in sorted(best, reverse=True):
+        score = surprise(z)
+        # The expectation of the direction that gave z
+        matches = float(responses[i] @ responses[j])
+        _, expected = max(
+            ((matches - mean - 0.5) / math.sqrt(variance) if variance > 0 else -math.inf, mean)
+            for mean, variance in (
+                (float(probabilities[copier] @ responses[source]), float(variances[copier] @ responses[source]))
+                for copier, source in ((i, j), (j, i))
+            )
+        )
+        results.append({
+            "first": i,
+            "second": j,
+            "identical_responses": int((matrix[i] == matrix[j]).sum()),
+            "expected_identical": round(expected, 2),
+            "both_wrong": int((wrong[i] & wrong[j]).sum()),
+            "shared_wrong": int((wrong[i] & (matrix[i] == matrix[j])).sum()),
+            "z": round(z, 2),
+            "surprise": round(score, 2),
+            # Pairs this surprising expected among all pairs of independent students
+            "expected_by_chance": float(f'{pair_count * 10 ** -score:.3g}'),
+        })
+    return results
+
+
+def collusion_report(exam, limit=50, min_shared_wrong=None):
+    """Most surprising answer-sharing pairs among the exam's submissions."""
+    layout, rows, matrix = exam_answer_matrix(exam, fields=('id', 'user_id', 'user__username'))
+    key = pack_key(exam.answer_key(), layout.question_ids)
+    pairs = collusion_pairs(matrix, key, limit, min_shared_wrong)
+    for pair in pairs:
+        for side in ('first', 'second'):
+            submission, user, username = rows[pair[side]]
+            pair[side] = {"submission": submission, "user": user, "username": username}
+    return {
+        "submissions": matrix.shape[0],
+        "questions": matrix.shape[1],
+        "layout_version": layout.version,
+        "pairs": pairs,
+    }
@@ -0,0 +1,154 @@
+"""
+Incremental comparison of a program's stdout against the expected output.
+
+The judge feeds stdout to an OutputComparator chunk by chunk as it is
+read, so a run is decided without holding its whole output in memory,
+and a wrong answer is detected (and the program killed) at the first
+difference. Expected outputs may be case store references; they are
+memory-mapped rather than read.
+
+Modes, set per question:
+
+- exact: byte-for-byte, ignoring leading and trailing whitespace of the
+  whole output (the judge's original ``strip() ==`` rule)
+- whitespace: the outputs have the same whitespace-separated tokens
+- float: as whitespace, but numeric tokens match within a tolerance
+"""
+import math
+import mmap
+import re
+
+from . import case_store
+
+EXACT = 'exact'
+WHITESPACE = 'whitespace'
+FLOAT = 'float'
+
+COMPARISON_CHOICES = [
+    (EXACT, 'Exact (ignoring surrounding whitespace)'),
+    (WHITESPACE, 'Whitespace-insensitive'),
+    (FLOAT, 'Float tolerance'),
+]
+
+_TOKEN = re.compile(rb'\S+')
+_TRAILING_TOKEN = re.compile(rb'\S+\Z')
+_FIRST_CONTENT = re.compile(rb'\S')
+
+
+class OutputComparator:
+    """
+    Feed stdout chunks with ``feed``; it returns False as soon as the output
+    can no longer match. Call ``finish`` once stdout is closed for the verdict.
+    """
+
+    def __init__(self, expected, mode=EXACT, tolerance=1e-6):
+        if mode not in (EXACT, WHITESPACE, FLOAT):
+            raise ValueError(f"Unknown comparison mode: {mode!r}")
+        self.mode = mode
+        self.tolerance = tolerance
+        if case_store.is_ref(expected):
+            self._expected = case_store.open_buffer(expected)
+        else:
+            self._expected = str(expected).encode()
+        self.mismatch = False
+
+        if mode == EXACT:
+            match = _FIRST_CONTENT.search(self._expected)
+            self._position = match.start() if match else len(self._expected)
+            self._end = len(self._expected)
+            while self._end > self._position and self._expected[self._end - 1:self._end].isspace():
+                self._end -= 1
+            self._started = False
+            self._pending = b''
+        else:
+            self._expected_tokens = _TOKEN.finditer(self._expected)
+            self._carry = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self._expected, mmap.mmap):
+            # Drop the token iterator first; it holds a reference to the map
+            self._expected_tokens = None
+            self._expected.close()
+
+    def feed(self, chunk):
+        if self.mismatch:
+            return False
+        if self.mode == EXACT:
+            self._feed_exact(chunk)
+        else:
+            for token in self._complete_tokens(chunk):
+                if not self._match_token(token):
+                    break
+        return not self.mismatch
+
+    def finish(self):
+        if self.mismatch:
+            return False
+        if self.mode == EXACT:
+            return self._position == self._end
+        if self._carry and not self._match_token(bytes(self._carry)):
+            return False
+        self._carry = bytearray()
+        return next(self._expected_tokens, None) is None
+
+    def _feed_exact(self, chunk):
+        if not self._started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return
+            self._started = True
+        content = chunk.rstrip()
+        trailing = chunk[len(content):]
+        if not content:
+            # Whitespace only matters once more content follows it
+            self._pending += trailing
+            return
+        piece = self._pending + content
+        end = self._position + len(piece)
+        if end > self._end or self._expected[self._position:end] != piece:
+            self.mismatch = True
+            return
+        self._position = end
+        self._pending = trailing
+
+    def _complete_tokens(self, chunk):
+        # A token may continue in the next chunk, so the trailing one is carried over
+        match = _TRAILING_TOKEN.search(chunk)
+        if match and match.start() == 0:
+            self._carry += chunk
+            return []
+        head, tail = (chunk[:match.start()], chunk[match.start():]) if match else (chunk, b'')
+        tokens = (bytes(self._carry) + head).split()
+        self._carry = bytearray(tail)
+        return tokens
+
+    def _match_token(self, token):
+        expected = next(self._expected_tokens, None)
+        if expected is None or not self._tokens_equal(token, expected.group()):
+            self.mismatch = True
+            return False
+        return True
+
+    def _tokens_equal(self, actual, expected):
+        if actual == expected:
+            return True
+        if self.mode != FLOAT:
+            return False
+        try:
+            return math.isclose(float(actual), float(expected), rel_tol=self.tolerance, abs_tol=self.tolerance)
+        except ValueError:
+            return False
+
+
+def get_comparison(question=None):
+    """(mode, tolerance) for a question; exact comparison when none is given."""
+    return (
+        getattr(question, 'output_comparison', None) or EXACT,
+        getattr(question, 'float_tolerance', None) or 1e-6,
+    )
@@ -0,0 +1,139 @@
+"""
+Response compression negotiated per request from Accept-Encoding.
+
+Encodings are tried in RESPONSE_COMPRESSION_ENCODINGS order; brotli ('br')
+is only offered when the brotli package is installed. Buffered responses
+smaller than RESPONSE_COMPRESSION_MIN_BYTES, or that would not get
+smaller, are sent as they are.
+
+Streamed responses are compressed as they are produced. Live streams
+(NDJSON progress and execution events) are flushed after every chunk so
+each event still reaches the client immediately; downloads (responses
+with a Content-Disposition) are flushed every STREAM_FLUSH_BYTES of input
+instead, since flushing per CSV row would undo most of the compression.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+STREAM_FLUSH_BYTES = 64 * 1024
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+accept_encoding_re = _lazy_re_compile(r'\s*([^\s;,]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?')
+
+
+def available_encodings():
+    encodings = getattr(settings, 'RESPONSE_COMPRESSION_ENCODINGS', ['br', 'gzip'])
+    return [encoding for encoding in encodings if encoding == 'gzip' or (encoding == 'br' and brotli is not None)]
+
+
+def negotiate_encoding(accept_encoding):
+    """The first configured encoding the client accepts with q > 0, or None."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = accept_encoding_re.match(part)
+        if not match:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    for encoding in available_encodings():
+        if weights.get(encoding, weights.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def compressor(encoding):
+    """(compress, flush, finish) callables for one stream."""
+    if encoding == 'br':
+        stream = brotli.Compressor(quality=getattr(settings, 'BROTLI_QUALITY', 4))
+        return stream.process, stream.flush, stream.finish
+    stream = zlib.compressobj(getattr(settings, 'GZIP_LEVEL', 6), zlib.DEFLATED, GZIP_WBITS)
+    return stream.compress, lambda: stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+
+
+def compress_bytes(data, encoding):
+    compress, _, finish = compressor(encoding)
+    return compress(data) + finish()
+
+
+def _stream_pieces(encoding, flush_each):
+    compress, flush, finish = compressor(encoding)
+    pending = 0
+
+    def piece(chunk):
+        nonlocal pending
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        output = compress(chunk)
+        pending += len(chunk)
+        if flush_each or pending >= STREAM_FLUSH_BYTES:
+            output += flush()
+            pending = 0
+        return output
+
+    return piece, finish
+
+
+def compress_stream(chunks, encoding, flush_each):
+    piece, finish = _stream_pieces(encoding, flush_each)
+    for chunk in chunks:
+        output = piece(chunk)
+        if output:
+            yield output
+    yield finish()
+
+
+async def acompress_stream(chunks, encoding, flush_each):
+    piece, finish = _stream_pieces(encoding, flush_each)
+    async for chunk in chunks:
+        output = piece(chunk)
+        if output:
+            yield output
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            flush_each = not response.has_header('Content-Disposition')
+            if response.is_async:
+                response.streaming_content = acompress_stream(response.streaming_content, encoding, flush_each)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding, flush_each)
+            # The length of the compressed stream is not known up front
+            response.headers.pop('Content-Length', None)
+        else:
+            compressed = compress_bytes(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,110 @@
+"""
+Read replica routing for analytics, dashboard and export reads.
+
+Nothing is routed unless DATABASES has an entry named READ_REPLICA_DATABASE.
+Views opt in with the @replica_reads decorator; every other query, and any
+query inside a transaction, goes to the primary as before.
+
+Replicas lag behind the primary, so after a user's successful write
+(any non-GET request) ReplicaPinMiddleware pins that user to the primary
+for REPLICA_PIN_SECONDS. A student who just submitted an exam therefore
+sees it on their dashboard. Pins are kept in Django's cache; with more
+than one worker process configure a shared cache (Redis, Memcached or the
+database cache), or a pin made by one worker is not seen by the others.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The database the current request's reads may use, when it is not the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_alias():
+    """The replica's alias, or None when no replica is configured."""
+    alias = getattr(settings, 'READ_REPLICA_DATABASE', 'replica')
+    return alias if alias in connections.databases else None
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user):
+    cache.set(_pin_key(user.id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned(user):
+    return bool(user.is_authenticated and cache.get(_pin_key(user.id)))
+
+
+def read_alias_for(user):
+    """Where this user's read-only queries should go: the replica unless they wrote recently."""
+    alias = replica_alias()
+    if alias is None or is_pinned(user):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def reads_from(alias):
+    token = _read_alias.set(alias if alias != DEFAULT_DB_ALIAS else None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def replica_reads(method):
+    """Run a view method's reads on the replica (unless the user is pinned)."""
+    if iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, request, *args, **kwargs):
+            alias = await sync_to_async(read_alias_for)(request.user)
+            with reads_from(alias):
+                return await method(self, request, *args, **kwargs)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            with reads_from(read_alias_for(request.user)):
+                return method(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # Reads inside a transaction must see its writes
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication
+        return db != replica_alias()
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400 or replica_alias() is None:
+            return response
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user)
+        return response
@@ -0,0 +1,128 @@
+"""
+In-process cache of code execution results.
+
+Entries are keyed by (language, toolchain version, code hash, stdin hash)
+so re-running unchanged code, or grading byte-identical submissions,
+returns the stored result without starting a subprocess.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .case_store import digest_of
+
+TOOLCHAIN_VERSION_COMMANDS = {
+    'python': ['python', '--version'],
+    'java': ['javac', '-version'],
+    'c': ['gcc', '--version'],
+}
+
+
+_toolchain_versions = {}
+
+
+async def _read_toolchain_version(command):
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+    except OSError:
+        return 'unknown'
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=10)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return 'unknown'
+    lines = stdout.decode(errors='replace').strip().splitlines()
+    return lines[0] if lines else 'unknown'
+
+
+async def toolchain_version(language):
+    """First line of the compiler/interpreter version banner, looked up once per process."""
+    version = _toolchain_versions.get(language)
+    if version is None:
+        command = TOOLCHAIN_VERSION_COMMANDS.get(language)
+        version = await _read_toolchain_version(command) if command else 'unknown'
+        _toolchain_versions[language] = version
+    return version
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def cache_key(language, version, code, stdin, limits=None, verdict=None):
+    """Key for a run of code on stdin; version is toolchain_version(language)."""
+    # Limits are part of the key: the same program can pass under one limit and fail under another
+    limits_key = tuple(sorted(limits.items())) if limits else ()
+    # Stored test cases are keyed by their content hash, so the blob is never read here
+    key = (language, version, _digest(code), digest_of(stdin), limits_key)
+    # Compared runs also depend on the expected output and comparison mode
+    return key + (verdict,) if verdict is not None else key
+
+
+class ExecutionCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and hit/miss counters.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+execution_cache = ExecutionCache(
+    max_entries=getattr(settings, 'EXECUTION_CACHE_MAX_ENTRIES', 2048),
+    ttl=getattr(settings, 'EXECUTION_CACHE_TTL', 600),
+)
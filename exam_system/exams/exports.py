@@ -0,0 +1,117 @@
+"""
+Streaming CSV / JSONL exports for staff.
+
+Rows are read with values_list(...).iterator(), which uses a server-side
+cursor on PostgreSQL and fetches EXPORT_CHUNK_SIZE rows at a time, and
+are encoded one line at a time. No model instances or serializers are
+involved, so memory use does not grow with the number of submissions.
+
+The generators run after the view has returned, so the database to read
+from is passed in explicitly (see db_router.read_alias_for).
+"""
+import csv
+import json
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+from .answer_codec import unpack_answers
+from .models import AnswerLayout, Exam, Submission
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+SUBMISSION_FIELDS = [
+    'id', 'user_id', 'user__username', 'score', 'correct_answers', 'total_questions',
+    'percentage', 'time_taken', 'submitted_at', 'answers',
+]
+SUBMISSION_COLUMNS = [
+    'submission_id', 'user_id', 'username', 'score', 'correct_answers', 'total_questions',
+    'percentage', 'time_taken', 'submitted_at', 'answers',
+]
+
+
+def _chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+class _Echo:
+    """File-like object for csv.writer that returns each line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(header, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(records):
+    for record in records:
+        yield json.dumps(record, default=str, separators=(',', ':')) + '\n'
+
+
+def iter_submission_export(exam_id, export_format, using=None):
+    layouts = dict(AnswerLayout.objects.using(using).filter(exam_id=exam_id).values_list('id', 'question_ids'))
+    raw_rows = (
+        Submission.objects.using(using).filter(exam_id=exam_id)
+        .order_by('id')
+        .values_list(*SUBMISSION_FIELDS, 'packed_answers', 'answer_layout_id')
+        .iterator(chunk_size=_chunk_size())
+    )
+    # Both formats write submitted_at as ISO 8601; compact submissions are
+    # exported with their answers in the usual shape
+    rows = (
+        (
+            *row[:-4],
+            row[-4].isoformat() if row[-4] else None,
+            unpack_answers(row[-2], layouts[row[-1]]) if row[-2] is not None else row[-3],
+        )
+        for row in raw_rows
+    )
+    if export_format == 'csv':
+        return _csv_lines(
+            SUBMISSION_COLUMNS,
+            ((*row[:-2], row[-2] or '', json.dumps(row[-1])) for row in rows),
+        )
+    return _jsonl_lines(dict(zip(SUBMISSION_COLUMNS, row)) for row in rows)
+
+
+def iter_gradebook_export(export_format, using=None):
+    """
+    One row per student with their percentage in every exam (blank when
+    not taken). A single LEFT JOIN ordered by student is grouped on the
+    fly, so each row is emitted as soon as the student's submissions end.
+    """
+    exams = list(Exam.objects.using(using).order_by('id').values_list('id', 'title'))
+    rows = (
+        User.objects.using(using).filter(is_staff=False)
+        .order_by('id')
+        .values_list('id', 'username', 'submission__exam_id', 'submission__percentage')
+        .iterator(chunk_size=_chunk_size())
+    )
+
+    def students():
+        for (user_id, username), submissions in groupby(rows, key=lambda row: row[:2]):
+            yield user_id, username, {
+                exam_id: percentage for _, _, exam_id, percentage in submissions if exam_id is not None
+            }
+
+    if export_format == 'csv':
+        return _csv_lines(
+            ['user_id', 'username', *(f'{title} ({exam_id})' for exam_id, title in exams)],
+            (
+                (user_id, username, *(scores.get(exam_id, '') for exam_id, _ in exams))
+                for user_id, username, scores in students()
+            ),
+        )
+    return _jsonl_lines(
+        {'user_id': user_id, 'username': username, 'scores': scores}
+        for user_id, username, scores in students()
+    )
@@ -0,0 +1,185 @@
+"""
+Append-only archive of proctoring frames, one directory per exam session.
+
+    <PROCTORING_ARCHIVE_DIR>/exam-<exam_id>/user-<user_id>/
+        index.bin          fixed-size records: timestamp ms, segment, offset, length
+        segment-0000.bin   JPEG frames back to back
+        segment-0001.bin   started once a segment reaches PROCTORING_SEGMENT_BYTES
+
+A three hour session at four frames a minute is two or three files instead
+of 720. Frames are appended in timestamp order, so the frame shown at a
+given time is found by binary search over the index (24 bytes per frame,
+about 17 KB for such a session) and read with a single seek.
+
+Before storing, frames are downscaled to PROCTORING_FRAME_MAX_WIDTH and
+re-encoded at PROCTORING_JPEG_QUALITY (optionally in grayscale). Retention
+drops whole session directories, so eviction never rewrites data.
+"""
+import os
+import shutil
+import struct
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+INDEX_RECORD = struct.Struct('<qIQI')  # timestamp_ms, segment, offset, length
+INDEX_NAME = 'index.bin'
+
+
+def archive_dir():
+    return Path(getattr(settings, 'PROCTORING_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'proctoring'))
+
+
+def session_dir(exam_id, user_id):
+    return archive_dir() / f'exam-{int(exam_id)}' / f'user-{int(user_id)}'
+
+
+def _segment_path(directory, segment):
+    return directory / f'segment-{segment:04d}.bin'
+
+
+def recompress(image_bytes):
+    """
+    Downscale and re-encode an uploaded frame as configured. Returns None if
+    the upload is not a decodable image.
+    """
+    grayscale = getattr(settings, 'PROCTORING_FRAME_GRAYSCALE', False)
+    image = cv2.imdecode(
+        np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    )
+    if image is None:
+        return None
+    max_width = getattr(settings, 'PROCTORING_FRAME_MAX_WIDTH', 320)
+    height, width = image.shape[:2]
+    if max_width and width > max_width:
+        image = cv2.resize(image, (max_width, max(1, round(height * max_width / width))), interpolation=cv2.INTER_AREA)
+    ok, encoded = cv2.imencode(
+        '.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, getattr(settings, 'PROCTORING_JPEG_QUALITY', 60)]
+    )
+    return encoded.tobytes() if ok else None
+
+
+def _read_index(directory):
+    try:
+        index = (directory / INDEX_NAME).read_bytes()
+    except FileNotFoundError:
+        return b''
+    # Ignore a record cut short by a crash mid-append
+    return index[: len(index) - len(index) % INDEX_RECORD.size]
+
+
+def _record(index, position):
+    return INDEX_RECORD.unpack_from(index, position * INDEX_RECORD.size)
+
+
+def append_frame(exam_id, user_id, frame, timestamp_ms=None):
+    """
+    Append an already recompressed frame to the session and return its
+    timestamp. Timestamps are kept strictly increasing within a session.
+    """
+    directory = session_dir(exam_id, user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    timestamp_ms = int(time.time() * 1000) if timestamp_ms is None else int(timestamp_ms)
+    segment_limit = getattr(settings, 'PROCTORING_SEGMENT_BYTES', 64 * 1024 * 1024)
+
+    with open(directory / INDEX_NAME, 'ab') as index_file:
+        # One writer per session at a time, across processes
+        if fcntl is not None:
+            fcntl.flock(index_file.fileno(), fcntl.LOCK_EX)
+        size = os.fstat(index_file.fileno()).st_size
+        segment = 0
+        if size >= INDEX_RECORD.size:
+            with open(directory / INDEX_NAME, 'rb') as reader:
+                reader.seek(size - size % INDEX_RECORD.size - INDEX_RECORD.size)
+                last_timestamp, segment, _, _ = INDEX_RECORD.unpack(reader.read(INDEX_RECORD.size))
+            timestamp_ms = max(timestamp_ms, last_timestamp + 1)
+        segment_path = _segment_path(directory, segment)
+        if segment_path.exists() and segment_path.stat().st_size + len(frame) > segment_limit:
+            segment += 1
+            segment_path = _segment_path(directory, segment)
+        with open(segment_path, 'ab') as segment_file:
+            offset = segment_file.seek(0, os.SEEK_END)
+            segment_file.write(frame)
+        # The index record is written last, so readers never see a frame that is not fully stored
+        index_file.write(INDEX_RECORD.pack(timestamp_ms, segment, offset, len(frame)))
+    return timestamp_ms
+
+
+def frame_count(exam_id, user_id):
+    return len(_read_index(session_dir(exam_id, user_id))) // INDEX_RECORD.size
+
+
+def list_frames(exam_id, user_id, start_ms=None, end_ms=None):
+    """[(timestamp_ms, size)] of the session's frames within [start_ms, end_ms]."""
+    index = _read_index(session_dir(exam_id, user_id))
+    count = len(index) // INDEX_RECORD.size
+    first = 0 if start_ms is None else _bisect(index, count, start_ms)
+    frames = []
+    for position in range(first, count):
+        timestamp_ms, _, _, length = _record(index, position)
+        if end_ms is not None and timestamp_ms > end_ms:
+            break
+        frames.append((timestamp_ms, length))
+    return frames
+
+
+def _bisect(index, count, timestamp_ms):
+    """Position of the first record with a timestamp >= timestamp_ms."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if _record(index, middle)[0] < timestamp_ms:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def read_frame(exam_id, user_id, timestamp_ms):
+    """
+    (timestamp_ms, JPEG bytes) of the frame on screen at timestamp_ms, i.e.
+    the last one taken at or before it, or None.
+    """
+    directory = session_dir(exam_id, user_id)
+    index = _read_index(directory)
+    count = len(index) // INDEX_RECORD.size
+    position = _bisect(index, count, int(timestamp_ms) + 1) - 1
+    if position < 0:
+        return None
+    frame_timestamp, segment, offset, length = _record(index, position)
+    with open(_segment_path(directory, segment), 'rb') as segment_file:
+        segment_file.seek(offset)
+        return frame_timestamp, segment_file.read(length)
+
+
+def evict_expired(retention_days=None, now=None):
+    """
+    Delete sessions with no frame stored in the last retention_days
+    (PROCTORING_RETENTION_DAYS). Returns (sessions removed, bytes freed).
+    """
+    retention_days = retention_days if retention_days is not None else getattr(settings, 'PROCTORING_RETENTION_DAYS', 30)
+    cutoff = (now or time.time()) - retention_days * 86400
+    removed = freed = 0
+    root = archive_dir()
+    if not root.exists():
+        return removed, freed
+    for exam_dir in root.glob('exam-*'):
+        for directory in exam_dir.glob('user-*'):
+            index_path = directory / INDEX_NAME
+            last_write = index_path.stat().st_mtime if index_path.exists() else directory.stat().st_mtime
+            if last_write >= cutoff:
+                continue
+            freed += sum(path.stat().st_size for path in directory.iterdir())
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+        if not any(exam_dir.iterdir()):
+            exam_dir.rmdir()
+    return removed, freed
@@ -0,0 +1,149 @@
+"""
+Bulk re-grading of MCQ submissions after an answer key changes.
+
+The exam's answer key is loaded once. Submissions are read in id-ordered
+batches (keyset pagination, so each batch is one indexed query whatever
+the table size) with only the columns grading needs, scored in memory
+with Submission.grade(). Rows whose result changed are written back with
+one UPDATE ... WHERE id IN (...) per distinct (total, correct, score,
+percentage) tuple. An exam has few distinct outcomes, so this is a handful
+of statements per batch. bulk_update's per-row CASE expressions were
+about 25x slower at 100k rows.
+
+Compact (packed) submissions are graded a layout at a time as one matrix
+comparison against the packed answer key.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import live_stats
+from .answer_codec import answer_matrix, grade_matrix, item_statistics, pack_answers, pack_key, paper_mask, unpack_answers
+from .models import AnswerLayout, ExamAttempt, Submission, graded_questions
+
+GRADE_FIELDS = ['total_questions', 'correct_answers', 'score', 'percentage']
+
+
+def iter_regrade(exam, question_id=None, batch_size=None):
+    """
+    Re-grade the exam's submissions, or only those that answered
+    question_id, yielding a progress dict after every batch:
+    {"processed", "updated", "total"}.
+    """
+    batch_size = batch_size or getattr(settings, 'REGRADE_BATCH_SIZE', 2000)
+    answer_key = exam.answer_key()
+    # Store the layout of the exam's current questions for the read-only reports
+    AnswerLayout.current(exam)
+
+    submissions = Submission.objects.filter(exam=exam)
+    if question_id is not None:
+        # Packed rows cannot be filtered by question in SQL; unaffected ones are left unchanged
+        submissions = submissions.filter(Q(answers__has_key=str(question_id)) | Q(packed_answers__isnull=False))
+    total = submissions.count()
+    layouts = {}
+
+    def layout_key(layout_id):
+        if layout_id not in layouts:
+            question_ids = AnswerLayout.objects.values_list('question_ids', flat=True).get(id=layout_id)
+            layouts[layout_id] = (question_ids, pack_key(answer_key, question_ids))
+        return layouts[layout_id]
+
+    processed = updated = 0
+    last_id = 0
+    while True:
+        batch = list(
+            submissions.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'user', 'answers', 'packed_answers', 'answer_layout', *GRADE_FIELDS)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        before = {submission.id: tuple(getattr(submission, field) for field in GRADE_FIELDS) for submission in batch}
+        # Each student is graded on the questions of their own attempt
+        papers = ExamAttempt.papers(exam, [submission.user_id for submission in batch])
+        packed = defaultdict(list)
+        for submission in batch:
+            if submission.packed_answers is not None:
+                packed[submission.answer_layout_id].append(submission)
+            else:
+                submission.grade(answer_key, papers[submission.user_id])
+        for layout_id, rows in packed.items():
+            question_ids, key = layout_key(layout_id)
+            row_papers = [papers[row.user_id] for row in rows]
+            matrix = answer_matrix([row.packed_answers for row in rows], len(question_ids))
+            _, correct = grade_matrix(matrix, key, paper_mask(question_ids, row_papers))
+            for submission, paper, correct_answers in zip(rows, row_papers, correct.tolist()):
+                submission.set_grade(len(graded_questions(paper, answer_key)), correct_answers)
+
+        changed = defaultdict(list)
+        for submission in batch:
+            after = tuple(getattr(submission, field) for field in GRADE_FIELDS)
+            if after != before[submission.id]:
+                changed[after].append(submission.id)
+        if changed:
+            with transaction.atomic():
+                for values, ids in changed.items():
+                    Submission.objects.filter(id__in=ids).update(**dict(zip(GRADE_FIELDS, values)))
+
+        processed += len(batch)
+        updated += sum(len(ids) for ids in changed.values())
+        yield {"processed": processed, "updated": updated, "total": total}
+    if updated:
+        # Scores changed; the live counters are rebuilt from the table
+        live_stats.reset(exam.id)
+
+
+def regrade(exam, question_id=None, batch_size=None, progress=None):
+    """Run iter_regrade to completion, calling progress(event) per batch; returns the final counts."""
+    result = {"processed": 0, "updated": 0, "total": 0}
+    for result in iter_regrade(exam, question_id, batch_size):
+        if progress is not None:
+            progress(result)
+    return result
+
+
+def exam_answer_matrix(exam, fields=()):
+    """
+    (layout, rows, matrix): every submission of the exam as one row of an
+    (n, questions) uint8 matrix aligned to the exam's current layout, and
+    for each row the values of fields. Answers to removed questions are
+    ignored. Read-only: the layout is not stored if it is new.
+    """
+    layout = AnswerLayout.peek(exam)
+    question_ids = layout.question_ids
+    other_layouts = dict(AnswerLayout.objects.filter(exam=exam).values_list('id', 'question_ids'))
+
+    packed_rows, rows = [], []
+    for answers, packed, layout_id, *values in (
+        Submission.objects.filter(exam=exam)
+        .order_by('id')
+        .values_list('answers', 'packed_answers', 'answer_layout_id', *fields)
+        .iterator(chunk_size=getattr(settings, 'REGRADE_BATCH_SIZE', 2000))
+    ):
+        rows.append(values)
+        if packed is not None and layout_id == layout.id:
+            packed_rows.append(bytes(packed))
+            continue
+        if packed is not None:
+            answers = unpack_answers(packed, other_layouts[layout_id])
+        packed_rows.append(pack_answers(answers, question_ids, strict=False))
+
+    return layout, rows, answer_matrix(packed_rows, len(question_ids))
+
+
+def item_analysis(exam):
+    """
+    Per-question correct rate and option counts over all submissions,
+    computed on one (submissions x questions) matrix aligned to the
+    exam's current layout.
+    """
+    layout, _, matrix = exam_answer_matrix(exam)
+    return {
+        "submissions": matrix.shape[0],
+        "layout_version": layout.version,
+        "questions": item_statistics(matrix, pack_key(exam.answer_key(), layout.question_ids), layout.question_ids),
+    }
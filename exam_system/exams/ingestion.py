@@ -0,0 +1,201 @@
+"""
+Write-behind ingestion for exam submissions.
+
+In ``write_behind`` mode the submission endpoint only validates the payload
+and appends it to a spool directory on local disk, one file per
+(exam, user). ``flush_submission_queue`` later grades each exam's backlog
+against a single answer key and inserts it with ``bulk_create``.
+"""
+import json
+import logging
+import os
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .judge import evaluate_coding_exam
+from .judge_queue import use_judge_queue
+from . import live_stats
+from .models import AnswerLayout, Exam, ExamAttempt, JudgeJob, Submission
+from .similarity import index_new_submission
+
+logger = logging.getLogger(__name__)
+
+
+def is_write_behind():
+    return getattr(settings, 'SUBMISSION_INGESTION_MODE', 'sync') == 'write_behind'
+
+
+def get_spool_dir():
+    return str(getattr(settings, 'SUBMISSION_SPOOL_DIR', settings.BASE_DIR / 'spool' / 'submissions'))
+
+
+_created_spool_dirs = set()
+
+
+def _ensure_spool_dir(spool_dir):
+    # Created on the first enqueue in each process rather than on every call
+    if spool_dir not in _created_spool_dirs:
+        os.makedirs(os.path.join(spool_dir, 'tmp'), exist_ok=True)
+        _created_spool_dirs.add(spool_dir)
+
+
+def _spool_path(spool_dir, exam_id, user_id):
+    return os.path.join(spool_dir, f'{exam_id}-{user_id}.json')
+
+
+def is_queued(exam_id, user_id):
+    return os.path.exists(_spool_path(get_spool_dir(), exam_id, user_id))
+
+
+def _spool_names(spool_dir):
+    try:
+        return os.listdir(spool_dir)
+    except FileNotFoundError:
+        return []
+
+
+def queued_count(exam_id):
+    """Submissions for the exam waiting in the spool."""
+    prefix = f'{exam_id}-'
+    return sum(1 for name in _spool_names(get_spool_dir()) if name.startswith(prefix) and name.endswith('.json'))
+
+
+def enqueue_submission(exam_id, user_id, fields):
+    """
+    Durably queue a submission given its validated serializer fields other
+    than the exam (answers, time_taken). Returns False if one is already
+    queued for this user and exam.
+
+    The entry is written and fsynced under tmp/ and then hard-linked into
+    place, so a crash never leaves a partial file and a second submission
+    for the same (exam, user) fails atomically.
+    """
+    spool_dir = get_spool_dir()
+    _ensure_spool_dir(spool_dir)
+    entry = {
+        'exam': exam_id,
+        'user': user_id,
+        'fields': fields,
+        'submitted_at': timezone.now().isoformat(),
+    }
+    tmp_path = os.path.join(spool_dir, 'tmp', f'{uuid.uuid4().hex}.json')
+    with open(tmp_path, 'w') as tmp_file:
+        json.dump(entry, tmp_file, separators=(',', ':'))
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    try:
+        os.link(tmp_path, _spool_path(spool_dir, exam_id, user_id))
+    except FileExistsError:
+        return False
+    finally:
+        os.unlink(tmp_path)
+
+    dir_fd = os.open(spool_dir, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return True
+
+
+def _read_spool(spool_dir):
+    entries = defaultdict(list)
+    for name in _spool_names(spool_dir):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(spool_dir, name)
+        try:
+            with open(path) as spool_file:
+                entry = json.load(spool_file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Skipping unreadable spool entry {path}: {e}")
+            continue
+        entries[entry['exam']].append((path, entry))
+    return entries
+
+
+def flush_submission_queue(batch_size=None):
+    """
+    Grade and insert every queued submission. Returns the number inserted.
+
+    Entries whose (exam, user) already has a Submission row are dropped, so
+    re-running after a crash between insert and unlink is safe. Coding
+    submissions found that way are graded again, as the crash may have
+    come before they were: in judge queue mode their grade jobs commit
+    with the rows, so only rows without one get a job.
+    """
+    batch_size = batch_size or getattr(settings, 'SUBMISSION_FLUSH_BATCH_SIZE', 500)
+    spool_dir = get_spool_dir()
+    inserted = 0
+
+    for exam_id, queued in _read_spool(spool_dir).items():
+        exam = Exam.objects.filter(id=exam_id).first()
+        if exam is None:
+            logger.warning(f"Dropping {len(queued)} queued submissions for missing exam {exam_id}")
+            for path, _ in queued:
+                os.unlink(path)
+            continue
+
+        answer_key = exam.answer_key()
+        # Also stored without compaction, for the read-only reports
+        layout = AnswerLayout.current(exam)
+        compact = getattr(settings, 'COMPACT_SUBMISSION_ANSWERS', False)
+        user_ids = [entry['user'] for _, entry in queued]
+        papers = ExamAttempt.papers(exam, user_ids) if exam.exam_type != 'CODING' else {}
+        existing = list(Submission.objects.filter(exam=exam, user_id__in=user_ids))
+        already_submitted = {submission.user_id for submission in existing}
+
+        ungraded = []
+        if exam.exam_type == 'CODING':
+            ungraded = existing
+            if use_judge_queue():
+                has_job = set(JudgeJob.objects.filter(
+                    kind=JudgeJob.GRADE, submission__in=existing
+                ).values_list('submission_id', flat=True))
+                ungraded = [submission for submission in existing if submission.id not in has_job]
+
+        submissions = []
+        submitted_at = []
+        for _, entry in queued:
+            if entry['user'] in already_submitted:
+                continue
+            already_submitted.add(entry['user'])
+            submission = Submission(exam=exam, user_id=entry['user'], **entry['fields'])
+            if exam.exam_type != 'CODING':
+                submission.grade(answer_key, papers[entry['user']])
+            if compact:
+                submission.compact(layout)
+            submissions.append(submission)
+            submitted_at.append(parse_datetime(entry['submitted_at']))
+
+        with transaction.atomic():
+            created = Submission.objects.bulk_create(submissions, batch_size=batch_size)
+            # auto_now_add stamps the flush time; restore the time the student submitted
+            for submission, timestamp in zip(created, submitted_at):
+                submission.submitted_at = timestamp
+            Submission.objects.bulk_update(created, ['submitted_at'], batch_size=batch_size)
+            if exam.exam_type == 'CODING' and use_judge_queue():
+                JudgeJob.objects.bulk_create(
+                    [JudgeJob(kind=JudgeJob.GRADE, submission=submission) for submission in ungraded + created],
+                    batch_size=batch_size,
+                )
+
+        if exam.exam_type == 'CODING':
+            for submission in ungraded + created:
+                if not use_judge_queue():
+                    evaluate_coding_exam(exam, submission)
+                index_new_submission(submission)
+        else:
+            live_stats.record_graded(exam.id, [submission.percentage for submission in created])
+
+        for path, _ in queued:
+            os.unlink(path)
+        inserted += len(created)
+        logger.info(f"Flushed {len(created)} submissions for exam {exam_id}")
+
+    return inserted
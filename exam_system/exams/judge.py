@@ -0,0 +1,523 @@
+import asyncio
+import json
+import os
+import platform
+import signal
+import sys
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from . import case_store, live_stats
+from .admission import execution_slot
+from .comparator import OutputComparator, get_comparison
+from .execution_cache import cache_key, execution_cache, toolchain_version
+from .models import ExamAttempt, Question
+
+SANDBOX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sandbox.py')
+
+IS_WINDOWS = platform.system().lower() == "windows"
+
+# Define file extensions and commands for each language. Compiled languages
+# are built once per run; the binary is then executed for every test case.
+LANGUAGE_CONFIG = {
+    'python': {
+        'extension': 'py',
+        'compile': None,
+        'run': lambda file_path: ['python', file_path]
+    },
+    'java': {
+        'extension': 'java',
+        'compile': lambda file_path: ['javac', file_path],
+        'run': lambda file_path: ['java', '-cp', os.path.dirname(file_path), 'Solution']
+    },
+    'c': {
+        'extension': 'c',
+        'compile': lambda file_path: ['gcc', file_path, '-o', _binary_path(file_path)],
+        'run': lambda file_path: [_binary_path(file_path)]
+    }
+}
+
+
+def _binary_path(file_path):
+    return file_path[:-2] + ('.exe' if IS_WINDOWS else '')
+
+
+TIMEOUT_MESSAGE = "Execution timed out."
+# Stdout kept for the result when it is compared as it streams
+OUTPUT_PREVIEW_BYTES = 4096
+OUTPUT_LIMIT_MESSAGE = "Output limit exceeded."
+
+# Grading status for each kind of exceeded limit
+LIMIT_STATUSES = {
+    'time': "Timeout",
+    'memory': "Memory Limit Exceeded",
+    'output': "Output Limit Exceeded",
+}
+
+
+def get_limits(question=None):
+    """
+    Resource limits for a single test case run: the question's own time and
+    memory limits when set, otherwise the JUDGE_* settings.
+    """
+    time_limit = getattr(question, 'time_limit', None) or getattr(settings, 'JUDGE_TIME_LIMIT', 5)
+    memory_limit = getattr(question, 'memory_limit', None) or getattr(settings, 'JUDGE_MEMORY_LIMIT_MB', 256)
+    return {
+        'time_limit': float(time_limit),
+        'memory_limit': int(memory_limit),
+        'max_processes': getattr(settings, 'JUDGE_MAX_PROCESSES', 64),
+        'max_output_bytes': getattr(settings, 'JUDGE_MAX_OUTPUT_BYTES', 1024 * 1024),
+        'max_file_bytes': getattr(settings, 'JUDGE_MAX_FILE_BYTES', 10 * 1024 * 1024),
+    }
+
+
+def get_compile_limits(limits):
+    """Compilers get their own, more generous time and memory budget."""
+    return {
+        **limits,
+        'time_limit': float(getattr(settings, 'JUDGE_COMPILE_TIME_LIMIT', 10)),
+        'memory_limit': max(limits['memory_limit'], getattr(settings, 'JUDGE_COMPILE_MEMORY_LIMIT_MB', 1024)),
+    }
+
+
+def _kill(process):
+    """Kill the process and, on POSIX, everything it spawned (javac, gcc output, ...)."""
+    if process.returncode is not None:
+        return
+    try:
+        if IS_WINDOWS:
+            process.kill()
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def _read_capped(stream, cap, on_overflow):
+    chunks = []
+    size = 0
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            break
+        if size + len(chunk) > cap:
+            chunks.append(chunk[:cap - size])
+            on_overflow()
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+    return b''.join(chunks)
+
+
+async def _read_compared(stream, cap, comparator, on_overflow, on_mismatch):
+    """Feed stdout to the comparator, keeping only a preview of it."""
+    preview = bytearray()
+    size = 0
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            break
+        if size + len(chunk) > cap:
+            on_overflow()
+            break
+        size += len(chunk)
+        if len(preview) < OUTPUT_PREVIEW_BYTES:
+            preview += chunk[:OUTPUT_PREVIEW_BYTES - len(preview)]
+        if not comparator.feed(chunk):
+            on_mismatch()
+            break
+    return bytes(preview)
+
+
+FEED_CHUNK_BYTES = 64 * 1024
+
+
+def _open_stdin(stdin):
+    """Bytes-like stdin for a test case; stored cases are memory-mapped, not read."""
+    if case_store.is_ref(stdin):
+        return case_store.open_buffer(stdin)
+    return stdin.encode() if isinstance(stdin, str) else stdin
+
+
+async def _feed(process, data):
+    try:
+        # Chunked so a large mapped input never needs a full copy in memory
+        for offset in range(0, len(data), FEED_CHUNK_BYTES):
+            process.stdin.write(data[offset:offset + FEED_CHUNK_BYTES])
+            await process.stdin.drain()
+        process.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        # The program exited without reading all of its input
+        pass
+
+
+def _sandboxed(command, limits, stats_fd, language):
+    sandbox_limits = {
+        'cpu_seconds': limits['time_limit'],
+        # The JVM reserves far more address space than it uses; it gets -Xmx instead
+        'address_space_bytes': None if language == 'java' else limits['memory_limit'] * 1024 * 1024,
+        'max_processes': limits['max_processes'],
+        'max_file_bytes': limits['max_file_bytes'],
+    }
+    return [sys.executable, SANDBOX_PATH, json.dumps(sandbox_limits), str(stats_fd), *command]
+
+
+async def run_process(command, stdin, cwd, limits, language=None, comparator=None):
+    """
+    Run a command under the given limits without blocking the event loop.
+
+    stdin is a string, bytes, or a case store reference, which is streamed
+    from its memory-mapped blob.
+
+    With a comparator, stdout is compared as it is read instead of being
+    collected: the result gets "passed", "output" is only a preview, and
+    the program is killed at the first mismatch.
+
+    Returns a dict with output, error, return_code, cpu_time, wall_time,
+    max_rss_kb and limit_exceeded ('time', 'memory', 'output' or None).
+    On POSIX the command runs under sandbox.py, which applies rlimits
+    (CPU seconds, address space, processes, file size) and reports rusage.
+    Output beyond max_output_bytes kills the run. On timeout, output
+    overflow or cancellation the whole process group is killed and reaped.
+    """
+    env = None
+    if language == 'java':
+        env = {**os.environ, 'JAVA_TOOL_OPTIONS': f"-Xmx{limits['memory_limit']}m"}
+
+    stdin_data = _open_stdin(stdin)
+
+    stats_read = stats_write = None
+    if not IS_WINDOWS:
+        stats_read, stats_write = os.pipe()
+        command = _sandboxed(command, limits, stats_write, language)
+
+    started = time.monotonic()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            start_new_session=not IS_WINDOWS,
+            pass_fds=(stats_write,) if stats_write is not None else (),
+        )
+    except BaseException:
+        if stats_read is not None:
+            os.close(stats_read)
+        _close_stdin(stdin_data)
+        raise
+    finally:
+        if stats_write is not None:
+            os.close(stats_write)
+
+    exceeded = []
+    mismatched = []
+
+    def on_overflow():
+        exceeded.append('output')
+        _kill(process)
+
+    def on_mismatch():
+        mismatched.append(True)
+        _kill(process)
+
+    async def communicate():
+        cap = limits['max_output_bytes']
+        if comparator is None:
+            read_stdout = _read_capped(process.stdout, cap, on_overflow)
+        else:
+            read_stdout = _read_compared(process.stdout, cap, comparator, on_overflow, on_mismatch)
+        stdout, stderr, _ = await asyncio.gather(
+            read_stdout,
+            _read_capped(process.stderr, cap, on_overflow),
+            _feed(process, stdin_data),
+        )
+        await process.wait()
+        return stdout, stderr
+
+    # CPU time is enforced by RLIMIT_CPU; the wall clock catches sleeping or blocked programs
+    timed_out = False
+    try:
+        stdout, stderr = await asyncio.wait_for(communicate(), limits['time_limit'] * 2)
+    except asyncio.TimeoutError:
+        timed_out = True
+        stdout = stderr = b''
+        _kill(process)
+        await process.wait()
+    except BaseException:
+        _kill(process)
+        await process.wait()
+        if stats_read is not None:
+            os.close(stats_read)
+        raise
+    finally:
+        _close_stdin(stdin_data)
+
+    stats = {}
+    if stats_read is not None:
+        with os.fdopen(stats_read, 'rb') as stats_file:
+            raw_stats = stats_file.read()
+        if raw_stats:
+            stats = json.loads(raw_stats)
+
+    result = {
+        "output": stdout.decode(errors='replace'),
+        "error": stderr.decode(errors='replace'),
+        "return_code": process.returncode,
+        "cpu_time": stats.get('cpu_time'),
+        "wall_time": stats.get('wall_time', round(time.monotonic() - started, 4)),
+        "max_rss_kb": stats.get('max_rss_kb'),
+        "limit_exceeded": None,
+    }
+
+    if comparator is not None:
+        result['passed'] = not mismatched and not exceeded and not timed_out and comparator.finish()
+
+    cpu_time = result['cpu_time'] or 0
+    max_rss_kb = result['max_rss_kb'] or 0
+    if mismatched:
+        # Killed by the judge for a wrong answer, not by a limit
+        pass
+    elif timed_out or (stats.get('signal') in (signal.SIGXCPU, signal.SIGKILL) and cpu_time >= limits['time_limit']):
+        result.update(output="", error=TIMEOUT_MESSAGE, return_code=-1, limit_exceeded='time')
+    elif exceeded:
+        result.update(error=result['error'] + OUTPUT_LIMIT_MESSAGE, limit_exceeded='output')
+    elif process.returncode != 0 and (
+        max_rss_kb >= limits['memory_limit'] * 1024 * 0.9 or 'MemoryError' in result['error']
+    ):
+        result['limit_exceeded'] = 'memory'
+    return result
+
+
+def _close_stdin(data):
+    if hasattr(data, 'close'):
+        data.close()
+
+
+def _is_cacheable(test_case):
+    return isinstance(test_case, str) or case_store.is_ref(test_case)
+
+
+def _should_cache(test_case, result):
+    # Wall-clock timeouts depend on how busy the host was, so a rerun may pass
+    return _is_cacheable(test_case) and result.get('limit_exceeded') != 'time'
+
+
+def _runner_error(error):
+    return {
+        "output": "", "error": error, "return_code": -1,
+        "cpu_time": None, "wall_time": None, "max_rss_kb": None, "limit_exceeded": None,
+    }
+
+
+async def iter_execution_async(code, language, test_cases, limits=None, expected_outputs=None, comparison=None,
+                               include_inputs=True):
+    """
+    Run code against each test case, yielding events as they happen.
+
+    The first event is always {"event": "compile", "status": ...} with status
+    "ok", "error", "skipped" (interpreted language) or "cached" (every case
+    was served from the cache). Then one {"event": "result", "index": i, ...}
+    per test case follows as soon as that case finishes; cached cases come
+    first. If compilation fails, every case reports the compiler output.
+
+    With expected_outputs, each case's stdout is compared against its
+    expected output as it streams (see comparator.py) using comparison,
+    a (mode, tolerance) pair, and every result carries "passed".
+
+    With include_inputs=False results carry no "test_case", for runs of
+    stored test cases the caller may not see.
+
+    Results are served from the execution cache when the same code and
+    stdin already ran on this toolchain under the same limits (and, when
+    comparing, against the same expected output). If every case hits, no
+    file is written and no subprocess is started.
+    """
+    config = LANGUAGE_CONFIG[language]
+    limits = limits or get_limits()
+    comparison = comparison or get_comparison()
+    cached_results = {}
+    misses = []
+    version = await toolchain_version(language)
+
+    def result_event(index, result):
+        test_case = {"test_case": test_cases[index]} if include_inputs else {}
+        return {"event": "result", "index": index, **test_case, **result}
+
+    def key(index):
+        verdict = None
+        if expected_outputs is not None:
+            verdict = (case_store.digest_of(expected_outputs[index]), *comparison)
+        return cache_key(language, version, code, test_cases[index], limits, verdict)
+
+    for index, test_case in enumerate(test_cases):
+        cached = None
+        if _is_cacheable(test_case):
+            cached = execution_cache.get(key(index))
+        if cached is not None:
+            cached_results[index] = cached
+        else:
+            misses.append(index)
+
+    if not misses:
+        yield {"event": "compile", "status": "cached"}
+        for index, result in cached_results.items():
+            yield result_event(index, result)
+        return
+
+    # Cache hits above need no CPU; real runs share the host's execution slots
+    async with execution_slot():
+        with tempfile.TemporaryDirectory() as temp_dir:
+            base_name = 'Solution' if language == 'java' else 'solution'
+            file_name = os.path.join(temp_dir, f'{base_name}.{config["extension"]}')
+
+            # Write the code to the file
+            with open(file_name, 'w') as code_file:
+                code_file.write(code)
+
+            compile_error = None
+            if config['compile'] is None:
+                yield {"event": "compile", "status": "skipped"}
+            else:
+                try:
+                    compiled = await run_process(config['compile'](file_name), '', temp_dir, get_compile_limits(limits), language)
+                except Exception as e:
+                    compiled = _runner_error(str(e))
+                compile_stats = {key: compiled[key] for key in ("cpu_time", "wall_time", "max_rss_kb")}
+                if compiled['return_code'] == 0:
+                    yield {"event": "compile", "status": "ok", **compile_stats}
+                else:
+                    compile_error = compiled
+                    yield {"event": "compile", "status": "error", "error": compiled['error'], **compile_stats}
+
+            for index, result in cached_results.items():
+                yield result_event(index, result)
+
+            for index in misses:
+                test_case = test_cases[index]
+                if compile_error is not None:
+                    result = {
+                        **_runner_error(compile_error['error'] + compile_error['output']),
+                        "return_code": compile_error['return_code'],
+                    }
+                    if expected_outputs is not None:
+                        result['passed'] = False
+                    # Compilation is deterministic, so the failure is cached like a run
+                    if _is_cacheable(test_case):
+                        execution_cache.set(key(index), result)
+                    yield result_event(index, result)
+                    continue
+                try:
+                    # cwd isolates execution to the temp dir
+                    if expected_outputs is None:
+                        result = await run_process(config['run'](file_name), test_case, temp_dir, limits, language)
+                    else:
+                        with OutputComparator(expected_outputs[index], *comparison) as comparator:
+                            result = await run_process(
+                                config['run'](file_name), test_case, temp_dir, limits, language, comparator
+                            )
+                except Exception as e:
+                    # Not cached: these are failures of the runner, not of the code
+                    yield result_event(index, _runner_error(str(e)))
+                    continue
+                if _should_cache(test_case, result):
+                    execution_cache.set(key(index), result)
+                yield result_event(index, result)
+
+
+async def execute_code_async(code, language, test_cases, limits=None, expected_outputs=None, comparison=None,
+                             include_inputs=True):
+    """Run code against each test case and return the results in test case order."""
+    results = [None] * len(test_cases)
+    async for event in iter_execution_async(
+        code, language, test_cases, limits, expected_outputs, comparison, include_inputs
+    ):
+        if event['event'] == 'result':
+            index = event.pop('index')
+            event.pop('event')
+            results[index] = event
+    return results
+
+
+def execute_code(code, language, test_cases, limits=None, expected_outputs=None, comparison=None,
+                 include_inputs=True):
+    return async_to_sync(execute_code_async)(
+        code, language, test_cases, limits, expected_outputs, comparison, include_inputs
+    )
+
+
+def iter_execution(code, language, test_cases, limits=None, include_inputs=True):
+    """
+    Synchronous wrapper around iter_execution_async for WSGI streaming
+    responses; each event is produced as soon as it is ready.
+    """
+    loop = asyncio.new_event_loop()
+    events = iter_execution_async(code, language, test_cases, limits, include_inputs=include_inputs)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(events.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(events.aclose())
+        loop.close()
+
+
+def evaluate_coding_exam(exam, submission):
+    # Grade the questions the student was given when the exam samples its bank
+    attempt = ExamAttempt.objects.filter(exam=exam, user_id=submission.user_id).first()
+    questions = attempt.questions() if attempt else Question.objects.filter(exam=exam)
+    answers = submission.get_answers()
+    results = []
+    total_test_cases = 0
+    passed_test_cases = 0
+
+    for question in questions:
+        test_cases = question.test_cases
+        correct_outputs = question.correct_output
+        case_count = min(len(test_cases), len(correct_outputs))
+
+        # Coding answers are stored per question as {str(question_id): code}
+        code = answers.get(str(question.id))
+        if not isinstance(code, str) or not code.strip():
+            results.extend(
+                {"test_case": test_case, "status": "Not answered"} for test_case in test_cases[:case_count]
+            )
+            total_test_cases += case_count
+            continue
+
+        # Identical submissions (starter code, common solutions) hit the execution cache.
+        # Output is compared as it streams, so a runaway program never fills memory.
+        runs = execute_code(
+            code, question.language, test_cases[:case_count], get_limits(question),
+            expected_outputs=correct_outputs[:case_count], comparison=get_comparison(question)
+        )
+
+        for run, expected_output in zip(runs, correct_outputs):
+            test_case = run["test_case"]
+            usage = {key: run[key] for key in ("cpu_time", "wall_time", "max_rss_kb")}
+            if run["limit_exceeded"] in LIMIT_STATUSES:
+                results.append({"test_case": test_case, "status": LIMIT_STATUSES[run["limit_exceeded"]], **usage})
+            elif run["return_code"] == -1:
+                results.append({"test_case": test_case, "status": "Error", "error": run["error"]})
+            elif run["passed"]:
+                passed_test_cases += 1
+                results.append({"test_case": test_case, "status": "Passed", **usage})
+            else:
+                results.append({"test_case": test_case, "status": "Failed", "output": run["output"], "expected": expected_output, **usage})
+
+            total_test_cases += 1
+
+    # Calculate the score
+    score = (passed_test_cases / total_test_cases) * 100 if total_test_cases > 0 else 0
+    submission.score = score
+    submission.correct_answers = passed_test_cases
+    submission.percentage = score
+    submission.save(update_fields=['score', 'correct_answers', 'percentage'])
+    live_stats.record_graded(exam.id, [submission.percentage])
@@ -0,0 +1,247 @@
+"""
+Out-of-process code execution through the JudgeJob table.
+
+With JUDGE_BACKEND = 'queue' web processes no longer run code. The
+execute endpoints and coding exam grading insert a JudgeJob, and judge
+workers (`manage.py judge_worker`) claim and run it. Workers can be any
+number of processes on any hosts that share the database and
+CASE_STORE_DIR.
+
+- A worker claims the oldest pending job with a conditional UPDATE
+  (pending -> running). Two workers never run the same job, and no row
+  lock is held while code runs.
+- A run job's events (compile, then one per test case) are appended to
+  job.events as they finish. The web process polls the row and streams
+  new events, then deletes the job once it has read the last one.
+- While a job runs its worker refreshes heartbeat_at. A running job whose
+  heartbeat is older than JUDGE_JOB_LEASE_SECONDS is handed to another
+  worker, up to JUDGE_JOB_MAX_ATTEMPTS times, and then marked failed.
+"""
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .judge import evaluate_coding_exam, iter_execution
+from .models import JudgeJob
+
+logger = logging.getLogger(__name__)
+
+POLL_MIN_SECONDS = 0.02
+POLL_MAX_SECONDS = 0.25
+
+
+class JudgeJobError(Exception):
+    pass
+
+
+def use_judge_queue():
+    return getattr(settings, 'JUDGE_BACKEND', 'local') == 'queue'
+
+
+def grade_coding_submission(exam, submission):
+    """Grade a coding submission here, or queue it for a judge worker."""
+    if use_judge_queue():
+        JudgeJob.objects.create(kind=JudgeJob.GRADE, submission=submission)
+    else:
+        evaluate_coding_exam(exam, submission)
+
+
+# Web side
+
+def _run_job(code, language, test_cases, limits):
+    return JudgeJob(
+        kind=JudgeJob.RUN,
+        payload={'code': code, 'language': language, 'test_cases': test_cases, 'limits': limits},
+    )
+
+
+def _job_timeout():
+    return getattr(settings, 'JUDGE_JOB_TIMEOUT', 120)
+
+
+def _poll_delays():
+    delay = POLL_MIN_SECONDS
+    while True:
+        yield delay
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+
+
+def _new_events(test_cases, events, sent, include_inputs):
+    # Workers store events without the test case input; put it back for clients allowed to see it
+    for event in events[sent:]:
+        if include_inputs and event.get('event') == 'result':
+            event = {**event, 'test_case': test_cases[event['index']]}
+        yield event
+
+
+def _failure_events(status, error):
+    # A stream cannot turn into an error response half way, so failures are an event
+    if status == JudgeJob.FAILED:
+        yield {"event": "error", "error": error or "The judge worker failed."}
+    elif status != JudgeJob.DONE:
+        yield {"event": "error", "error": "Timed out waiting for a judge worker."}
+
+
+def iter_queued_execution(code, language, test_cases, limits, include_inputs=True):
+    """
+    Queue a run and yield its events as a worker produces them: the events
+    of judge.iter_execution, plus an "error" event if the job failed or no
+    worker finished it within JUDGE_JOB_TIMEOUT.
+    """
+    job = _run_job(code, language, test_cases, limits)
+    job.save()
+    deadline = time.monotonic() + _job_timeout()
+    sent = 0
+    for delay in _poll_delays():
+        status, events, error = JudgeJob.objects.values_list('status', 'events', 'error').get(id=job.id)
+        yield from _new_events(test_cases, events, sent, include_inputs)
+        sent = len(events)
+        if status in (JudgeJob.DONE, JudgeJob.FAILED) or time.monotonic() > deadline:
+            # Finished, or nobody is waiting for it any more
+            JudgeJob.objects.filter(id=job.id).delete()
+            yield from _failure_events(status, error)
+            return
+        time.sleep(delay)
+
+
+async def aiter_queued_execution(code, language, test_cases, limits, include_inputs=True):
+    job = _run_job(code, language, test_cases, limits)
+    await job.asave()
+    deadline = time.monotonic() + _job_timeout()
+    sent = 0
+    for delay in _poll_delays():
+        status, events, error = await JudgeJob.objects.values_list('status', 'events', 'error').aget(id=job.id)
+        for event in _new_events(test_cases, events, sent, include_inputs):
+            yield event
+        sent = len(events)
+        if status in (JudgeJob.DONE, JudgeJob.FAILED) or time.monotonic() > deadline:
+            await JudgeJob.objects.filter(id=job.id).adelete()
+            for event in _failure_events(status, error):
+                yield event
+            return
+        await asyncio.sleep(delay)
+
+
+def _collect(events, count):
+    results = [None] * count
+    for event in events:
+        if event['event'] == 'error':
+            raise JudgeJobError(event['error'])
+        if event['event'] == 'result':
+            index = event.pop('index')
+            event.pop('event')
+            results[index] = event
+    return results
+
+
+def execute_queued(code, language, test_cases, limits, include_inputs=True):
+    """Results in test case order, like judge.execute_code, computed by a judge worker."""
+    return _collect(iter_queued_execution(code, language, test_cases, limits, include_inputs), len(test_cases))
+
+
+async def execute_queued_async(code, language, test_cases, limits, include_inputs=True):
+    events = aiter_queued_execution(code, language, test_cases, limits, include_inputs)
+    return _collect([event async for event in events], len(test_cases))
+
+
+# Worker side
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def requeue_expired():
+    """Hand jobs of dead workers to others, or fail them after JUDGE_JOB_MAX_ATTEMPTS."""
+    stale = timezone.now() - timedelta(seconds=getattr(settings, 'JUDGE_JOB_LEASE_SECONDS', 60))
+    expired = JudgeJob.objects.filter(status=JudgeJob.RUNNING, heartbeat_at__lt=stale)
+    requeued = expired.filter(attempts__lt=getattr(settings, 'JUDGE_JOB_MAX_ATTEMPTS', 3)).update(
+        status=JudgeJob.PENDING, events=[], worker=''
+    )
+    failed = expired.update(
+        status=JudgeJob.FAILED, error="The judge worker stopped responding.", finished_at=timezone.now()
+    )
+    return requeued, failed
+
+
+def claim_job(worker):
+    for job_id in JudgeJob.objects.filter(status=JudgeJob.PENDING).order_by('id').values_list('id', flat=True)[:10]:
+        claimed = JudgeJob.objects.filter(id=job_id, status=JudgeJob.PENDING).update(
+            status=JudgeJob.RUNNING, worker=worker, heartbeat_at=timezone.now(), attempts=F('attempts') + 1
+        )
+        if claimed:
+            # None if the web process gave up on it in the meantime
+            return JudgeJob.objects.select_related('submission__exam').filter(id=job_id).first()
+    return None
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        interval = getattr(settings, 'JUDGE_JOB_LEASE_SECONDS', 60) / 3
+        try:
+            while not self.stopped.wait(interval):
+                JudgeJob.objects.filter(id=self.job.id, worker=self.job.worker).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    mine = JudgeJob.objects.filter(id=job.id, worker=job.worker, status=JudgeJob.RUNNING)
+    try:
+        if job.kind == JudgeJob.RUN:
+            payload = job.payload
+            events = []
+            for event in iter_execution(
+                payload['code'], payload['language'], payload['test_cases'], payload['limits'], include_inputs=False
+            ):
+                events.append(event)
+                mine.update(events=events)
+            mine.update(status=JudgeJob.DONE, finished_at=timezone.now())
+        else:
+            evaluate_coding_exam(job.submission.exam, job.submission)
+            mine.delete()
+    except Exception as e:
+        logger.exception(f"Judge job {job.id} failed")
+        mine.update(status=JudgeJob.FAILED, error=str(e), finished_at=timezone.now())
+    finally:
+        heartbeat.stop()
+
+
+def run_worker(name=None, poll_interval=None, max_jobs=None, stop=None):
+    """Claim and run jobs until stop is set or max_jobs have run; returns the number run."""
+    name = name or worker_name()
+    poll_interval = poll_interval or getattr(settings, 'JUDGE_WORKER_POLL_INTERVAL', 0.5)
+    stop = stop or threading.Event()
+    lease = getattr(settings, 'JUDGE_JOB_LEASE_SECONDS', 60)
+    last_requeue = 0.0
+    processed = 0
+    while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+        if time.monotonic() - last_requeue > lease / 2:
+            requeue_expired()
+            last_requeue = time.monotonic()
+        job = claim_job(name)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,141 @@
+"""
+Live per-exam counters for staff monitoring a sitting.
+
+    started     students who opened the exam (an ExamAttempt was drawn)
+    submitted   submissions accepted, including ones queued for ingestion
+    graded      submissions with a score
+    score_total sum of their percentages, in hundredths
+
+Each counter is one cache key, bumped with an atomic cache.incr where the
+event happens, so reading them never touches the Submission table. A
+missing key (cold cache, eviction, or reset() after a regrade) is rebuilt
+from the database on the next read, and increments to a missing key are
+skipped since that rebuild already includes them.
+
+Off unless LIVE_STATS_ENABLED. As with replica pins, more than one worker
+process needs a shared cache with atomic increments (Redis or Memcached);
+with the local memory cache each process would keep its own counts, so
+check exams.E001 rejects it.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+FIELDS = ('started', 'submitted', 'graded', 'score_total')
+
+
+def _key(exam_id, field):
+    return f'exam-live:{exam_id}:{field}'
+
+
+def enabled():
+    return getattr(settings, 'LIVE_STATS_ENABLED', False)
+
+
+def _incr(exam_id, **deltas):
+    if not enabled():
+        return
+    for field, delta in deltas.items():
+        try:
+            cache.incr(_key(exam_id, field), delta)
+        except ValueError:
+            # Not cached; the rebuild on the next read counts this event
+            pass
+
+
+def record_started(exam_id):
+    _incr(exam_id, started=1)
+
+
+def record_submitted(exam_id, count=1):
+    _incr(exam_id, submitted=count)
+
+
+def record_graded(exam_id, percentages):
+    """Count scored submissions given their percentages."""
+    percentages = list(percentages)
+    if percentages:
+        _incr(exam_id, graded=len(percentages), score_total=sum(round(value * 100) for value in percentages))
+
+
+def reset(exam_id):
+    """Drop the counters so the next read rebuilds them, e.g. after scores change."""
+    cache.delete_many([_key(exam_id, field) for field in FIELDS])
+
+
+def count_from_database(exam_id):
+    # Imported here: models and ingestion call into this module
+    from django.db.models import Count, Sum
+    from .ingestion import is_write_behind, queued_count
+    from .models import ExamAttempt, JudgeJob, Submission
+
+    submissions = Submission.objects.filter(exam_id=exam_id)
+    totals = submissions.aggregate(submitted=Count('id'), score_total=Sum('percentage'))
+    # Coding submissions waiting for a judge worker have no score yet
+    ungraded = submissions.filter(
+        id__in=JudgeJob.objects.filter(kind=JudgeJob.GRADE).exclude(status=JudgeJob.FAILED).values('submission_id')
+    )
+    pending = ungraded.aggregate(count=Count('id'), score_total=Sum('percentage'))
+    return {
+        'started': ExamAttempt.objects.filter(exam_id=exam_id).count(),
+        'submitted': totals['submitted'] + (queued_count(exam_id) if is_write_behind() else 0),
+        'graded': totals['submitted'] - pending['count'],
+        'score_total': round(((totals['score_total'] or 0) - (pending['score_total'] or 0)) * 100),
+    }
+
+
+def _summary(exam_id, counts):
+    graded = counts['graded']
+    return {
+        'exam': exam_id,
+        'started': counts['started'],
+        'submitted': counts['submitted'],
+        'in_progress': max(counts['started'] - counts['submitted'], 0),
+        'graded': graded,
+        'average_score': round(counts['score_total'] / 100 / graded, 2) if graded else None,
+    }
+
+
+def snapshot(exam_id):
+    """The exam's counters, rebuilding any that are not cached."""
+    keys = {field: _key(exam_id, field) for field in FIELDS}
+    cached = cache.get_many(keys.values())
+    if len(cached) < len(keys):
+        rebuilt = count_from_database(exam_id)
+        for field, key in keys.items():
+            if key not in cached:
+                # add(): another process may have rebuilt it first
+                cache.add(key, rebuilt[field], timeout=None)
+        cached = cache.get_many(keys.values())
+    return _summary(exam_id, {field: cached.get(key, 0) for field, key in keys.items()})
+
+
+async def astream(exam_id):
+    """
+    Server-sent events for the exam's counters: one "stats" event now and
+    one whenever they change, checked every LIVE_STATS_POLL_INTERVAL
+    seconds against the cache, with a comment line as keepalive.
+    """
+    interval = getattr(settings, 'LIVE_STATS_POLL_INTERVAL', 1.0)
+    keepalive = getattr(settings, 'LIVE_STATS_KEEPALIVE_SECONDS', 15)
+    keys = [_key(exam_id, field) for field in FIELDS]
+    last = None
+    idle = 0.0
+    while True:
+        cached = await cache.aget_many(keys)
+        if len(cached) < len(keys):
+            summary = await sync_to_async(snapshot)(exam_id)
+        else:
+            summary = _summary(exam_id, dict(zip(FIELDS, (cached[key] for key in keys))))
+        if summary != last:
+            last = summary
+            idle = 0.0
+            yield f'event: stats\ndata: {json.dumps(summary)}\n\n'
+        elif idle >= keepalive:
+            idle = 0.0
+            yield ': keepalive\n\n'
+        await asyncio.sleep(interval)
+        idle += interval
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from exams.collusion import collusion_pairs
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank answer-sharing pairs in a synthetic class with planted copiers "
+        "and report the time taken and how many copiers are found."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--copiers', type=int, default=20, help="Students who copy part of a neighbour's answers.")
+        parser.add_argument('--copied-share', type=float, default=0.5, help="Share of answers each copier copies.")
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        students, questions = options['students'], options['questions']
+
+        # Rasch model answers; wrong answers follow each question's distractor popularity
+        ability = rng.normal(size=(students, 1))
+        difficulty = rng.normal(size=(1, questions))
+        key = rng.integers(1, 5, size=questions).astype(np.uint8)
+        correct = rng.random((students, questions)) < 1 / (1 + np.exp(difficulty - ability))
+        popularity = rng.dirichlet(np.ones(3) * 0.7, size=questions)
+        distractors = np.array([[code for code in range(1, 5) if code != key[q]] for q in range(questions)])
+        picks = (rng.random((students, questions, 1)) > popularity.cumsum(axis=1)[None]).sum(axis=2).clip(max=2)
+        matrix = np.where(correct, key, distractors[np.arange(questions), picks]).astype(np.uint8)
+        matrix[rng.random((students, questions)) < 0.03] = 0
+
+        planted = set()
+        for copier in rng.choice(students, options['copiers'], replace=False):
+            source = int(rng.integers(students))
+            if source == copier:
+                continue
+            copied = rng.random(questions) < options['copied_share']
+            matrix[copier, copied] = matrix[source, copied]
+            planted.add(frozenset((int(copier), source)))
+
+        started = time.perf_counter()
+        pairs = collusion_pairs(matrix, key, limit=options['limit'])
+        elapsed = time.perf_counter() - started
+
+        found = {frozenset((pair['first'], pair['second'])) for pair in pairs}
+        self.stdout.write(
+            f"{students} students x {questions} questions: {students * (students - 1) // 2} pairs in {elapsed:.2f}s\n"
+            f"planted copiers in the top {options['limit']}: {len(found & planted)} of {len(planted)}"
+        )
+        for pair in pairs[:10]:
+            marker = '*' if frozenset((pair['first'], pair['second'])) in planted else ' '
+            self.stdout.write(
+                f"{marker} {pair['first']:>5} {pair['second']:>5}  identical {pair['identical_responses']:>2}"
+                f" expected {pair['expected_identical']:>5}  shared wrong {pair['shared_wrong']:>2}"
+                f"/{pair['both_wrong']:<2}  z {pair['z']:>6}"
+                f"  surprise {pair['surprise']:>6}  by chance {pair['expected_by_chance']}"
+            )
@@ -0,0 +1,106 @@
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from exams import compression
+from exams.models import Exam, Question, student_questions
+from exams.renderers import FastJSONParser, FastJSONRenderer, orjson
+from exams.serializers import ExamSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer/JSONParser with the orjson backend on "
+        "ExamSerializer output, and the size of each body gzip/brotli encoded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--exams', type=int, default=20)
+        parser.add_argument('--questions', type=int, default=40, help="Questions per exam.")
+        parser.add_argument('--case-bytes', type=int, default=2000, help="Size of each coding test case.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stderr.write("orjson is not installed; only the DRF renderer can be measured.")
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self.seed(options)
+            factory = RequestFactory()
+            payloads = []
+            for label, user, questions in [
+                ('staff exam list', User.objects.create_user('bench-staff', is_staff=True), 'question_set'),
+                ('student exam list', User.objects.create_user('bench-student'),
+                 Prefetch('question_set', queryset=student_questions())),
+            ]:
+                request = factory.get('/api/exams/')
+                request.user = user
+                exams = Exam.objects.prefetch_related(questions).order_by('id')
+                payloads.append((label, ExamSerializer(exams, many=True, context={'request': request}).data))
+
+            self.stdout.write(
+                f"{options['iterations']} iterations\n"
+                f"{'payload':<18} {'backend':<8} {'render ms':>10} {'parse ms':>10} {'bytes':>10} "
+                f"{'gzip':>10} {'gzip ms':>8} {'br':>10} {'br ms':>8}"
+            )
+            for label, data in payloads:
+                self.measure(label, 'drf', JSONRenderer(), JSONParser(), data, options)
+                if orjson is not None:
+                    self.measure(label, 'orjson', FastJSONRenderer(), FastJSONParser(), data, options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def seed(self, options):
+        exams = Exam.objects.bulk_create(
+            Exam(title=f'Bench exam {i}', duration=60, exam_type='CODING' if i % 2 else 'MCQ')
+            for i in range(options['exams'])
+        )
+        case = ('12 345 6789\n' * (options['case_bytes'] // 12 + 1))[: options['case_bytes']]
+        Question.objects.bulk_create(
+            Question(
+                exam=exam, text=f'Question {n}: ' + 'Explain the output of the program below. ' * 4,
+                option_a='first option', option_b='second option', option_c='third option',
+                option_d='fourth option', correct_answer='A',
+                test_cases=[case, case[::-1]] if exam.exam_type == 'CODING' else [],
+                correct_output=[case.upper(), case[::-1].upper()] if exam.exam_type == 'CODING' else [],
+            )
+            for exam in exams for n in range(options['questions'])
+        )
+
+    def measure(self, label, backend, renderer, parser, data, options):
+        iterations = options['iterations']
+        started = time.perf_counter()
+        for _ in range(iterations):
+            body = renderer.render(data)
+        render_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            parser.parse(BytesIO(body), parser_context={})
+        parse_ms = (time.perf_counter() - started) * 1000 / iterations
+
+        sizes = []
+        for encoding in ['gzip', 'br']:
+            if encoding not in compression.available_encodings():
+                sizes.append(('-', '-'))
+                continue
+            started = time.perf_counter()
+            compressed = compression.compress_bytes(body, encoding)
+            sizes.append((len(compressed), f'{(time.perf_counter() - started) * 1000:.2f}'))
+
+        self.stdout.write(
+            f"{label:<18} {backend:<8} {render_ms:>10.2f} {parse_ms:>10.2f} {len(body):>10} "
+            f"{sizes[0][0]:>10} {sizes[0][1]:>8} {sizes[1][0]:>10} {sizes[1][1]:>8}"
+        )
+
@@ -0,0 +1,127 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from exams.models import Exam, Question, Submission
+from exams.views import (
+    StudentDashboardView, ExamViewSet, SubmissionViewSet,
+    AsyncStudentDashboardView, AsyncExamDetailView, AsyncSubmissionListView,
+)
+from users.views import StudentAnalyticsView, AsyncStudentAnalyticsView
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the sync (WSGI) and async (ASGI) read views at the same "
+        "concurrency against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Requests per endpoint and mode.")
+        parser.add_argument('--workers', type=int, default=8, help="Sync threads / concurrent async tasks.")
+        parser.add_argument('--exams', type=int, default=20)
+        parser.add_argument('--questions', type=int, default=25, help="Questions per exam.")
+        parser.add_argument('--students', type=int, default=50)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            student, exam = self.seed(options)
+            token = str(RefreshToken.for_user(student).access_token)
+            headers = {'Authorization': f'Bearer {token}'}
+
+            endpoints = [
+                ('dashboard', '/api/student/dashboard/', {},
+                 StudentDashboardView.as_view(), AsyncStudentDashboardView.as_view()),
+                ('analytics', f'/api/student-management/{student.id}/analytics/', {'student_id': student.id},
+                 StudentAnalyticsView.as_view(), AsyncStudentAnalyticsView.as_view()),
+                ('exam retrieve', f'/api/exams/{exam.id}/', {'pk': exam.id},
+                 ExamViewSet.as_view({'get': 'retrieve'}), AsyncExamDetailView.as_view()),
+                ('submission list', '/api/submissions/', {},
+                 SubmissionViewSet.as_view({'get': 'list'}), AsyncSubmissionListView.as_view()),
+            ]
+
+            self.stdout.write(
+                f"{options['requests']} requests per run, {options['workers']} workers\n"
+                f"{'endpoint':<16} {'mode':<6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}"
+            )
+            for name, url, kwargs, sync_view, async_view in endpoints:
+                sync_latencies, sync_elapsed = self.run_sync(sync_view, url, kwargs, headers, options)
+                async_latencies, async_elapsed = asyncio.run(
+                    self.run_async(async_view, url, kwargs, headers, options)
+                )
+                self.report(name, 'wsgi', sync_latencies, sync_elapsed)
+                self.report(name, 'asgi', async_latencies, async_elapsed)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def seed(self, options):
+        students = [
+            User.objects.create_user(username=f'bench{i}', password='bench-password')
+            for i in range(options['students'])
+        ]
+        exams = Exam.objects.bulk_create(
+            Exam(title=f'Bench exam {i}', duration=60) for i in range(options['exams'])
+        )
+        Question.objects.bulk_create(
+            Question(
+                exam=exam, text=f'Question {n}', option_a='a', option_b='b',
+                option_c='c', option_d='d', correct_answer='A'
+            )
+            for exam in exams for n in range(options['questions'])
+        )
+        # The measured student has taken half of the exams
+        for exam in exams[: len(exams) // 2]:
+            answers = {str(question_id): 'A' for question_id in exam.question_set.values_list('id', flat=True)}
+            Submission.objects.create(user=students[0], exam=exam, answers=answers)
+        return students[0], exams[-1]
+
+    def run_sync(self, view, url, kwargs, headers, options):
+        factory = RequestFactory()
+
+        def call(_):
+            started = time.perf_counter()
+            response = view(factory.get(url, headers=headers), **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            latencies = list(pool.map(call, range(options['requests'])))
+        return latencies, time.perf_counter() - started
+
+    async def run_async(self, view, url, kwargs, headers, options):
+        factory = AsyncRequestFactory()
+        semaphore = asyncio.Semaphore(options['workers'])
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await view(factory.get(url, headers=headers), **kwargs)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        return latencies, time.perf_counter() - started
+
+    def report(self, name, mode, latencies, elapsed):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f"{name:<16} {mode:<6} {len(latencies) / elapsed:>9.1f} "
+            f"{statistics.median(latencies) * 1000:>9.2f} {p95 * 1000:>9.2f}"
+        )
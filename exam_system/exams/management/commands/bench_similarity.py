@@ -0,0 +1,137 @@
+import difflib
+import random
+import re
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from exams.models import Exam, Question, SimilarityPair, Submission
+from exams.similarity import index_submission
+
+NAMES = ['n', 'total', 'count', 'value', 'result', 'items', 'idx', 'acc', 'best', 'left', 'right', 'mid', 'data', 'tmp']
+
+LINES = [
+    '{a} = {b} {op} {n}',
+    'for {i} in range({n}):\n    {a} += {i} * {b}',
+    'if {a} > {b}:\n    {a}, {b} = {b}, {a}',
+    'while {a} < {n}:\n    {a} = {a} * 2 + {b}',
+    'print({a} {op} {b})',
+    '{arr} = [int(x) for x in input().split()]',
+    '{a} = max({arr}) if {arr} else {n}',
+    '{arr}.sort(key=lambda x: (x % {n}, -x))',
+    'def {f}({a}, {b}):\n    return {a} {op} {b} if {a} else {f}({b}, {a} - 1)',
+    '{a} = sum({arr}[{i}] for {i} in range(len({arr})) if {arr}[{i}] % {n})',
+    'try:\n    {a} = {arr}[{n}] // {b}\nexcept Exception:\n    {a} = -{n}',
+    '{arr} = [{a} {op} x for x in {arr} if x > {b}]',
+]
+
+
+def random_line(rng, names):
+    return rng.choice(LINES).format(
+        a=rng.choice(names), b=rng.choice(names), i=rng.choice(names), arr=rng.choice(names),
+        f=rng.choice(names), op=rng.choice('+-*%^&|'), n=rng.randint(1, 1000),
+    )
+
+
+def random_program(rng, lines):
+    names = rng.sample(NAMES, 8)
+    return '\n'.join(random_line(rng, names) for _ in range(lines))
+
+
+def disguise(rng, program):
+    """A copy with renamed identifiers, changed constants, comments and a few inserted lines."""
+    renames = dict(zip(NAMES, rng.sample([f'{name}_{rng.randint(0, 9)}' for name in NAMES], len(NAMES))))
+    pattern = re.compile(r'\b(' + '|'.join(NAMES) + r')\b')
+    lines = []
+    for line in program.split('\n'):
+        lines.append(pattern.sub(lambda match: renames[match.group()], line))
+        if rng.random() < 0.1:
+            lines.append('# ' + rng.choice(NAMES))
+        if rng.random() < 0.05 and not line.endswith(':'):
+            lines.append(random_line(rng, list(renames.values())))
+    return '\n'.join(lines)
+
+
+class Command(BaseCommand):
+    help = (
+        "Index N synthetic coding submissions, a share of them disguised copies, "
+        "and report indexing throughput, copies found, and what pairwise diffing would cost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submissions', type=int, default=10000)
+        parser.add_argument('--copy-share', type=float, default=0.05, help="Share of submissions copied from another.")
+        parser.add_argument('--lines', type=int, default=25, help="Lines per program.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self.run(options)
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        count = options['submissions']
+        exam = Exam.objects.create(title='Similarity bench', duration=60, exam_type='CODING')
+        question = Question.objects.create(exam=exam, text='Bench question')
+
+        programs, copied_from = [], {}
+        for index in range(count):
+            if index and rng.random() < options['copy_share']:
+                source = rng.randrange(index)
+                copied_from[index] = source
+                programs.append(disguise(rng, programs[source]))
+            else:
+                programs.append(random_program(rng, options['lines']))
+
+        users = User.objects.bulk_create(User(username=f'bench-{index}') for index in range(count))
+        submissions = Submission.objects.bulk_create(
+            Submission(user=user, exam=exam, answers={str(question.id): program})
+            for user, program in zip(users, programs)
+        )
+        self.stdout.write(f"{count} submissions, {len(copied_from)} planted copies, ~{options['lines']} lines each")
+
+        started = time.perf_counter()
+        checkpoint = max(count // 5, 1)
+        for number, submission in enumerate(submissions, 1):
+            index_submission(submission, [question.id])
+            if number % checkpoint == 0:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {number:>6} indexed  {elapsed:8.2f}s  {number / elapsed:8.0f}/s")
+        elapsed = time.perf_counter() - started
+
+        position = {submission.id: index for index, submission in enumerate(submissions)}
+        found = {
+            frozenset((position[first], position[second]))
+            for first, second in SimilarityPair.objects.filter(exam=exam).values_list('first_id', 'second_id')
+        }
+        planted = {frozenset(pair) for pair in copied_from.items()}
+        recall = len(found & planted) / len(planted) if planted else 1.0
+        # Copies of the same source also match each other, so those are not false positives
+        family = {index: copied_from.get(index, index) for index in range(count)}
+        related = {pair for pair in found if len({family[index] for index in pair}) == 1 or pair in planted}
+        self.stdout.write(
+            f"indexing: {elapsed:.2f}s total, {elapsed / count * 1000:.2f} ms per submission\n"
+            f"pairs: {len(found)} found, planted copies recalled {recall:.1%}, "
+            f"{len(found) - len(related)} pairs between unrelated submissions"
+        )
+
+        sample = 200
+        started = time.perf_counter()
+        for _ in range(sample):
+            first, second = rng.sample(programs, 2)
+            difflib.SequenceMatcher(None, first, second).ratio()
+        per_pair = (time.perf_counter() - started) / sample
+        self.stdout.write(
+            f"pairwise difflib for comparison: {count * (count - 1) // 2} pairs x {per_pair * 1000:.2f} ms "
+            f"= ~{count * (count - 1) / 2 * per_pair / 3600:.1f} h"
+        )
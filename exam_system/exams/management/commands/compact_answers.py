@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from exams.models import AnswerLayout, Exam, Submission
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert stored JSON answers to the packed positional form. "
+        "Submissions whose answers cannot be packed are left as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, default=None, help="Only this exam.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.exclude(exam_type='CODING').order_by('id')
+        if options['exam'] is not None:
+            exams = exams.filter(id=options['exam'])
+
+        for exam in exams:
+            layout = AnswerLayout.current(exam)
+            compacted = 0
+            last_id = 0
+            while True:
+                batch = list(
+                    Submission.objects.filter(exam=exam, packed_answers__isnull=True, id__gt=last_id)
+                    .order_by('id')
+                    .only('id', 'answers')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                packed = [submission for submission in batch if submission.answers and submission.compact(layout)]
+                Submission.objects.bulk_update(packed, ['answers', 'packed_answers', 'answer_layout'])
+                compacted += len(packed)
+            self.stdout.write(f"{exam}: compacted {compacted} submissions (layout v{layout.version})")
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from exams.ingestion import flush_submission_queue
+
+
+class Command(BaseCommand):
+    help = "Grade and bulk insert submissions queued by write-behind ingestion."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Keep flushing until interrupted.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Seconds between flushes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            inserted = flush_submission_queue(batch_size=options['batch_size'])
+            if inserted:
+                self.stdout.write(f"Flushed {inserted} submissions.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
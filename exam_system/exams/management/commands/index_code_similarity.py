@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from exams.models import CodeFingerprint, Exam, Question, SimilarityPair, Submission
+from exams.similarity import index_submission
+
+
+class Command(BaseCommand):
+    help = (
+        "Fingerprint coding exam submissions that are not in the similarity "
+        "index yet (all of them with --rebuild), in submission order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, default=None, help="Only this exam.")
+        parser.add_argument('--rebuild', action='store_true', help="Drop the exam's index and pairs first.")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        exams = Exam.objects.filter(exam_type='CODING').order_by('id')
+        if options['exam'] is not None:
+            exams = exams.filter(id=options['exam'])
+
+        for exam in exams:
+            if options['rebuild']:
+                CodeFingerprint.objects.filter(exam=exam).delete()
+                SimilarityPair.objects.filter(exam=exam).delete()
+            indexed = set(CodeFingerprint.objects.filter(exam=exam).values_list('submission_id', flat=True).distinct())
+            question_ids = list(Question.objects.filter(exam=exam).values_list('id', flat=True))
+            submissions = pairs = 0
+            last_id = 0
+            while True:
+                batch = list(
+                    Submission.objects.filter(exam=exam, id__gt=last_id)
+                    .select_related('answer_layout')
+                    .order_by('id')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                for submission in batch:
+                    if submission.id in indexed:
+                        continue
+                    pairs += index_submission(submission, question_ids)
+                    submissions += 1
+            self.stdout.write(f"{exam}: indexed {submissions} submissions, {pairs} similar pairs")
@@ -0,0 +1,55 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from exams.judge_queue import run_worker, worker_name
+
+
+def _work(poll_interval, max_jobs):
+    stop = threading.Event()
+    # Finish the job in hand, then exit
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    run_worker(worker_name(), poll_interval, max_jobs, stop)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run judge workers that execute queued code runs and coding exam "
+        "grading (JUDGE_BACKEND = 'queue'). Start it on as many hosts as needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes to start on this host.")
+        parser.add_argument('--poll-interval', type=float, default=None, help="Seconds between polls when idle.")
+        parser.add_argument('--max-jobs', type=int, default=None, help="Exit after this many jobs per process.")
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            _work(options['poll_interval'], options['max_jobs'])
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=_work, args=(options['poll_interval'], options['max_jobs']))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} judge workers.")
+
+        def stop_workers(*args):
+            # Each child finishes its current job, then exits
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop_workers)
+        signal.signal(signal.SIGINT, stop_workers)
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from exams.frame_archive import evict_expired
+
+
+class Command(BaseCommand):
+    help = "Delete archived proctoring sessions older than PROCTORING_RETENTION_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=None, help="Override PROCTORING_RETENTION_DAYS.")
+
+    def handle(self, *args, **options):
+        removed, freed = evict_expired(options['days'])
+        self.stdout.write(f"Removed {removed} sessions ({freed / 1024 / 1024:.1f} MB).")
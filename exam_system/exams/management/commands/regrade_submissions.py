@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.grading import regrade
+from exams.models import Exam
+
+
+class Command(BaseCommand):
+    help = "Recompute scores of an exam's submissions against its current answer key."
+
+    def add_arguments(self, parser):
+        parser.add_argument('exam_id', type=int)
+        parser.add_argument('--question', type=int, default=None, help="Only submissions that answered this question.")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            exam = Exam.objects.get(id=options['exam_id'])
+        except Exam.DoesNotExist:
+            raise CommandError(f"Exam {options['exam_id']} not found.")
+        if exam.exam_type == 'CODING':
+            raise CommandError("Coding exams are graded by the judge.")
+
+        def progress(event):
+            self.stdout.write(f"{event['processed']}/{event['total']} processed, {event['updated']} updated")
+
+        result = regrade(exam, options['question'], options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-graded {result['processed']} submissions, {result['updated']} changed."
+        ))
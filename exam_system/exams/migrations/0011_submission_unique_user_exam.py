@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def dedupe_submissions(apps, schema_editor):
+    # Keep the earliest submission for each (user, exam) before enforcing uniqueness
+    Submission = apps.get_model("exams", "Submission")
+    duplicated = (
+        Submission.objects.filter(user__isnull=False, exam__isnull=False)
+        .values("user_id", "exam_id")
+        .annotate(first_id=Min("id"), count=models.Count("id"))
+        .filter(count__gt=1)
+    )
+    for row in duplicated.iterator():
+        Submission.objects.filter(
+            user_id=row["user_id"], exam_id=row["exam_id"]
+        ).exclude(id=row["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0010_submissiondraft"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_submissions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(
+                fields=["user", "submitted_at"], name="submission_user_submitted_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="submission",
+            index=models.Index(
+                fields=["exam", "submitted_at"], name="submission_exam_submitted_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="submission",
+            constraint=models.UniqueConstraint(
+                fields=("user", "exam"), name="unique_submission_per_user_exam"
+            ),
+        ),
+    ]
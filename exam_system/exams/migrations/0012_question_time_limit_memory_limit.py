@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0011_submission_unique_user_exam"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="memory_limit",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Memory per test case in MB; defaults to JUDGE_MEMORY_LIMIT_MB",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="time_limit",
+            field=models.FloatField(
+                blank=True,
+                help_text="CPU seconds per test case; defaults to JUDGE_TIME_LIMIT",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:19
+
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import migrations
+
+# Frozen copy of exams.case_store as of this migration, so later changes to
+# the store cannot change what this migration writes.
+
+
+def put(data):
+    data = data.encode()
+    digest = hashlib.sha256(data).hexdigest()
+    store_dir = str(
+        getattr(settings, "CASE_STORE_DIR", settings.BASE_DIR / "case_store")
+    )
+    path = os.path.join(store_dir, digest[:2], digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as blob:
+                blob.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    return {"$ref": digest, "size": len(data)}
+
+
+def externalize(values):
+    limit = getattr(settings, "CASE_STORE_INLINE_LIMIT", 4096)
+    externalized = []
+    for value in values or []:
+        if isinstance(value, str) and len(value.encode()) > limit:
+            value = put(value)
+        externalized.append(value)
+    return externalized
+
+
+def externalize_case_data(apps, schema_editor):
+    # Move test case data above CASE_STORE_INLINE_LIMIT out of existing rows
+    Question = apps.get_model("exams", "Question")
+    changed = []
+    for question in Question.objects.only(
+        "id", "test_cases", "correct_output"
+    ).iterator(chunk_size=200):
+        test_cases = externalize(question.test_cases)
+        correct_output = externalize(question.correct_output)
+        if (
+            test_cases != question.test_cases
+            or correct_output != question.correct_output
+        ):
+            question.test_cases = test_cases
+            question.correct_output = correct_output
+            changed.append(question)
+    Question.objects.bulk_update(
+        changed, ["test_cases", "correct_output"], batch_size=200
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0012_question_time_limit_memory_limit"),
+    ]
+
+    operations = [
+        migrations.RunPython(externalize_case_data, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0013_externalize_case_data"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="float_tolerance",
+            field=models.FloatField(
+                default=1e-06,
+                help_text="Absolute/relative tolerance for numeric tokens in float comparison",
+            ),
+        ),
+        migrations.AddField(
+            model_name="question",
+            name="output_comparison",
+            field=models.CharField(
+                choices=[
+                    ("exact", "Exact (ignoring surrounding whitespace)"),
+                    ("whitespace", "Whitespace-insensitive"),
+                    ("float", "Float tolerance"),
+                ],
+                default="exact",
+                help_text="How program output is compared with the expected output",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0014_question_output_comparison"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="submission",
+            name="packed_answers",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="submission",
+            name="answers",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name="AnswerLayout",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveIntegerField()),
+                ("question_ids", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answer_layouts",
+                        to="exams.exam",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="submission",
+            name="answer_layout",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.RESTRICT,
+                related_name="+",
+                to="exams.answerlayout",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="answerlayout",
+            constraint=models.UniqueConstraint(
+                fields=("exam", "version"), name="unique_answer_layout_version"
+            ),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0015_answer_layout_packed_answers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exam",
+            name="questions_per_attempt",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Questions drawn from the bank for each student; empty for all",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ExamAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("seed", models.BigIntegerField()),
+                ("question_ids", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="exams.exam"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "exam"), name="unique_attempt_per_user_exam"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0017_judge_job"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProctoringSession",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("frames", models.PositiveIntegerField(default=0)),
+                ("no_face_frames", models.PositiveIntegerField(default=0)),
+                ("multiple_faces_frames", models.PositiveIntegerField(default=0)),
+                ("no_face_ms", models.BigIntegerField(default=0)),
+                ("multiple_faces_ms", models.BigIntegerField(default=0)),
+                ("longest_no_face_ms", models.BigIntegerField(default=0)),
+                ("timeline", models.JSONField(blank=True, default=list)),
+                (
+                    "last_verdict",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("ok", "OK"),
+                            ("no_face", "No face"),
+                            ("multiple_faces", "Multiple faces"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("last_frame_ms", models.BigIntegerField(blank=True, null=True)),
+                ("risk_score", models.FloatField(default=0)),
+                ("flagged", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "exam",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="proctoring_sessions",
+                        to="exams.exam",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["exam", "flagged", "-risk_score"],
+                        name="proctoring_flagged",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "exam"), name="unique_proctoring_session"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("exams", "0019_code_similarity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="language",
+            field=models.CharField(
+                choices=[("python", "Python"), ("java", "Java"), ("c", "C")],
+                default="python",
+                help_text="Language coding answers are judged in",
+                max_length=10,
+            ),
+        ),
+    ]
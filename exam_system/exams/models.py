@@ -1,7 +1,23 @@
-from django.db import models
+import hashlib
+import hmac
+import random
+
+from django.conf import settings
+from django.db import models, router, IntegrityError, transaction
 from django.contrib.auth.models import User
+from . import live_stats
+from .answer_codec import pack_answers, unpack_answers
+from .case_store import externalize
+from .comparator import COMPARISON_CHOICES, EXACT
 # Create your models here.
 
+# Languages the judge can run (exams.judge.LANGUAGE_CONFIG)
+LANGUAGE_CHOICES = [('python', 'Python'), ('java', 'Java'), ('c', 'C')]
+
+def build_answer_key(questions):
+    """Map str(question_id) -> correct_answer with a single query."""
+    return {str(question_id): correct for question_id, correct in questions.values_list('id', 'correct_answer')}
+
 class Exam(models.Model):
     title = models.CharField(max_length=200, default=None, null=True)
     duration = models.IntegerField(default=None, null=True, help_text="Duration in minutes")
@@ -11,10 +27,18 @@ class Exam(models.Model):
         ('CODING', 'Coding Exam'),
     ]
     exam_type = models.CharField(max_length=10, choices=EXAM_TYPE_CHOICES, default='APTITUDE')
+    questions_per_attempt = models.PositiveIntegerField(null=True, blank=True, help_text="Questions drawn from the bank for each student; empty for all")
+
+    def answer_key(self):
+        return build_answer_key(self.question_set.all())
 
     def __str__(self):
         return self.title
 
+def graded_questions(question_ids, answer_key):
+    """The str ids of question_ids that are in answer_key; deleted questions are not graded."""
+    return [str(question_id) for question_id in question_ids if str(question_id) in answer_key]
+
 class Question(models.Model):
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, null=True, default=None)
     text = models.TextField()
@@ -30,13 +54,90 @@ class Question(models.Model):
     )
     test_cases = models.JSONField(default=list, blank=True, help_text="List of test cases for coding questions")
     correct_output = models.JSONField(default=list, blank=True, help_text="Expected outputs for the test cases")
+    time_limit = models.FloatField(null=True, blank=True, help_text="CPU seconds per test case; defaults to JUDGE_TIME_LIMIT")
+    memory_limit = models.PositiveIntegerField(null=True, blank=True, help_text="Memory per test case in MB; defaults to JUDGE_MEMORY_LIMIT_MB")
+    output_comparison = models.CharField(max_length=10, choices=COMPARISON_CHOICES, default=EXACT, help_text="How program output is compared with the expected output")
+    float_tolerance = models.FloatField(default=1e-6, help_text="Absolute/relative tolerance for numeric tokens in float comparison")
+    language = models.CharField(max_length=10, choices=LANGUAGE_CHOICES, default='python', help_text="Language coding answers are judged in")
+
+    def externalize_case_data(self):
+        # Large inputs/outputs go to the case store; the row keeps {"$ref", "size"}
+        self.test_cases = externalize(self.test_cases)
+        self.correct_output = externalize(self.correct_output)
+
+    def save(self, *args, **kwargs):
+        self.externalize_case_data()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.exam.title + " - "+ str(self.id)+ " - " + self.text  # Display first 50 characters of the question text
+
+# The columns a student needs to answer a question. Test cases, expected
+# output and the correct answer are left unloaded.
+STUDENT_QUESTION_FIELDS = [
+    'id', 'exam', 'text', 'option_a', 'option_b', 'option_c', 'option_d', 'time_limit', 'memory_limit', 'language',
+]
+
+def student_questions():
+    return Question.objects.only(*STUDENT_QUESTION_FIELDS)
+
+class AnswerLayout(models.Model):
+    """
+    A frozen question order for an exam. Compact submissions store their
+    answers as a byte vector aligned to one layout; changing the exam's
+    questions creates a new version instead of altering old vectors.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='answer_layouts')
+    version = models.PositiveIntegerField()
+    question_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['exam', 'version'], name='unique_answer_layout_version'),
+        ]
+
+    @classmethod
+    def current(cls, exam):
+        """The layout matching the exam's questions now, created if they changed."""
+        # Read from the database that is written to, never a lagging replica
+        db = router.db_for_write(cls)
+        question_ids = list(Question.objects.using(db).filter(exam=exam).order_by('id').values_list('id', flat=True))
+        latest = cls.objects.using(db).filter(exam=exam).order_by('-version').first()
+        if latest is not None and latest.question_ids == question_ids:
+            return latest
+        try:
+            with transaction.atomic():
+                return cls.objects.create(
+                    exam=exam, version=latest.version + 1 if latest else 1, question_ids=question_ids
+                )
+        except IntegrityError:
+            # Another request froze the same change first
+            return cls.current(exam)
+
+    @classmethod
+    def peek(cls, exam):
+        """
+        current() for read-only requests: the latest layout if it still
+        matches the exam's questions, otherwise an unsaved one (id and
+        version None). Nothing is written.
+        """
+        question_ids = list(Question.objects.filter(exam=exam).order_by('id').values_list('id', flat=True))
+        latest = cls.objects.filter(exam=exam).order_by('-version').first()
+        if latest is not None and latest.question_ids == question_ids:
+            return latest
+        return cls(exam=exam, version=None, question_ids=question_ids)
+
+    def __str__(self):
+        return f"{self.exam} - v{self.version}"
+
 class Submission(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE, null=True)
-    answers = models.JSONField()
+    answers = models.JSONField(default=dict, blank=True)
+    # Compact form: one byte per question of answer_layout, answers is then {}
+    answer_layout = models.ForeignKey(AnswerLayout, on_delete=models.RESTRICT, null=True, blank=True, related_name='+')
+    packed_answers = models.BinaryField(null=True, blank=True)
     score = models.IntegerField(default=0)
     submitted_at = models.DateTimeField(auto_now_add=True)
     time_taken = models.IntegerField(default=0, help_text="Time taken in minutes")
@@ -44,26 +145,332 @@ class Submission(models.Model):
     correct_answers = models.IntegerField(default=0)
     percentage = models.FloatField(default=0.0)
 
+    class Meta:
+        constraints = [
+            # One attempt per student per exam; the create path relies on this
+            models.UniqueConstraint(fields=['user', 'exam'], name='unique_submission_per_user_exam'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'submitted_at'], name='submission_user_submitted_idx'),
+            models.Index(fields=['exam', 'submitted_at'], name='submission_exam_submitted_idx'),
+        ]
+
+    def grade(self, answer_key, question_ids):
+        """
+        Score the answers against an answer key of {str(question_id): correct_answer}.
+
+        question_ids are the questions the student was given (see
+        ExamAttempt.papers): each one still in the key counts towards the
+        total, unanswered ones as wrong, and answers to other questions are
+        ignored. Callers grading many submissions of one exam should load
+        the key once with Exam.answer_key() and reuse it.
+        """
+        answers = self.get_answers()
+        paper = graded_questions(question_ids, answer_key)
+        correct_answers = sum(1 for key in paper if key in answers and answers[key] == answer_key[key])
+        self.set_grade(len(paper), correct_answers)
+
+    def set_grade(self, total_questions, correct_answers):
+        self.total_questions = total_questions
+        self.correct_answers = correct_answers
+        self.score = correct_answers
+        self.percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+
+    def get_answers(self):
+        """Answers in the API shape, {str(question_id): answer}, whichever way they are stored."""
+        if self.packed_answers is not None and self.answer_layout_id:
+            return unpack_answers(self.packed_answers, self.answer_layout.question_ids)
+        return self.answers
+
+    def compact(self, layout):
+        """Store the answers packed against layout. Returns False if they cannot be packed."""
+        packed = pack_answers(self.answers, layout.question_ids)
+        if packed is None:
+            return False
+        self.packed_answers = packed
+        self.answer_layout = layout
+        self.answers = {}
+        return True
+
     def save(self, *args, **kwargs):
-        # Calculate score and percentage when saving
-        if self.answers:
-            total_questions = len(self.answers)
-            correct_answers = 0
-            for question_id, answer in self.answers.items():
-                try:
-                    question = Question.objects.get(id=question_id)
-                    if answer == question.correct_answer:
-                        correct_answers += 1
-                except Question.DoesNotExist:
-                    print(f"Question with ID {question_id} not found")
-                except Exception as e:
-                    print(f"Error processing question {question_id}: {str(e)}")
-            
-            self.total_questions = total_questions
-            self.correct_answers = correct_answers
-            self.score = correct_answers
-            self.percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+        # Calculate score and percentage when saving; coding answers are
+        # code per question, scored by the judge (evaluate_coding_exam)
+        if self.exam.exam_type != 'CODING':
+            question_ids = ExamAttempt.papers(self.exam, [self.user_id])[self.user_id]
+            self.grade(build_answer_key(Question.objects.filter(exam=self.exam, id__in=question_ids)), question_ids)
+        compact = self.answers and getattr(settings, 'COMPACT_SUBMISSION_ANSWERS', False)
+        # New submissions also store the layout for the read-only reports
+        if compact or (self._state.adding and self.exam.exam_type != 'CODING'):
+            layout = AnswerLayout.current(self.exam)
+            if compact:
+                self.compact(layout)
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.user.username} - {self.exam.title} - {self.submitted_at}"
\ No newline at end of file
+        return f"{self.user.username} - {self.exam.title} - {self.submitted_at}"
+
+def attempt_seed(exam_id, user_id):
+    """Deterministic per (exam, student), but not guessable without SECRET_KEY."""
+    digest = hmac.new(settings.SECRET_KEY.encode(), f'attempt:{exam_id}:{user_id}'.encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big') >> 1
+
+class ExamAttempt(models.Model):
+    """
+    The questions one student sees in an exam, in order: a seeded sample of
+    questions_per_attempt questions (or a permutation of all of them).
+    Drawn once on first access and kept, so later changes to the bank
+    do not change a student's paper.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    seed = models.BigIntegerField()
+    question_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exam'], name='unique_attempt_per_user_exam'),
+        ]
+
+    @classmethod
+    def draw(cls, exam, user):
+        """Return the student's attempt, drawing the questions on first access."""
+        attempt = cls.objects.filter(exam=exam, user=user).first()
+        if attempt is not None:
+            return attempt
+        seed = attempt_seed(exam.id, user.id)
+        bank = list(Question.objects.filter(exam=exam).order_by('id').values_list('id', flat=True))
+        count = min(exam.questions_per_attempt or len(bank), len(bank))
+        try:
+            with transaction.atomic():
+                attempt = cls.objects.create(
+                    exam=exam, user=user, seed=seed, question_ids=random.Random(seed).sample(bank, count)
+                )
+        except IntegrityError:
+            # A concurrent request drew first
+            return cls.objects.get(exam=exam, user=user)
+        live_stats.record_started(exam.id)
+        return attempt
+
+    @classmethod
+    def papers(cls, exam, user_ids):
+        """
+        {user_id: question ids} each student is graded on: their attempt's
+        draw, or the whole bank for submissions made without an attempt.
+        """
+        papers = dict(cls.objects.filter(exam=exam, user_id__in=user_ids).values_list('user_id', 'question_ids'))
+        missing = [user_id for user_id in user_ids if user_id not in papers]
+        if missing:
+            bank = list(Question.objects.filter(exam=exam).order_by('id').values_list('id', flat=True))
+            papers.update((user_id, bank) for user_id in missing)
+        return papers
+
+    def questions(self, queryset=None):
+        """The attempt's questions in attempt order, skipping any since deleted."""
+        by_id = (Question.objects if queryset is None else queryset).in_bulk(self.question_ids)
+        return [by_id[question_id] for question_id in self.question_ids if question_id in by_id]
+
+    def restrict_answers(self, answers):
+        """Drop answers to questions that are not part of this attempt."""
+        allowed = {str(question_id) for question_id in self.question_ids}
+        return {key: value for key, value in answers.items() if str(key) in allowed}
+
+    def __str__(self):
+        return f"{self.user} - {self.exam}"
+
+class SubmissionDraft(models.Model):
+    """
+    In-progress answers for one student's attempt at an exam.
+
+    Only answered questions are kept, so the row stays small however large
+    the exam is. Deltas from autosave are merged into the same row.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
+    answers = models.JSONField(default=dict, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exam'], name='unique_draft_per_user_exam'),
+        ]
+
+    def apply_delta(self, delta):
+        """
+        Merge a {question_id: answer} delta into the draft.
+
+        A null or empty answer clears the question. Returns True if the
+        stored answers changed.
+        """
+        changed = False
+        for question_id, answer in delta.items():
+            key = str(question_id)
+            if answer is None or answer == '':
+                if key in self.answers:
+                    del self.answers[key]
+                    changed = True
+            elif self.answers.get(key) != answer:
+                self.answers[key] = answer
+                changed = True
+        if changed:
+            self.version += 1
+        return changed
+
+    def __str__(self):
+        return f"{self.user.username} - {self.exam.title} - draft v{self.version}"
+
+class JudgeJob(models.Model):
+    """
+    A unit of work for the judge workers (`manage.py judge_worker`).
+
+    "run" jobs execute code against test cases for the execute endpoint;
+    events are appended as they are produced so the web process can
+    stream them. "grade" jobs grade a coding submission.
+    """
+    RUN = 'run'
+    GRADE = 'grade'
+    KIND_CHOICES = [(RUN, 'Run'), (GRADE, 'Grade')]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    payload = models.JSONField(default=dict, blank=True)
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    events = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'], name='judge_job_status_id')]
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+class ProctoringSession(models.Model):
+    """
+    Running summary of one student's proctoring frames for an exam.
+
+    Each frame's verdict is folded in as it arrives: consecutive
+    anomalous frames with the same verdict extend one interval of
+    `timeline` ([verdict, start_ms, end_ms, frames]), and the counters
+    and risk score are updated in place. Staff lists are read from these
+    rows alone.
+    """
+    OK = 'ok'
+    NO_FACE = 'no_face'
+    MULTIPLE_FACES = 'multiple_faces'
+    VERDICT_CHOICES = [(OK, 'OK'), (NO_FACE, 'No face'), (MULTIPLE_FACES, 'Multiple faces')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='proctoring_sessions')
+    frames = models.PositiveIntegerField(default=0)
+    no_face_frames = models.PositiveIntegerField(default=0)
+    multiple_faces_frames = models.PositiveIntegerField(default=0)
+    no_face_ms = models.BigIntegerField(default=0)
+    multiple_faces_ms = models.BigIntegerField(default=0)
+    longest_no_face_ms = models.BigIntegerField(default=0)
+    timeline = models.JSONField(default=list, blank=True)
+    last_verdict = models.CharField(max_length=20, choices=VERDICT_CHOICES, blank=True)
+    last_frame_ms = models.BigIntegerField(null=True, blank=True)
+    risk_score = models.FloatField(default=0)
+    flagged = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'exam'], name='unique_proctoring_session'),
+        ]
+        indexes = [
+            models.Index(fields=['exam', 'flagged', '-risk_score'], name='proctoring_flagged'),
+        ]
+
+    def add_verdict(self, timestamp_ms, verdict):
+        """Fold one frame's verdict into the timeline and counters."""
+        gap = getattr(settings, 'PROCTORING_INTERVAL_GAP_MS', 60000)
+        if self.last_frame_ms is not None:
+            # Concurrent uploads may commit slightly out of order
+            timestamp_ms = max(timestamp_ms, self.last_frame_ms)
+        continues = self.last_frame_ms is not None and timestamp_ms - self.last_frame_ms <= gap
+        last = self.timeline[-1] if self.timeline else None
+        open_interval = continues and last is not None and last[0] == self.last_verdict
+        # The previous verdict lasted until this frame
+        if open_interval:
+            self.add_duration(self.last_verdict, timestamp_ms - self.last_frame_ms)
+            last[2] = timestamp_ms
+
+        if verdict != self.OK:
+            setattr(self, f'{verdict}_frames', getattr(self, f'{verdict}_frames') + 1)
+            if open_interval and last[0] == verdict:
+                last[3] += 1
+            else:
+                self.timeline.append([verdict, timestamp_ms, timestamp_ms, 1])
+
+        self.frames += 1
+        self.last_verdict = verdict
+        self.last_frame_ms = timestamp_ms
+        # Anomalous frames as a share of all frames; a second person weighs double
+        self.risk_score = round((self.no_face_frames + 2 * self.multiple_faces_frames) / self.frames, 4)
+        self.flagged = (
+            self.multiple_faces_frames >= getattr(settings, 'PROCTORING_FLAG_MULTIPLE_FACES_FRAMES', 1)
+            or self.longest_no_face_ms >= getattr(settings, 'PROCTORING_FLAG_NO_FACE_MS', 60000)
+            or self.risk_score >= getattr(settings, 'PROCTORING_FLAG_RISK_SCORE', 0.2)
+        )
+
+    def add_duration(self, verdict, elapsed_ms):
+        setattr(self, f'{verdict}_ms', getattr(self, f'{verdict}_ms') + elapsed_ms)
+        if verdict == self.NO_FACE:
+            start, end = self.timeline[-1][1:3]
+            self.longest_no_face_ms = max(self.longest_no_face_ms, end + elapsed_ms - start)
+
+    def __str__(self):
+        return f"{self.user} - {self.exam} - proctoring"
+
+class CodeFingerprint(models.Model):
+    """
+    Inverted index row for code similarity: one winnowed fingerprint of a
+    submission's code for a coding question.
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='+')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='code_fingerprints')
+    hash = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'hash'], name='code_fingerprint_lookup'),
+        ]
+
+class SimilarityPair(models.Model):
+    """
+    Two submissions whose code for a question shares fingerprints. score is
+    the shared share of the smaller fingerprint set (1.0: one contains the
+    other).
+    """
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='similarity_pairs')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='+')
+    first = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    second = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    shared = models.PositiveIntegerField()
+    score = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'first', 'second'], name='unique_similarity_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['exam', '-score'], name='similarity_pair_exam_score'),
+        ]
+
+    def __str__(self):
+        return f"{self.exam} - {self.first_id}/{self.second_id} ({self.score:.2f})"
@@ -0,0 +1,91 @@
+"""
+Per-frame proctoring verdicts and their running per-session summary.
+
+Each uploaded frame gets a verdict from the number of faces found in it
+(ok, no_face or multiple_faces), which is folded into the student's
+ProctoringSession row in the same request.
+
+Faces are found with OpenCV's YuNet detector when
+PROCTORING_FACE_DETECTOR_MODEL points to its ONNX model, and otherwise
+with the frontal face Haar cascade bundled with OpenCV 4. Without either,
+frames are archived without a verdict.
+"""
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import ProctoringSession
+
+ALERTS = {
+    ProctoringSession.NO_FACE: "No face detected",
+    ProctoringSession.MULTIPLE_FACES: "Multiple faces detected",
+}
+
+# OpenCV detectors are not thread safe, so each thread loads its own
+_detectors = threading.local()
+
+
+def _load_detector():
+    model = getattr(settings, 'PROCTORING_FACE_DETECTOR_MODEL', None)
+    if model and hasattr(cv2, 'FaceDetectorYN'):
+        detector = cv2.FaceDetectorYN.create(str(model), '', (320, 320), 0.8)
+        return 'yunet', detector
+    cascade_dir = getattr(getattr(cv2, 'data', None), 'haarcascades', '')
+    cascade_path = Path(cascade_dir) / 'haarcascade_frontalface_default.xml'
+    if hasattr(cv2, 'CascadeClassifier') and cascade_path.exists():
+        return 'haar', cv2.CascadeClassifier(str(cascade_path))
+    return None, None
+
+
+def _detector():
+    if not hasattr(_detectors, 'face'):
+        _detectors.face = _load_detector()
+    return _detectors.face
+
+
+def count_faces(image):
+    """Faces in a decoded BGR or grayscale image, or None without a detector."""
+    kind, detector = _detector()
+    if kind == 'yunet':
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        detector.setInputSize((image.shape[1], image.shape[0]))
+        _, faces = detector.detect(image)
+        return 0 if faces is None else len(faces)
+    if kind == 'haar':
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        min_size = getattr(settings, 'PROCTORING_MIN_FACE_PIXELS', 30)
+        faces = detector.detectMultiScale(
+            cv2.equalizeHist(image), scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size)
+        )
+        return len(faces)
+    return None
+
+
+def analyze_frame(frame):
+    """Verdict for a recompressed JPEG frame, or None if there is none to give."""
+    image = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        return None
+    faces = count_faces(image)
+    if faces is None:
+        return None
+    if faces == 0:
+        return ProctoringSession.NO_FACE
+    if faces > 1:
+        return ProctoringSession.MULTIPLE_FACES
+    return ProctoringSession.OK
+
+
+def record_verdict(exam_id, user_id, timestamp_ms, verdict):
+    """Fold a frame's verdict into the student's session summary and return it."""
+    with transaction.atomic():
+        session, _ = ProctoringSession.objects.select_for_update().get_or_create(exam_id=exam_id, user_id=user_id)
+        session.add_verdict(timestamp_ms, verdict)
+        session.save()
+    return session
@@ -0,0 +1,74 @@
+"""
+Resource-limited launcher for judged programs (POSIX only).
+
+Run as a script by exams.judge, not imported by Django:
+
+    python sandbox.py '<limits json>' <stats fd> <command> [args...]
+
+The launcher forks, applies rlimits in the child and execs the command,
+then waits for it with wait4() and writes CPU time, wall time and peak RSS
+as JSON to the stats fd. It exits the way the child did, so callers see
+the child's return code (negative for a signal).
+"""
+import json
+import math
+import os
+import resource
+import signal
+import sys
+import time
+
+
+def apply_limits(limits):
+    cpu_seconds = limits.get('cpu_seconds')
+    if cpu_seconds:
+        # SIGXCPU at the soft limit, SIGKILL one second later
+        soft = math.ceil(cpu_seconds)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    if limits.get('address_space_bytes'):
+        resource.setrlimit(resource.RLIMIT_AS, (limits['address_space_bytes'],) * 2)
+    if limits.get('max_processes'):
+        resource.setrlimit(resource.RLIMIT_NPROC, (limits['max_processes'],) * 2)
+    if limits.get('max_file_bytes'):
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits['max_file_bytes'],) * 2)
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def main():
+    limits = json.loads(sys.argv[1])
+    stats_fd = int(sys.argv[2])
+    command = sys.argv[3:]
+
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(stats_fd)
+            apply_limits(limits)
+            os.execvp(command[0], command)
+        except BaseException as e:
+            os.write(2, f"sandbox: {e}\n".encode())
+        os._exit(127)
+
+    _, status, usage = os.wait4(pid, 0)
+    stats = {
+        'cpu_time': round(usage.ru_utime + usage.ru_stime, 4),
+        'wall_time': round(time.monotonic() - started, 4),
+        # ru_maxrss is in kilobytes on Linux (bytes on macOS)
+        'max_rss_kb': usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss,
+        'signal': os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+    }
+    os.write(stats_fd, json.dumps(stats).encode())
+    os.close(stats_fd)
+
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        signal.signal(sig, signal.SIG_DFL)
+        os.kill(os.getpid(), sig)
+        os._exit(128 + sig)
+    os._exit(os.WEXITSTATUS(status))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Exam, Question, Submission
+from .models import Exam, Question, Submission, SubmissionDraft, ProctoringSession, STUDENT_QUESTION_FIELDS
 
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -54,17 +54,40 @@ class QuestionSerializer(serializers.ModelSerializer):
                 'option_d': instance.option_d
             }
 
+class StudentQuestionSerializer(serializers.ModelSerializer):
+    """Questions as students see them; use with student_questions() so grading data is never loaded."""
+    class Meta:
+        model = Question
+        fields = [field for field in STUDENT_QUESTION_FIELDS if field != 'exam']
+        read_only_fields = fields
+
 class ExamSerializer(serializers.ModelSerializer):
-    questions = QuestionSerializer(many=True, read_only=True, source='question_set')
+    questions = serializers.SerializerMethodField()
     has_submitted = serializers.SerializerMethodField()
 
     class Meta:
         model = Exam
-        fields = ['id', 'title', 'duration', 'questions', 'has_submitted', 'exam_type']
+        fields = ['id', 'title', 'duration', 'questions', 'has_submitted', 'exam_type', 'questions_per_attempt']
         read_only_fields = ['id']
 
+    def get_questions(self, obj):
+        # A student's retrieve passes only the questions drawn for their attempt, in order
+        questions = self.context.get('attempt_questions')
+        request = self.context.get('request')
+        if request and request.user.is_staff:
+            return QuestionSerializer(obj.question_set.all() if questions is None else questions, many=True, context=self.context).data
+        # Students are never sent the bank; outside retrieve they get no questions
+        if questions is None:
+            return []
+        return StudentQuestionSerializer(questions, many=True, context=self.context).data
+
     def get_has_submitted(self, obj):
         try:
+            # Callers that already know the user's submitted exams (and async
+            # views, which cannot query here) pass them in the context
+            submitted_exam_ids = self.context.get('submitted_exam_ids')
+            if submitted_exam_ids is not None:
+                return obj.id in submitted_exam_ids
             request = self.context.get('request')
             if request and request.user.is_authenticated:
                 return Submission.objects.filter(exam=obj, user=request.user).exists()
@@ -104,6 +127,39 @@ class SubmissionSerializer(serializers.ModelSerializer):
 
         ]
         read_only_fields = [
-            'id', 'submitted_date', 'time_taken', 'total_questions',
+            'id', 'submitted_date', 'total_questions',
             'correct_answers', 'score', 'percentage'
         ]
+        extra_kwargs = {'answers': {'required': True}, 'time_taken': {'min_value': 0}}
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Compact submissions are returned in the usual {question_id: answer} shape
+        if instance.packed_answers is not None:
+            data['answers'] = instance.get_answers()
+        return data
+
+class SubmissionDraftSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SubmissionDraft
+        fields = ['exam', 'answers', 'version', 'updated_at']
+        read_only_fields = fields
+
+class ProctoringSessionSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(source='user.username', read_only=True)
+    timeline = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ProctoringSession
+        fields = [
+            'user', 'username', 'exam', 'frames', 'no_face_frames', 'multiple_faces_frames',
+            'no_face_ms', 'multiple_faces_ms', 'longest_no_face_ms', 'risk_score', 'flagged',
+            'last_frame_ms', 'timeline', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_timeline(self, obj):
+        return [
+            {'verdict': verdict, 'start': start, 'end': end, 'frames': frames}
+            for verdict, start, end, frames in obj.timeline
+        ]
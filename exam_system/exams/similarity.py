@@ -0,0 +1,244 @@
+"""
+Code similarity detection for coding exams.
+
+Each submitted answer to a coding question is tokenised (comments and
+whitespace dropped, numbers and strings replaced by a placeholder, and
+each user-defined name by the distance back to its previous use, so
+consistently renaming variables does not hide a copy), hashed as
+overlapping k-grams of SIMILARITY_KGRAM tokens, and winnowed: of every
+SIMILARITY_WINDOW consecutive k-gram hashes the smallest is kept. Any
+shared run of at least KGRAM + WINDOW - 1 tokens therefore shares a
+fingerprint.
+
+Fingerprints are stored as CodeFingerprint rows, an inverted index keyed
+by (question, hash). A new submission only looks up its own fingerprints
+instead of being compared with every other submission, and the pairs it
+forms are stored as SimilarityPair rows for staff to review.
+
+A fingerprint already held by SIMILARITY_COMMON_FINGERPRINT_LIMIT
+submissions (the starter code, the obvious idiom) is common: it forms no
+pairs and is not stored again. Posting lists therefore never grow past
+that limit, and indexing a submission costs the same at 100 or 100,000
+submissions. Scores are the shared share of the smaller set of stored
+fingerprints.
+"""
+import logging
+import re
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .models import CodeFingerprint, Question, SimilarityPair
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK = 500
+
+TOKEN_RE = re.compile(
+    r'''
+    (?P<comment>\#[^\n]*|//[^\n]*|/\*.*?\*/)
+    | (?P<string>"""(?:\\.|.)*?"""|\'\'\'(?:\\.|.)*?\'\'\'|"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+    | (?P<number>\d[\w.]*)
+    | (?P<name>[A-Za-z_$][\w$]*)
+    | (?P<space>\s+)
+    | (?P<symbol>.)
+    ''',
+    re.VERBOSE | re.DOTALL,
+)
+
+# Keywords and library names of the judge's languages are kept as they are
+KEYWORDS = frozenset('''
+    and as assert async await break case catch char class const continue def default del do double elif else
+    enum except extends final finally float for from global if import in int is lambda long new nonlocal not
+    or pass private protected public raise return short signed sizeof static struct switch this throw throws
+    try typedef union unsigned void while with yield None True False null true false auto bool namespace
+    using template typename vector string std
+    print input range len int str list dict set tuple map zip sorted enumerate min max sum abs open sys stdin
+    readline split strip append pop sort join printf scanf cin cout endl main include System out println
+    Scanner nextInt nextLine Math String Integer ArrayList HashMap
+'''.split())
+
+PLACEHOLDERS = {'string': 'S', 'number': 'N'}
+# Names used again within this many tokens are told apart by the distance
+NAME_DISTANCE_LIMIT = 16
+HASH_BASE = 1_000_003
+
+
+def tokenize(code):
+    """Normalised tokens of a program in any of the judge's languages."""
+    tokens = []
+    last_use = {}
+    for match in TOKEN_RE.finditer(code):
+        kind = match.lastgroup
+        if kind in ('comment', 'space'):
+            continue
+        if kind == 'name':
+            text = match.group()
+            if text in KEYWORDS:
+                tokens.append(text)
+                continue
+            distance = len(tokens) - last_use.get(text, -NAME_DISTANCE_LIMIT)
+            last_use[text] = len(tokens)
+            tokens.append(f'V{distance}' if distance < NAME_DISTANCE_LIMIT else 'V')
+        else:
+            tokens.append(PLACEHOLDERS.get(kind) or match.group())
+    return tokens
+
+
+_token_ids = {}
+
+
+def _token_id(token):
+    # Stable across processes, unlike hash(); the fingerprints are stored
+    token_id = _token_ids.get(token)
+    if token_id is None:
+        token_id = _token_ids[token] = zlib.crc32(token.encode()) + 1
+    return token_id
+
+
+def _powers(k):
+    powers = [1] * k
+    for index in range(k - 2, -1, -1):
+        powers[index] = powers[index + 1] * HASH_BASE % 2 ** 64
+    return np.array(powers, dtype=np.uint64)
+
+
+def fingerprints(code, k=None, window=None):
+    """Sorted, distinct winnowed fingerprints of code as an int64 array."""
+    k = k or getattr(settings, 'SIMILARITY_KGRAM', 10)
+    window = window or getattr(settings, 'SIMILARITY_WINDOW', 6)
+    ids = np.fromiter((_token_id(token) for token in tokenize(code)), dtype=np.uint64)
+    if len(ids) < k:
+        return np.empty(0, dtype=np.int64)
+    # Polynomial hash of every k-gram; uint64 arithmetic wraps modulo 2**64
+    hashes = (sliding_window_view(ids, k) * _powers(k)).sum(axis=1, dtype=np.uint64)
+    if len(hashes) <= window:
+        selected = hashes[[hashes.argmin()]]
+    else:
+        # Rightmost minimum of each window, so runs of equal hashes give one fingerprint
+        windows = sliding_window_view(hashes, window)[:, ::-1]
+        positions = np.arange(len(windows)) + window - 1 - windows.argmin(axis=1)
+        selected = hashes[np.unique(positions)]
+    return np.unique(selected.view(np.int64))
+
+
+def _chunks(values):
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        yield values[start:start + LOOKUP_CHUNK]
+
+
+def postings(question_id, hashes, exclude=None):
+    """{hash: [submission_id, ...]} of the indexed submissions holding each of hashes."""
+    lists = {}
+    indexed = CodeFingerprint.objects.filter(question_id=question_id)
+    if exclude is not None:
+        indexed = indexed.exclude(submission_id=exclude)
+    for chunk in _chunks(hashes):
+        for value, submission_id in indexed.filter(hash__in=chunk).values_list('hash', 'submission_id'):
+            lists.setdefault(value, []).append(submission_id)
+    return lists
+
+
+def _fingerprint_counts(question_id, submission_ids):
+    counts = {}
+    for chunk in _chunks(list(submission_ids)):
+        # Grouped by question in the query, so the lookup uses the submission index
+        counts.update(
+            (submission_id, count) for submission_id, question, count in
+            CodeFingerprint.objects.filter(submission_id__in=chunk)
+            .values('submission_id', 'question_id').annotate(count=Count('id'))
+            .values_list('submission_id', 'question_id', 'count')
+            if question == question_id
+        )
+    return counts
+
+
+def coding_answers(submission, question_ids):
+    """{question_id: code} of the submission's answers to the given coding questions."""
+    answers = submission.get_answers()
+    return {
+        question_id: answers[str(question_id)] for question_id in question_ids
+        if isinstance(answers.get(str(question_id)), str) and answers[str(question_id)].strip()
+    }
+
+
+def index_submission(submission, question_ids=None):
+    """
+    Add a submission's code to its exam's index and record the pairs it
+    forms with submissions indexed before it. Re-indexing replaces its
+    previous fingerprints and pairs. Returns the number of pairs recorded.
+    """
+    if question_ids is None:
+        question_ids = list(Question.objects.filter(exam_id=submission.exam_id).values_list('id', flat=True))
+    min_score = getattr(settings, 'SIMILARITY_MIN_SCORE', 0.5)
+
+    common_limit = getattr(settings, 'SIMILARITY_COMMON_FINGERPRINT_LIMIT', 50)
+    min_shared = getattr(settings, 'SIMILARITY_MIN_SHARED', 5)
+    rows, pairs = [], []
+    for question_id, code in coding_answers(submission, question_ids).items():
+        hashes = fingerprints(code).tolist()
+        lists = postings(question_id, hashes, exclude=submission.id)
+        # Common fingerprints neither match nor get stored
+        hashes = [value for value in hashes if len(lists.get(value, ())) < common_limit]
+        if not hashes:
+            continue
+        shared = Counter(other_id for value in hashes for other_id in lists.get(value, ()))
+        shared = {other_id: count for other_id, count in shared.items() if count >= min_shared}
+        sizes = _fingerprint_counts(question_id, shared)
+        for other_id, count in shared.items():
+            score = count / min(len(hashes), sizes[other_id])
+            if score < min_score:
+                continue
+            first, second = sorted((submission.id, other_id))
+            pairs.append(SimilarityPair(
+                exam_id=submission.exam_id, question_id=question_id, first_id=first, second_id=second,
+                shared=count, score=round(score, 4)
+            ))
+        rows.extend(
+            CodeFingerprint(exam_id=submission.exam_id, question_id=question_id, submission_id=submission.id, hash=value)
+            for value in hashes
+        )
+
+    with transaction.atomic():
+        CodeFingerprint.objects.filter(submission_id=submission.id).delete()
+        SimilarityPair.objects.filter(Q(first_id=submission.id) | Q(second_id=submission.id)).delete()
+        CodeFingerprint.objects.bulk_create(rows, batch_size=2000)
+        SimilarityPair.objects.bulk_create(pairs, batch_size=2000, ignore_conflicts=True)
+    return len(pairs)
+
+
+def index_new_submission(submission):
+    """index_submission for the submit path: a failure is logged, never raised."""
+    if not getattr(settings, 'SIMILARITY_INDEXING', True):
+        return
+    try:
+        index_submission(submission)
+    except Exception:
+        logger.exception(f"Could not index submission {submission.id} for similarity")
+
+
+def similar_pairs(exam, min_score=None, question_id=None, limit=100):
+    """The exam's most similar submission pairs, highest score first."""
+    pairs = SimilarityPair.objects.filter(exam=exam)
+    if min_score is not None:
+        pairs = pairs.filter(score__gte=min_score)
+    if question_id is not None:
+        pairs = pairs.filter(question_id=question_id)
+    return [
+        {
+            "question": question, "score": score, "shared": shared,
+            "first": {"submission": first, "user": first_user, "username": first_name},
+            "second": {"submission": second, "user": second_user, "username": second_name},
+        }
+        for question, score, shared, first, first_user, first_name, second, second_user, second_name in
+        pairs.order_by('-score', '-shared', 'id').values_list(
+            'question_id', 'score', 'shared',
+            'first_id', 'first__user_id', 'first__user__username',
+            'second_id', 'second__user_id', 'second__user__username',
+        )[:limit]
+    ]
@@ -1,3 +1,984 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import tempfile
+import time
+import zlib
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import admission, ingestion, judge_queue
+from .answer_codec import UNANSWERED, pack_answers, unpack_answers
+from .case_store import externalize, is_ref
+from .checks import check_live_stats_cache
+from .collusion import collusion_pairs
+from .comparator import EXACT, FLOAT, WHITESPACE, OutputComparator
+from .compression import GZIP_WBITS, CompressionMiddleware, brotli, compress_stream, negotiate_encoding
+from .db_router import ReplicaPinMiddleware, ReplicaRouter, pin_to_primary, read_alias_for, reads_from
+from .execution_cache import execution_cache
+from .exports import iter_submission_export
+from .ingestion import flush_submission_queue
+from .judge import execute_code, get_limits
+from .judge_queue import claim_job, requeue_expired, run_worker
+from .models import AnswerLayout, Exam, JudgeJob, ProctoringSession, Question, Submission, SubmissionDraft
+from .similarity import fingerprints, index_submission, similar_pairs
+from .views import AsyncExecuteCodeView, execution_client_key
+
+
+def make_mcq_exam(answers='ABCD'):
+    """An aptitude exam with one question per letter of answers as its correct option."""
+    exam = Exam.objects.create(title='Aptitude', duration=30, exam_type='APTITUDE')
+    for index, correct in enumerate(answers):
+        Question.objects.create(
+            exam=exam, text=f'Question {index}', option_a='a', option_b='b', option_c='c', option_d='d',
+            correct_answer=correct
+        )
+    return exam
+
+
+class ExamTestCase(TestCase):
+    def setUp(self):
+        # Live stats counters and replica pins live in the cache
+        cache.clear()
+        self.student = User.objects.create_user('student', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def question_ids(self, exam):
+        return [str(question_id) for question_id in exam.question_set.order_by('id').values_list('id', flat=True)]
+
+
+class SubmissionDraftTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = make_mcq_exam()
+        self.ids = self.question_ids(self.exam)
+        self.url = f'/api/exams/{self.exam.id}/draft/'
+
+    def test_deltas_are_merged_into_one_draft(self):
+        self.client.patch(self.url, {'answers': {self.ids[0]: 'A'}}, format='json')
+        response = self.client.patch(self.url, {'answers': {self.ids[1]: 'C'}}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'version': 2, 'answered': 2})
+        draft = SubmissionDraft.objects.get(exam=self.exam, user=self.student)
+        self.assertEqual(draft.answers, {self.ids[0]: 'A', self.ids[1]: 'C'})
+
+    def test_unchanged_answers_do_not_bump_the_version(self):
+        self.client.patch(self.url, {'answers': {self.ids[0]: 'A'}}, format='json')
+        response = self.client.patch(self.url, {'answers': {self.ids[0]: 'A'}}, format='json')
+        self.assertEqual(response.data['version'], 1)
+
+    def test_empty_answer_clears_the_question(self):
+        self.client.patch(self.url, {'answers': {self.ids[0]: 'A', self.ids[1]: 'B'}}, format='json')
+        self.client.patch(self.url, {'answers': {self.ids[0]: None}}, format='json')
+        self.assertEqual(self.client.get(self.url).data['answers'], {self.ids[1]: 'B'})
+
+    def test_invalid_delta_is_rejected(self):
+        self.assertEqual(self.client.patch(self.url, {'answers': {}}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch(self.url, {'answers': {'q1': 'A'}}, format='json').status_code, 400)
+        self.assertEqual(self.client.patch('/api/exams/9999/draft/', {'answers': {'1': 'A'}}, format='json').status_code, 404)
+
+    def test_submit_without_answers_promotes_the_draft(self):
+        self.client.patch(self.url, {'answers': {self.ids[0]: 'A', self.ids[1]: 'D'}}, format='json')
+
+        response = self.client.post('/api/submissions/', {'exam': self.exam.id, 'time_taken': 12}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        submission = Submission.objects.get(exam=self.exam, user=self.student)
+        self.assertEqual(submission.get_answers(), {self.ids[0]: 'A', self.ids[1]: 'D'})
+        self.assertEqual((submission.total_questions, submission.correct_answers), (4, 1))
+        self.assertEqual(submission.time_taken, 12)
+        self.assertFalse(SubmissionDraft.objects.filter(exam=self.exam, user=self.student).exists())
+
+    def test_submit_without_answers_or_draft_is_rejected(self):
+        response = self.client.post('/api/submissions/', {'exam': self.exam.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Submission.objects.exists())
+
+    def test_no_autosave_after_submitting(self):
+        self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {self.ids[0]: 'A'}}, format='json')
+        response = self.client.patch(self.url, {'answers': {self.ids[1]: 'B'}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DuplicateSubmissionTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = make_mcq_exam()
+        self.ids = self.question_ids(self.exam)
+
+    def test_second_submit_is_rejected(self):
+        first = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {self.ids[0]: 'A'}}, format='json')
+        second = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {self.ids[0]: 'B'}}, format='json')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 400)
+        self.assertEqual(second.data['detail'], 'You have already submitted this exam.')
+        self.assertEqual(Submission.objects.get(exam=self.exam, user=self.student).get_answers(), {self.ids[0]: 'A'})
+
+    def test_unique_constraint_rejects_duplicates(self):
+        Submission.objects.create(exam=self.exam, user=self.student, answers={self.ids[0]: 'A'})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Submission.objects.create(exam=self.exam, user=self.student, answers={self.ids[0]: 'B'})
+
+    def test_other_students_can_still_submit(self):
+        other = User.objects.create_user('other', password='secret')
+        Submission.objects.create(exam=self.exam, user=other, answers={self.ids[0]: 'A'})
+        response = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {self.ids[0]: 'A'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+
+class ExamAttemptTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = make_mcq_exam('ABCD')
+        self.exam.questions_per_attempt = 2
+        self.exam.save()
+
+    def drawn_ids(self):
+        response = self.client.get(f'/api/exams/{self.exam.id}/')
+        return [str(question['id']) for question in response.data['questions']]
+
+    def test_students_only_get_their_drawn_questions(self):
+        [listed] = self.client.get('/api/exams/').data
+        self.assertEqual(listed['questions'], [])
+        [available] = self.client.get('/api/student/dashboard/').data['available_exams']
+        self.assertEqual(available['questions'], [])
+        self.assertEqual(self.client.get(f'/api/questions/?exam={self.exam.id}').data, [])
+
+        drawn = self.drawn_ids()
+
+        self.assertEqual(len(drawn), 2)
+        questions = self.client.get(f'/api/questions/?exam={self.exam.id}').data
+        self.assertEqual(sorted(str(question['id']) for question in questions), sorted(drawn))
+
+    def test_grading_is_against_the_drawn_questions(self):
+        drawn = self.drawn_ids()
+        [not_drawn, *_] = [question_id for question_id in self.question_ids(self.exam) if question_id not in drawn]
+        correct = Question.objects.get(id=drawn[0]).correct_answer
+        response = self.client.post('/api/submissions/', {
+            'exam': self.exam.id, 'answers': {drawn[0]: correct, not_drawn: 'A'},
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        submission = Submission.objects.get(exam=self.exam, user=self.student)
+        self.assertEqual(submission.get_answers(), {drawn[0]: correct})
+        self.assertEqual((submission.total_questions, submission.correct_answers, submission.percentage), (2, 1, 50))
+
+def make_coding_exam():
+    """A coding exam with an echo question and a sum question."""
+    exam = Exam.objects.create(title='Coding', duration=60, exam_type='CODING')
+    echo = Question.objects.create(exam=exam, text='Echo the input', test_cases=['hello\n', 'world\n'], correct_output=['hello', 'world'])
+    add = Question.objects.create(exam=exam, text='Add two numbers', test_cases=['1 2\n', '5 7\n'], correct_output=['3', '12'])
+    return exam, echo, add
+
+
+class CodingSubmissionTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam, self.echo, self.add = make_coding_exam()
+
+    def submit(self, answers):
+        response = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Submission.objects.get(exam=self.exam, user=self.student)
+
+    def test_correct_solutions_score_full_marks(self):
+        submission = self.submit({
+            str(self.echo.id): 'print(input())',
+            str(self.add.id): 'a, b = map(int, input().split())\nprint(a + b)',
+        })
+        self.assertEqual(submission.correct_answers, 4)
+        self.assertEqual(submission.percentage, 100)
+
+    def test_each_question_runs_its_own_code(self):
+        submission = self.submit({str(self.echo.id): 'print(input())', str(self.add.id): 'print(0)'})
+        self.assertEqual(submission.correct_answers, 2)
+        self.assertEqual(submission.percentage, 50)
+
+    def test_unanswered_questions_fail_their_test_cases(self):
+        submission = self.submit({str(self.echo.id): 'print(input())'})
+        self.assertEqual(submission.correct_answers, 2)
+        self.assertEqual(submission.percentage, 50)
+
+
+
+class ExecutionCacheTests(SimpleTestCase):
+    def setUp(self):
+        execution_cache.clear()
+        self.addCleanup(execution_cache.clear)
+
+    def test_repeated_runs_are_served_from_the_cache(self):
+        execute_code('print(input())', 'python', ['hi\n'])
+        hits = execution_cache.hits
+        [result] = execute_code('print(input())', 'python', ['hi\n'])
+        self.assertEqual(result['output'].strip(), 'hi')
+        self.assertEqual(execution_cache.hits, hits + 1)
+
+    def test_time_limit_verdicts_are_not_cached(self):
+        limits = {**get_limits(), 'time_limit': 0.5}
+        [result] = execute_code('import time\ntime.sleep(5)', 'python', [''], limits)
+        self.assertEqual(result['limit_exceeded'], 'time')
+        self.assertEqual(execution_cache.stats()['entries'], 0)
+
+
+class ExecuteCodeTests(ExamTestCase):
+    url = '/api/execute-code/'
+
+    def setUp(self):
+        super().setUp()
+        self.exam, self.echo, self.add = make_coding_exam()
+        execution_cache.clear()
+
+    def run_async(self, data, user=None):
+        """POST data to AsyncExecuteCodeView, with a bearer token for user when given."""
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'} if user else {}
+        request = RequestFactory().post(self.url, data, content_type='application/json', **headers)
+        return async_to_sync(AsyncExecuteCodeView.as_view())(request)
+
+    def test_non_integer_question_is_rejected(self):
+        data = {'code': 'print(1)', 'language': 'python', 'question': 'abc'}
+        self.assertEqual(self.client.post(self.url, data, format='json').status_code, 400)
+        self.assertEqual(self.run_async(data, self.student).status_code, 400)
+
+    def test_running_code_needs_authentication(self):
+        data = {'code': 'print(1)', 'language': 'python', 'question': self.echo.id}
+        self.assertEqual(APIClient().post(self.url, data, format='json').status_code, 401)
+        self.assertEqual(self.run_async(data).status_code, 401)
+
+    def test_students_do_not_get_hidden_inputs_back(self):
+        self.echo.test_cases = ['SECRET-INPUT-42\n']
+        self.echo.save()
+        data = {'code': 'print(len(input()))', 'language': 'python', 'question': self.echo.id}
+
+        [result] = self.client.post(self.url, data, format='json').data['results']
+        self.assertNotIn('test_case', result)
+        self.assertEqual(result['output'].strip(), '15')
+        [result] = json.loads(self.run_async(data, self.student).content)['results']
+        self.assertNotIn('test_case', result)
+
+        staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        [result] = json.loads(self.run_async(data, staff).content)['results']
+        self.assertEqual(result['test_case'], 'SECRET-INPUT-42\n')
+
+    def test_stream_yields_one_ndjson_event_per_result(self):
+        response = self.client.post(self.url, {
+            'code': 'print(input())', 'language': 'python', 'test_cases': ['a\n', 'b\n'], 'stream': True,
+        }, format='json')
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(events[0], {'event': 'compile', 'status': 'skipped'})
+        self.assertEqual(events[-1], {'event': 'done'})
+        results = sorted(events[1:-1], key=lambda event: event['index'])
+        self.assertEqual([event['event'] for event in results], ['result', 'result'])
+        self.assertEqual([event['output'].strip() for event in results], ['a', 'b'])
+
+
+@skipUnless(admission.fcntl, 'admission control needs fcntl')
+class AdmissionTests(SimpleTestCase):
+    def setUp(self):
+        lock_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(lock_dir.cleanup)
+        limits = self.settings(
+            EXECUTION_LOCK_DIR=lock_dir.name, EXECUTION_SLOTS=1, EXECUTION_QUEUE_SIZE=1, EXECUTION_USER_CONCURRENCY=1
+        )
+        limits.enable()
+        self.addCleanup(limits.disable)
+
+    def test_each_user_is_limited_to_their_concurrency(self):
+        with admission.admit('user-1'):
+            with self.assertRaises(admission.ExecutionRejected) as rejected:
+                admission.admit('user-1')
+            self.assertGreaterEqual(rejected.exception.retry_after, 1)
+            admission.admit('user-2').release()
+        admission.admit('user-1').release()
+
+    def test_requests_beyond_slots_and_queue_are_rejected(self):
+        with admission.admit('user-1'), admission.admit('user-2'):
+            with self.assertRaises(admission.ExecutionRejected):
+                admission.admit('user-3')
+            self.assertEqual(admission.snapshot()['admitted_requests'], 2)
+
+    def test_runs_wait_for_a_free_slot(self):
+        order = []
+
+        async def run(name, hold):
+            async with admission.execution_slot():
+                order.append(name)
+                await asyncio.sleep(hold)
+                order.append(f'{name} done')
+
+        async def both():
+            await asyncio.gather(run('first', 0.05), run('second', 0))
+
+        async_to_sync(both)()
+        self.assertEqual(order, ['first', 'first done', 'second', 'second done'])
+
+    def test_rejected_runs_get_429_with_retry_after(self):
+        student = User(id=1, username='student')
+        client = APIClient()
+        client.force_authenticate(student)
+        with admission.admit(execution_client_key(student)):
+            response = client.post('/api/execute-code/', {'code': 'print(1)', 'language': 'python'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+def compare(output, expected, mode=EXACT, tolerance=1e-6, chunk_size=None):
+    """The comparator's verdict on output fed in chunks of chunk_size bytes (all at once by default)."""
+    output = output.encode()
+    chunk_size = chunk_size or max(len(output), 1)
+    with OutputComparator(expected, mode, tolerance) as comparator:
+        for start in range(0, len(output), chunk_size):
+            if not comparator.feed(output[start:start + chunk_size]):
+                return False
+        return comparator.finish()
+
+
+class OutputComparatorTests(SimpleTestCase):
+    def test_exact_ignores_only_surrounding_whitespace(self):
+        self.assertTrue(compare('  3 4\n\n', '3 4'))
+        self.assertFalse(compare('3  4\n', '3 4'))
+        self.assertFalse(compare('3\n4\n', '3 4'))
+        self.assertFalse(compare('3 4 5\n', '3 4'))
+        self.assertFalse(compare('3\n', '3 4'))
+
+    def test_whitespace_compares_tokens(self):
+        self.assertTrue(compare('3   4\n\n5\n', '3 4 5', WHITESPACE))
+        self.assertFalse(compare('3 4\n', '3 4 5', WHITESPACE))
+        self.assertFalse(compare('3 4 5 6\n', '3 4 5', WHITESPACE))
+        self.assertFalse(compare('3.0 4\n', '3 4', WHITESPACE))
+
+    def test_float_compares_numbers_within_tolerance(self):
+        self.assertTrue(compare('0.3333333 yes\n', '0.33333333 yes', FLOAT, tolerance=1e-6))
+        self.assertFalse(compare('0.3334 yes\n', '0.33333333 yes', FLOAT, tolerance=1e-6))
+        self.assertTrue(compare('0.3334\n', '0.33333333', FLOAT, tolerance=1e-3))
+        self.assertFalse(compare('0.33333333 no\n', '0.33333333 yes', FLOAT))
+
+    def test_verdict_does_not_depend_on_chunking(self):
+        cases = [
+            ('  hello world \n', 'hello world', EXACT),
+            ('hello  world\n', 'hello world', EXACT),
+            ('12 345\n6\n', '12 345 6', WHITESPACE),
+            ('1234 5', '12 345', WHITESPACE),
+            ('1.0000001 2\n', '1 2', FLOAT),
+        ]
+        for output, expected, mode in cases:
+            verdict = compare(output, expected, mode)
+            for chunk_size in (1, 2, 3):
+                with self.subTest(output=output, mode=mode, chunk_size=chunk_size):
+                    self.assertEqual(compare(output, expected, mode, chunk_size=chunk_size), verdict)
+
+    def test_mismatch_is_reported_before_the_output_ends(self):
+        comparator = OutputComparator('abc', EXACT)
+        self.assertFalse(comparator.feed(b'abd'))
+        self.assertFalse(comparator.feed(b'more output'))
+
+    def test_expected_output_from_the_case_store(self):
+        expected = ' '.join(str(number) for number in range(2000))
+        with tempfile.TemporaryDirectory() as store_dir, self.settings(CASE_STORE_DIR=store_dir):
+            [ref] = externalize([expected])
+            self.assertTrue(is_ref(ref))
+            self.assertTrue(compare(expected + '\n', ref, chunk_size=1000))
+            self.assertFalse(compare(expected + ' 1\n', ref, chunk_size=1000))
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            OutputComparator('1', 'regex')
+
+
+class QuestionComparisonTests(ExamTestCase):
+    def grade(self, mode):
+        exam = Exam.objects.create(title=f'Coding {mode}', duration=60, exam_type='CODING')
+        question = Question.objects.create(
+            exam=exam, text='Print a third', test_cases=[''], correct_output=['0.333333'],
+            output_comparison=mode, float_tolerance=1e-4
+        )
+        self.client.post('/api/submissions/', {'exam': exam.id, 'answers': {str(question.id): 'print(1 / 3)'}}, format='json')
+        return Submission.objects.get(exam=exam, user=self.student).percentage
+
+    def test_grading_uses_the_question_comparison_mode(self):
+        self.assertEqual(self.grade(EXACT), 0)
+        self.assertEqual(self.grade(FLOAT), 100)
+
+
+
+class AnswerCodecTests(SimpleTestCase):
+    def test_partly_answered_submissions_are_packed(self):
+        packed = pack_answers({'1': 'A', '2': '', '3': None, '4': 'D'}, [1, 2, 3, 4])
+        self.assertEqual(packed, bytes([1, UNANSWERED, UNANSWERED, 4]))
+        self.assertEqual(unpack_answers(packed, [1, 2, 3, 4]), {'1': 'A', '4': 'D'})
+
+    def test_invalid_answers_are_not_packed_in_strict_mode(self):
+        self.assertIsNone(pack_answers({'1': 'E'}, [1, 2]))
+        self.assertIsNone(pack_answers({'9': 'A'}, [1, 2]))
+        self.assertEqual(pack_answers({'1': 'E', '2': 'B'}, [1, 2], strict=False), bytes([UNANSWERED, 2]))
+
+class RegradeTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = User.objects.create_user('staff', password='secret', is_staff=True)
+        self.staff_client = APIClient()
+        self.staff_client.force_authenticate(self.staff)
+        self.exam = make_mcq_exam('ABCD')
+        self.ids = self.question_ids(self.exam)
+        self.other = User.objects.create_user('other', password='secret')
+        # student chose B for the first question, other left it out
+        self.first = Submission.objects.create(exam=self.exam, user=self.student, answers={self.ids[0]: 'B', self.ids[1]: 'B'})
+        self.second = Submission.objects.create(exam=self.exam, user=self.other, answers={self.ids[1]: 'B', self.ids[2]: 'C'})
+
+    def fix_key(self):
+        # The key said A but B is right; update() keeps the stored scores stale
+        Question.objects.filter(id=self.ids[0]).update(correct_answer='B')
+
+    def scores(self):
+        return list(Submission.objects.order_by('id').values_list('correct_answers', 'percentage'))
+
+    def test_regrade_applies_the_fixed_key(self):
+        # Questions left unanswered count as wrong
+        self.assertEqual(self.scores(), [(1, 25), (2, 50)])
+        self.fix_key()
+
+        response = self.staff_client.post(f'/api/exams/{self.exam.id}/regrade/', {}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'processed': 2, 'updated': 1, 'total': 2})
+        self.assertEqual(self.scores(), [(2, 50), (2, 50)])
+
+    def test_regrade_of_one_question_only_touches_its_answers(self):
+        self.fix_key()
+        response = self.staff_client.post(
+            f'/api/exams/{self.exam.id}/regrade/', {'question': int(self.ids[0])}, format='json'
+        )
+        self.assertEqual(response.data, {'processed': 1, 'updated': 1, 'total': 1})
+        self.assertEqual(self.scores(), [(2, 50), (2, 50)])
+
+    def test_regrade_of_compact_submissions(self):
+        with self.settings(COMPACT_SUBMISSION_ANSWERS=True):
+            self.first.save()
+        self.first.refresh_from_db()
+        self.assertIsNotNone(self.first.packed_answers)
+        self.fix_key()
+
+        response = self.staff_client.post(f'/api/exams/{self.exam.id}/regrade/', {}, format='json')
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual(self.scores()[0], (2, 50))
+
+    def test_regrade_streams_progress(self):
+        self.fix_key()
+        response = self.staff_client.post(f'/api/exams/{self.exam.id}/regrade/?stream=true', {}, format='json')
+        events = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(events, [{'processed': 2, 'updated': 1, 'total': 2}, {'event': 'done'}])
+        self.assertEqual(self.scores(), [(2, 50), (2, 50)])
+
+    def test_regrade_is_for_staff_and_mcq_exams(self):
+        self.assertEqual(self.client.post(f'/api/exams/{self.exam.id}/regrade/', {}, format='json').status_code, 403)
+        coding_exam, _, _ = make_coding_exam()
+        response = self.staff_client.post(f'/api/exams/{coding_exam.id}/regrade/', {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_reports_do_not_store_layouts(self):
+        # A question added after the submissions changes the layout
+        Question.objects.create(exam=self.exam, text='Late', option_a='a', option_b='b', option_c='c', option_d='d', correct_answer='A')
+        layouts = AnswerLayout.objects.count()
+
+        for report in ('item-analysis', 'collusion'):
+            response = self.staff_client.get(f'/api/exams/{self.exam.id}/{report}/')
+            self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['layout_version'])
+        self.assertEqual(AnswerLayout.objects.count(), layouts)
+
+        self.staff_client.post(f'/api/exams/{self.exam.id}/regrade/', {}, format='json')
+        self.assertEqual(AnswerLayout.objects.count(), layouts + 1)
+        response = self.staff_client.get(f'/api/exams/{self.exam.id}/collusion/')
+        self.assertEqual(response.data['layout_version'], AnswerLayout.objects.latest('version').version)
+
+
+@mock.patch('exams.db_router.replica_alias', return_value='replica')
+class ReplicaRouterTests(SimpleTestCase):
+    """Routing decisions only; no query is run, so no replica connection is needed."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(id=1, username='student')
+
+    def test_replica_reads_use_the_replica(self, replica_alias):
+        with reads_from(read_alias_for(self.user)):
+            self.assertEqual(Submission.objects.all().db, 'replica')
+        self.assertEqual(Submission.objects.all().db, 'default')
+
+    def test_writes_go_to_the_primary(self, replica_alias):
+        with reads_from('replica'):
+            self.assertEqual(ReplicaRouter().db_for_write(Submission), 'default')
+
+    def test_reads_in_a_transaction_use_the_primary(self, replica_alias):
+        with reads_from('replica'), mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(Submission.objects.all().db, 'default')
+
+    def test_writes_pin_the_user_to_the_primary(self, replica_alias):
+        request = RequestFactory().post('/api/submissions/')
+        request.user = self.user
+        ReplicaPinMiddleware(lambda request: None).process_response(request, HttpResponse(status=201))
+
+        self.assertEqual(read_alias_for(self.user), 'default')
+        with reads_from(read_alias_for(self.user)):
+            self.assertEqual(Submission.objects.all().db, 'default')
+        # Other users still read from the replica
+        self.assertEqual(read_alias_for(User(id=2, username='other')), 'replica')
+
+    def test_pin_expires(self, replica_alias):
+        with self.settings(REPLICA_PIN_SECONDS=1):
+            pin_to_primary(self.user)
+            self.assertEqual(read_alias_for(self.user), 'default')
+            with mock.patch('time.time', return_value=time.time() + 2):
+                self.assertEqual(read_alias_for(self.user), 'replica')
+
+    def test_reads_and_failed_writes_do_not_pin(self, replica_alias):
+        middleware = ReplicaPinMiddleware(lambda request: None)
+        for method, status_code in (('get', 200), ('post', 400)):
+            request = getattr(RequestFactory(), method)('/api/submissions/')
+            request.user = self.user
+            middleware.process_response(request, HttpResponse(status=status_code))
+        self.assertEqual(read_alias_for(self.user), 'replica')
+
+    def test_no_replica_configured(self, replica_alias):
+        replica_alias.return_value = None
+        self.assertEqual(read_alias_for(self.user), 'default')
+
+
+REPLICA = getattr(settings, 'READ_REPLICA_DATABASE', 'replica')
+HAS_REPLICA = REPLICA in settings.DATABASES
+
+
+@skipUnless(HAS_REPLICA, 'needs a second database for the replica, e.g. with "TEST": {"MIRROR": "default"}')
+class ReplicaReadAfterWriteTests(TransactionTestCase):
+    """The dashboard with a real second database connection for the replica."""
+    databases = {'default', REPLICA} if HAS_REPLICA else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        self.replica = connections[REPLICA]
+        self.student = User.objects.create_user('student', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.exam = make_mcq_exam('AB')
+
+    def dashboard_submissions(self):
+        response = self.client.get('/api/student/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return [submission['exam'] for submission in response.data['exam_history']]
+
+    def test_dashboard_reads_the_primary_right_after_a_submit(self):
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            self.dashboard_submissions()
+        self.assertTrue(replica_queries.captured_queries)
+
+        question_id = str(self.exam.question_set.first().id)
+        response = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {question_id: 'A'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            self.assertEqual(self.dashboard_submissions(), [self.exam.id])
+        self.assertEqual(replica_queries.captured_queries, [])
+
+        # Once the pin is gone the dashboard is read from the replica again
+        cache.clear()
+        with CaptureQueriesContext(self.replica) as replica_queries:
+            self.assertEqual(self.dashboard_submissions(), [self.exam.id])
+        self.assertTrue(replica_queries.captured_queries)
+
+
+class JudgeQueueTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam, self.echo, self.add = make_coding_exam()
+
+    def run_job(self, **fields):
+        payload = {'code': 'print(input())', 'language': 'python', 'test_cases': ['hi\n'], 'limits': None}
+        return JudgeJob.objects.create(kind=JudgeJob.RUN, payload=payload, **fields)
+
+    def stale(self):
+        return timezone.now() - timedelta(seconds=settings.JUDGE_JOB_LEASE_SECONDS + 1)
+
+    def test_claims_the_oldest_pending_job_once(self):
+        first, second = self.run_job(), self.run_job()
+
+        claimed = claim_job('worker-1')
+        self.assertEqual(claimed.id, first.id)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts), (JudgeJob.RUNNING, 'worker-1', 1))
+        self.assertEqual(claim_job('worker-2').id, second.id)
+        self.assertIsNone(claim_job('worker-3'))
+
+    def test_run_job_records_events(self):
+        self.run_job()
+        job = claim_job('worker-1')
+        judge_queue.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JudgeJob.DONE)
+        results = [event for event in job.events if event['event'] == 'result']
+        self.assertEqual([(result['index'], result['output'].strip()) for result in results], [(0, 'hi')])
+        # Inputs are added back on the web side, and only for callers allowed to see them
+        self.assertNotIn('test_case', results[0])
+
+    def test_jobs_of_dead_workers_are_requeued_then_failed(self):
+        retried = self.run_job(status=JudgeJob.RUNNING, worker='dead', attempts=1, heartbeat_at=self.stale())
+        exhausted = self.run_job(
+            status=JudgeJob.RUNNING, worker='dead', attempts=settings.JUDGE_JOB_MAX_ATTEMPTS, heartbeat_at=self.stale()
+        )
+        alive = self.run_job(status=JudgeJob.RUNNING, worker='alive', attempts=1, heartbeat_at=timezone.now())
+
+        self.assertEqual(requeue_expired(), (1, 1))
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((retried.status, retried.worker), (JudgeJob.PENDING, ''))
+        self.assertEqual(exhausted.status, JudgeJob.FAILED)
+        self.assertEqual(exhausted.error, 'The judge worker stopped responding.')
+        self.assertEqual((alive.status, alive.worker), (JudgeJob.RUNNING, 'alive'))
+
+    def test_queued_submission_is_graded_by_a_worker(self):
+        answers = {str(self.echo.id): 'print(input())', str(self.add.id): 'print(sum(map(int, input().split())))'}
+        with self.settings(JUDGE_BACKEND='queue'):
+            response = self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 201)
+        submission = Submission.objects.get(exam=self.exam, user=self.student)
+        self.assertEqual(submission.percentage, 0)
+        self.assertEqual(JudgeJob.objects.filter(kind=JudgeJob.GRADE, submission=submission).count(), 1)
+
+        self.assertEqual(run_worker(name='worker-1', max_jobs=1), 1)
+
+        submission.refresh_from_db()
+        self.assertEqual(submission.percentage, 100)
+        self.assertFalse(JudgeJob.objects.exists())
+
+    def test_worker_recovers_a_job_from_a_crashed_worker(self):
+        submission = Submission.objects.create(exam=self.exam, user=self.student, answers={str(self.echo.id): 'print(input())'})
+        job = JudgeJob.objects.create(kind=JudgeJob.GRADE, submission=submission)
+        # worker-1 claims the job and dies without finishing it
+        self.assertEqual(claim_job('worker-1').id, job.id)
+        JudgeJob.objects.filter(id=job.id).update(heartbeat_at=self.stale())
+
+        self.assertEqual(run_worker(name='worker-2', max_jobs=1), 1)
+
+        submission.refresh_from_db()
+        self.assertEqual(submission.percentage, 50)
+        self.assertFalse(JudgeJob.objects.filter(id=job.id).exists())
+
+
+class WriteBehindIngestionTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam = make_mcq_exam('AB')
+        self.ids = self.question_ids(self.exam)
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        write_behind = self.settings(SUBMISSION_INGESTION_MODE='write_behind', SUBMISSION_SPOOL_DIR=spool_dir.name)
+        write_behind.enable()
+        self.addCleanup(write_behind.disable)
+
+    def submit(self, answers):
+        return self.client.post(
+            '/api/submissions/', {'exam': self.exam.id, 'answers': answers, 'time_taken': 17}, format='json'
+        )
+
+    def test_flush_stores_the_same_fields_as_a_direct_submit(self):
+        response = self.submit({self.ids[0]: 'A', self.ids[1]: 'C'})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Submission.objects.exists())
+
+        self.assertEqual(flush_submission_queue(), 1)
+
+        submission = Submission.objects.get(exam=self.exam, user=self.student)
+        self.assertEqual(submission.get_answers(), {self.ids[0]: 'A', self.ids[1]: 'C'})
+        self.assertEqual(submission.time_taken, 17)
+        self.assertEqual((submission.correct_answers, submission.percentage), (1, 50))
+        self.assertEqual(flush_submission_queue(), 0)
+
+    def test_second_submit_is_rejected_while_queued(self):
+        self.assertEqual(self.submit({self.ids[0]: 'A'}).status_code, 202)
+        self.assertEqual(self.submit({self.ids[0]: 'B'}).status_code, 400)
+        flush_submission_queue()
+        self.assertEqual(Submission.objects.get().get_answers(), {self.ids[0]: 'A'})
+
+    def test_rerun_after_crash_queues_grading_for_inserted_rows(self):
+        exam, echo, _ = make_coding_exam()
+        answers = {str(echo.id): 'print(input())'}
+        response = self.client.post('/api/submissions/', {'exam': exam.id, 'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 202)
+        # The previous flush committed the row and died before its grade job was queued
+        Submission.objects.create(exam=exam, user=self.student, answers=answers)
+
+        with self.settings(JUDGE_BACKEND='queue'):
+            self.assertEqual(flush_submission_queue(), 0)
+
+        job = JudgeJob.objects.get(kind=JudgeJob.GRADE)
+        self.assertEqual(job.submission.user, self.student)
+        self.assertFalse(ingestion.is_queued(exam.id, self.student.id))
+
+
+
+class CompressionTests(SimpleTestCase):
+    events = [json.dumps({'event': 'result', 'index': index}) + '\n' for index in range(3)]
+
+    def middleware_response(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation_honours_q_values(self):
+        with self.settings(RESPONSE_COMPRESSION_ENCODINGS=['gzip']):
+            self.assertEqual(negotiate_encoding('br, gzip;q=0.5'), 'gzip')
+            self.assertIsNone(negotiate_encoding('gzip;q=0'))
+            self.assertEqual(negotiate_encoding('*'), 'gzip')
+            self.assertIsNone(negotiate_encoding('identity'))
+
+    def test_large_json_is_gzipped_and_small_json_is_not(self):
+        body = json.dumps([{'id': index, 'text': 'question'} for index in range(200)]).encode()
+        response = self.middleware_response(HttpResponse(body, content_type='application/json'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, GZIP_WBITS), body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.middleware_response(HttpResponse(b'{}', content_type='application/json'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def assert_each_chunk_is_flushed(self, pieces, decompress):
+        # Each compressed piece decodes on its own to the event it carries
+        for event, piece in zip(self.events, pieces):
+            self.assertEqual(decompress(piece).decode(), event)
+
+    def test_live_streams_flush_every_gzip_chunk(self):
+        stream = zlib.decompressobj(GZIP_WBITS)
+        self.assert_each_chunk_is_flushed(compress_stream(iter(self.events), 'gzip', flush_each=True), stream.decompress)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_live_streams_flush_every_br_chunk(self):
+        stream = brotli.Decompressor()
+        self.assert_each_chunk_is_flushed(compress_stream(iter(self.events), 'br', flush_each=True), stream.process)
+
+    def test_downloads_are_flushed_in_large_blocks(self):
+        rows = [f'{index},student{index}\n' for index in range(1000)]
+        *pieces, last = compress_stream(iter(rows), 'gzip', flush_each=False)
+        # Under STREAM_FLUSH_BYTES of rows nothing is flushed until the stream finishes
+        stream = zlib.decompressobj(GZIP_WBITS)
+        self.assertEqual(stream.decompress(b''.join(pieces)), b'')
+        self.assertEqual(stream.decompress(last).decode(), ''.join(rows))
+
+    def test_middleware_does_not_flush_streamed_downloads_per_row(self):
+        response = StreamingHttpResponse(iter(['a,b\n'] * 10), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="export.csv"'
+        response = self.middleware_response(response)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        *pieces, last = response.streaming_content
+        self.assertEqual(zlib.decompressobj(GZIP_WBITS).decompress(b''.join(pieces)), b'')
+
+
+OK, NO_FACE, MULTIPLE_FACES = ProctoringSession.OK, ProctoringSession.NO_FACE, ProctoringSession.MULTIPLE_FACES
+
+
+class ProctoringTimelineTests(SimpleTestCase):
+    def session(self, *frames):
+        session = ProctoringSession()
+        for timestamp_ms, verdict in frames:
+            session.add_verdict(timestamp_ms, verdict)
+        return session
+
+    def test_consecutive_verdicts_merge_into_one_interval(self):
+        session = self.session((0, OK), (1000, NO_FACE), (2000, NO_FACE), (3000, OK))
+        self.assertEqual(session.timeline, [[NO_FACE, 1000, 3000, 2]])
+        self.assertEqual((session.no_face_frames, session.no_face_ms, session.longest_no_face_ms), (2, 2000, 2000))
+        self.assertEqual(session.risk_score, 0.5)
+
+    def test_a_different_verdict_starts_a_new_interval(self):
+        session = self.session((0, NO_FACE), (1000, MULTIPLE_FACES), (2000, OK))
+        self.assertEqual(session.timeline, [[NO_FACE, 0, 1000, 1], [MULTIPLE_FACES, 1000, 2000, 1]])
+        self.assertEqual((session.no_face_ms, session.multiple_faces_ms), (1000, 1000))
+        self.assertTrue(session.flagged)
+
+    def test_a_gap_between_frames_closes_the_interval(self):
+        with self.settings(PROCTORING_INTERVAL_GAP_MS=5000):
+            session = self.session((0, NO_FACE), (10000, NO_FACE))
+        self.assertEqual(session.timeline, [[NO_FACE, 0, 0, 1], [NO_FACE, 10000, 10000, 1]])
+        self.assertEqual(session.no_face_ms, 0)
+
+    def test_late_frames_are_folded_in_at_the_latest_time(self):
+        session = self.session((0, NO_FACE), (2000, NO_FACE), (1500, NO_FACE))
+        self.assertEqual(session.timeline, [[NO_FACE, 0, 2000, 3]])
+        self.assertEqual(session.no_face_ms, 2000)
+
+    def test_only_sustained_absence_is_flagged(self):
+        with self.settings(PROCTORING_FLAG_NO_FACE_MS=5000, PROCTORING_FLAG_RISK_SCORE=1):
+            self.assertFalse(self.session((0, NO_FACE), (4000, OK)).flagged)
+            self.assertTrue(self.session((0, NO_FACE), (6000, OK)).flagged)
+
+
+SORT_PROGRAM = """
+def bubble(values):
+    n = len(values)
+    for i in range(n):
+        for j in range(n - i - 1):
+            if values[j] > values[j + 1]:
+                values[j], values[j + 1] = values[j + 1], values[j]
+    return values
+
+numbers = list(map(int, input().split()))
+result = bubble(numbers)
+total = 0
+for item in result:
+    total += item * 2
+print(' '.join(map(str, result)), total)
+"""
+
+SEARCH_PROGRAM = """
+lo, hi = 0, 10 ** 9
+target = int(input())
+while lo < hi:
+    mid = (lo + hi) // 2
+    if mid * mid < target:
+        lo = mid + 1
+    else:
+        hi = mid
+print(lo)
+"""
+
+
+class SimilarityTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.exam, self.echo, _ = make_coding_exam()
+
+    def submit(self, username, code):
+        user = User.objects.create(username=username)
+        submission = Submission.objects.create(exam=self.exam, user=user, answers={str(self.echo.id): code})
+        index_submission(submission)
+        return submission
+
+    def renamed(self, code):
+        return code.replace('values', 'arr').replace('numbers', 'xs').replace('total', 'acc')
+
+    def test_renamed_copies_have_the_same_fingerprints(self):
+        self.assertEqual(fingerprints(SORT_PROGRAM).tolist(), fingerprints(self.renamed(SORT_PROGRAM)).tolist())
+        self.assertFalse(set(fingerprints(SORT_PROGRAM).tolist()) & set(fingerprints(SEARCH_PROGRAM).tolist()))
+
+    def test_only_similar_submissions_are_paired(self):
+        original = self.submit('first', SORT_PROGRAM)
+        copy = self.submit('second', self.renamed(SORT_PROGRAM) + '# my own work\n')
+        self.submit('third', SEARCH_PROGRAM)
+
+        [pair] = similar_pairs(self.exam)
+        self.assertEqual((pair['first']['submission'], pair['second']['submission']), (original.id, copy.id))
+        self.assertEqual(pair['score'], 1.0)
+        self.assertGreaterEqual(pair['shared'], settings.SIMILARITY_MIN_SHARED)
+
+    def test_pairs_below_the_thresholds_are_not_recorded(self):
+        self.submit('first', SORT_PROGRAM)
+        # Only the bubble sort is shared, about half of the fingerprints
+        partial = SORT_PROGRAM.split('numbers =')[0] + SEARCH_PROGRAM
+        with self.settings(SIMILARITY_MIN_SCORE=0.9):
+            self.submit('second', partial)
+        self.assertEqual(similar_pairs(self.exam), [])
+        with self.settings(SIMILARITY_MIN_SCORE=0.1):
+            self.submit('third', partial)
+        self.assertEqual(len(similar_pairs(self.exam)), 2)
+
+    def test_common_fingerprints_form_no_pairs(self):
+        with self.settings(SIMILARITY_COMMON_FINGERPRINT_LIMIT=2):
+            self.submit('first', SORT_PROGRAM)
+            self.submit('second', SORT_PROGRAM)
+            # Every fingerprint is now held by two submissions, so a third copy matches nothing
+            self.submit('third', SORT_PROGRAM)
+        self.assertEqual(len(similar_pairs(self.exam)), 1)
+
+class SubmissionExportTests(ExamTestCase):
+    def test_csv_and_jsonl_rows_match(self):
+        exam = make_mcq_exam('AB')
+        ids = self.question_ids(exam)
+        submission = Submission.objects.create(exam=exam, user=self.student, answers={ids[0]: 'A'}, time_taken=9)
+
+        [header, row] = list(csv.reader(iter_submission_export(exam.id, 'csv')))
+        [record] = [json.loads(line) for line in iter_submission_export(exam.id, 'jsonl')]
+
+        self.assertEqual(header, list(record))
+        self.assertEqual(record['submitted_at'], submission.submitted_at.isoformat())
+        self.assertEqual(row[header.index('submitted_at')], record['submitted_at'])
+        self.assertEqual(json.loads(row[header.index('answers')]), record['answers'])
+        self.assertEqual((record['username'], record['time_taken'], record['percentage']), ('student', 9, 50.0))
+
+
+class LiveStatsTests(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff_client = APIClient()
+        self.staff_client.force_authenticate(User.objects.create_user('staff', password='secret', is_staff=True))
+        self.exam = make_mcq_exam('AB')
+
+    def stats(self):
+        return self.staff_client.get(f'/api/exams/{self.exam.id}/live-stats/')
+
+    def test_counters_follow_submissions(self):
+        with self.settings(LIVE_STATS_ENABLED=True):
+            self.assertEqual(self.stats().data['submitted'], 0)
+            ids = self.question_ids(self.exam)
+            self.client.post('/api/submissions/', {'exam': self.exam.id, 'answers': {ids[0]: 'A'}}, format='json')
+            response = self.stats()
+        self.assertEqual(
+            (response.data['submitted'], response.data['graded'], response.data['average_score']), (1, 1, 50.0)
+        )
+
+    def test_disabled_by_default(self):
+        response = self.stats()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data, {'detail': 'Live stats are disabled.'})
+
+    def test_check_rejects_a_per_process_cache(self):
+        self.assertEqual(check_live_stats_cache(None), [])
+        with self.settings(LIVE_STATS_ENABLED=True):
+            [error] = check_live_stats_cache(None)
+            self.assertEqual(error.id, 'exams.E001')
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}}
+        with self.settings(LIVE_STATS_ENABLED=True, CACHES=redis):
+            self.assertEqual(check_live_stats_cache(None), [])
+
+
+class CollusionTests(SimpleTestCase):
+    def setUp(self):
+        # 40 students answer every question correctly except for their own
+        # one-off slip; students 0 and 1 share the same five wrong answers
+        self.key = np.full(20, 1, dtype=np.uint8)
+        self.matrix = np.tile(self.key, (40, 1))
+        for student in range(2, 40):
+            self.matrix[student, student % 20] = 2 + student % 3
+        self.matrix[0, :5] = self.matrix[1, :5] = [2, 3, 4, 2, 3]
+
+    def test_copied_wrong_answers_are_the_top_pair(self):
+        [pair] = collusion_pairs(self.matrix, self.key, limit=1)
+        self.assertEqual((pair['first'], pair['second']), (0, 1))
+        self.assertEqual(pair['shared_wrong'], 5)
+        self.assertGreater(pair['surprise'], 3)
+
+    def test_min_shared_wrong_filters_pairs(self):
+        self.assertEqual(len(collusion_pairs(self.matrix, self.key, limit=100, min_shared_wrong=6)), 0)
+        # 0 is an explicit threshold, not "use the setting"
+        with self.settings(COLLUSION_MIN_SHARED_WRONG=3):
+            self.assertEqual(len(collusion_pairs(self.matrix, self.key, limit=100)), 1)
+            self.assertEqual(len(collusion_pairs(self.matrix, self.key, limit=100, min_shared_wrong=0)), 100)
+
+    def test_fewer_than_two_students(self):
+        self.assertEqual(collusion_pairs(self.matrix[:1], self.key), [])
@@ -1,12 +1,16 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     ExamViewSet, QuestionViewSet, SubmissionViewSet, UserViewSet,
     RegisterView, StudentDashboardView, UpdateProfileView, ChangePasswordView,
-    CustomTokenObtainPairView, UploadExamsCsvView, ExecuteCodeView
+    CustomTokenObtainPairView, UploadExamsCsvView, ExecuteCodeView, SubmissionDraftView,
+    AsyncStudentDashboardView, AsyncExamDetailView, AsyncSubmissionListView, AsyncExecuteCodeView,
+    ExecutionCacheStatsView, ExecutionAdmissionStatsView, CaseDataView, SubmissionExportView, GradebookExportView,
+    ProctoringFrameView, ProctoringFrameListView, ProctoringFrameImageView,
+    ProctoringSessionListView, ProctoringSessionDetailView, ExamLiveStatsView, AsyncExamLiveStatsStreamView,
 )
-# from .views import ProctoringFrameAnalysisView
 
 router = DefaultRouter()
 router.register(r'exams', ExamViewSet)
@@ -23,7 +27,48 @@ urlpatterns = [
     path('profile/update/', UpdateProfileView.as_view(), name='update-profile'),
     path('profile/change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('upload-exams-csv/', UploadExamsCsvView.as_view(), name='upload_exams_csv'),
-    path('execute-code/', ExecuteCodeView.as_view(), name='execute_code'),
-
-    # path('proctoring/frame-analysis/', ProctoringFrameAnalysisView.as_view(), name='proctoring-frame-analysis'),
+    path(
+        'execute-code/',
+        (AsyncExecuteCodeView if settings.ASYNC_CODE_EXECUTION else ExecuteCodeView).as_view(),
+        name='execute_code'
+    ),
+    path('execute-code/cache-stats/', ExecutionCacheStatsView.as_view(), name='execution-cache-stats'),
+    path('execute-code/admission-stats/', ExecutionAdmissionStatsView.as_view(), name='execution-admission-stats'),
+    path('exams/<int:exam_id>/draft/', SubmissionDraftView.as_view(), name='submission-draft'),
+    path('exams/<int:exam_id>/live-stats/', ExamLiveStatsView.as_view(), name='exam-live-stats'),
+    path('case-data/<str:digest>/', CaseDataView.as_view(), name='case-data'),
+    path(
+        'exports/exams/<int:exam_id>/submissions.<str:export_format>',
+        SubmissionExportView.as_view(), name='submission-export'
+    ),
+    path('exports/gradebook.<str:export_format>', GradebookExportView.as_view(), name='gradebook-export'),
+    path('proctoring/frame-analysis/', ProctoringFrameView.as_view(), name='proctoring-frame-analysis'),
+    path('proctoring/exams/<int:exam_id>/sessions/', ProctoringSessionListView.as_view(), name='proctoring-sessions'),
+    path(
+        'proctoring/exams/<int:exam_id>/students/<int:user_id>/',
+        ProctoringSessionDetailView.as_view(), name='proctoring-session'
+    ),
+    path(
+        'proctoring/exams/<int:exam_id>/students/<int:user_id>/frames/',
+        ProctoringFrameListView.as_view(), name='proctoring-frame-list'
+    ),
+    path(
+        'proctoring/exams/<int:exam_id>/students/<int:user_id>/frames/<int:timestamp>/',
+        ProctoringFrameImageView.as_view(), name='proctoring-frame-image'
+    ),
 ]
+
+# Under ASGI, serve the read-heavy endpoints with native async views. These
+# take precedence over the router routes for the same paths. The live stats
+# stream never ends, so it is only served here: under WSGI it would hold a
+# worker for good.
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = [
+        path('student/dashboard/', AsyncStudentDashboardView.as_view(), name='student-dashboard'),
+        path('exams/<int:pk>/', AsyncExamDetailView.as_view(), name='exam-detail'),
+        path('submissions/', AsyncSubmissionListView.as_view(), name='submission-list'),
+        path(
+            'exams/<int:exam_id>/live-stats/stream/',
+            AsyncExamLiveStatsStreamView.as_view(), name='exam-live-stats-stream'
+        ),
+    ] + urlpatterns
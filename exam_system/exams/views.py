@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
@@ -5,24 +6,45 @@ from rest_framework.decorators import action, api_view
 from .serializers import *
 from .models import *
 from .permissions import *
+from .judge import (
+    LANGUAGE_CONFIG, execute_code, execute_code_async, get_limits,
+    iter_execution, iter_execution_async
+)
+from .ingestion import is_write_behind, is_queued, enqueue_submission
+from .authentication import AsyncAPIView, aauthenticate, json_response
+from . import admission
+from .admission import ExecutionRejected, admit, arelease_after, release_after
+from .execution_cache import execution_cache
+from . import case_store, frame_archive, live_stats
+from .proctoring import ALERTS, analyze_frame, record_verdict
+from .similarity import index_new_submission, similar_pairs
+from .collusion import collusion_report
+from .grading import item_analysis, iter_regrade, regrade
+from .exports import EXPORT_FORMATS, iter_gradebook_export, iter_submission_export
+from .db_router import read_alias_for, replica_reads
+from .judge_queue import (
+    JudgeJobError, aiter_queued_execution, execute_queued, execute_queued_async, grade_coding_submission,
+    iter_queued_execution, use_judge_queue,
+)
 from rest_framework.generics import RetrieveAPIView, ListAPIView, CreateAPIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 import csv
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 import logging
+from django.db import transaction, IntegrityError
+from django.http import Http404
 from rest_framework.parsers import MultiPartParser
 import cv2
 import numpy as np
-import subprocess
-import tempfile
-import os
-import platform
+import json
 
 logger = logging.getLogger(__name__)
 
@@ -86,6 +108,10 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
+def question_prefetch(user):
+    """Lookups to prefetch for listing exams: their questions for staff; students are sent none."""
+    return ('question_set',) if user.is_staff else ()
+
 class ExamViewSet(viewsets.ModelViewSet):
     queryset = Exam.objects.all()
     serializer_class = ExamSerializer
@@ -96,17 +122,23 @@ class ExamViewSet(viewsets.ModelViewSet):
             return Exam.objects.all()
         # For students, only show unsubmitted exams
         submitted_exam_ids = Submission.objects.filter(user=self.request.user).values_list('exam_id', flat=True)
-        return Exam.objects.exclude(id__in=submitted_exam_ids).prefetch_related('question_set')
+        # Students only see questions through retrieve, which loads those of their attempt
+        return Exam.objects.exclude(id__in=submitted_exam_ids)
 
     def get_object(self):
-        # Get the object from the base class
-        obj = super().get_object()
+        from rest_framework.exceptions import PermissionDenied
         # If user is staff, return the object
         if self.request.user.is_staff:
-            return obj
-        # For students, check if they have submitted this exam
-        if Submission.objects.filter(exam=obj, user=self.request.user).exists():
-            from rest_framework.exceptions import PermissionDenied
+            return super().get_object()
+        # The student queryset already excludes submitted exams, so only a
+        # miss needs the extra query to explain why
+        try:
+            obj = super().get_object()
+        except Http404:
+            if Submission.objects.filter(exam_id=self.kwargs.get('pk'), user=self.request.user).exists():
+                raise PermissionDenied("You have already submitted this exam.")
+            raise
+        if is_write_behind() and is_queued(obj.id, self.request.user.id):
             raise PermissionDenied("You have already submitted this exam.")
         return obj
 
@@ -133,7 +165,10 @@ class ExamViewSet(viewsets.ModelViewSet):
     def retrieve(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
-            serializer = self.get_serializer(instance)
+            context = self.get_serializer_context()
+            if not request.user.is_staff:
+                context['attempt_questions'] = ExamAttempt.draw(instance, request.user).questions(student_questions())
+            serializer = self.get_serializer_class()(instance, context=context)
             return Response(serializer.data)
         except Exception as e:
             return Response(
@@ -141,6 +176,88 @@ class ExamViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
+    def regrade(self, request, pk=None):
+        """
+        Recompute scores of existing submissions after an answer key fix.
+
+        Optional body: {"question": id} to only touch submissions that
+        answered it, and "stream": true for NDJSON progress per batch.
+        """
+        exam = self.get_object()
+        if exam.exam_type == 'CODING':
+            return Response({"detail": "Coding exams are graded by the judge."}, status=status.HTTP_400_BAD_REQUEST)
+        question_id = request.data.get('question')
+        if question_id is not None and not Question.objects.filter(id=question_id, exam=exam).exists():
+            return Response({"detail": "Question not found in this exam."}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.data.get('stream') or request.query_params.get('stream'):
+            return StreamingHttpResponse(
+                ndjson_events(iter_regrade(exam, question_id)),
+                content_type='application/x-ndjson'
+            )
+        return Response(regrade(exam, question_id), status=status.HTTP_200_OK)
+
+    @action(
+        detail=True, methods=['get'], url_path='item-analysis',
+        permission_classes=[permissions.IsAuthenticated, IsAdminUser]
+    )
+    @replica_reads
+    def item_analysis(self, request, pk=None):
+        """
+        Correct rate and answer distribution for each question of the exam.
+        """
+        exam = self.get_object()
+        if exam.exam_type == 'CODING':
+            return Response({"detail": "Item analysis is only available for MCQ exams."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(item_analysis(exam), status=status.HTTP_200_OK)
+
+    @action(
+        detail=True, methods=['get'], url_path='collusion',
+        permission_classes=[permissions.IsAuthenticated, IsAdminUser]
+    )
+    @replica_reads
+    def collusion(self, request, pk=None):
+        """
+        Pairs of students with improbably many identical wrong answers, most
+        surprising first. Optional ?limit= (default 50) and ?min_shared_wrong=.
+        """
+        exam = self.get_object()
+        if exam.exam_type == 'CODING':
+            return Response({"detail": "Collusion analysis is only available for MCQ exams."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 1000)
+            min_shared_wrong = int(request.query_params['min_shared_wrong']) if 'min_shared_wrong' in request.query_params else None
+        except ValueError:
+            return Response({"detail": "limit and min_shared_wrong must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"detail": "limit must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(collusion_report(exam, limit, min_shared_wrong), status=status.HTTP_200_OK)
+
+    @action(
+        detail=True, methods=['get'], url_path='similarity',
+        permission_classes=[permissions.IsAuthenticated, IsAdminUser]
+    )
+    @replica_reads
+    def similarity(self, request, pk=None):
+        """
+        Pairs of submissions with similar code, most similar first.
+        Optional ?min_score=, ?question= and ?limit= (default 100).
+        """
+        exam = self.get_object()
+        if exam.exam_type != 'CODING':
+            return Response({"detail": "Similarity is only available for coding exams."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            min_score = float(request.query_params['min_score']) if 'min_score' in request.query_params else None
+            question_id = int(request.query_params['question']) if 'question' in request.query_params else None
+            limit = min(int(request.query_params.get('limit', 100)), 1000)
+        except ValueError:
+            return Response({"detail": "min_score, question and limit must be numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "exam": exam.id,
+            "pairs": similar_pairs(exam, min_score, question_id, limit),
+        }, status=status.HTTP_200_OK)
+
 class QuestionViewSet(viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
@@ -153,9 +270,20 @@ class QuestionViewSet(viewsets.ModelViewSet):
 
         # Otherwise, filter by exam_id if provided
         exam_id = self.request.query_params.get('exam', None)
-        if exam_id:
+        if not exam_id:
+            return Question.objects.none()
+        if self.request.user.is_staff:
             return Question.objects.filter(exam_id=exam_id)
-        return Question.objects.none()
+        # Students only get the questions drawn for their own attempt
+        attempt = ExamAttempt.objects.filter(exam_id=exam_id, user=self.request.user).first()
+        if attempt is None:
+            return Question.objects.none()
+        return student_questions().filter(exam_id=exam_id, id__in=attempt.question_ids)
+
+    def get_serializer_class(self):
+        if self.request.user.is_staff:
+            return QuestionSerializer
+        return StudentQuestionSerializer
 
     def create(self, request, *args, **kwargs):
         if not request.user.is_staff:
@@ -185,6 +313,76 @@ class QuestionViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save()
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Apply many question changes to one exam in a single transaction.
+
+        POST /api/questions/bulk/?exam=<id> with
+        {"upsert": [{...question fields, "id" to update}], "delete": [ids]}.
+        Returns every question of the exam after the change.
+        """
+        exam_id = request.query_params.get('exam', None)
+        if not exam_id:
+            return Response({"detail": "Exam ID is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            exam = Exam.objects.get(id=exam_id)
+        except (Exam.DoesNotExist, ValueError):
+            return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        upserts = request.data.get('upsert', [])
+        delete_ids = request.data.get('delete', [])
+        if not isinstance(upserts, list) or not isinstance(delete_ids, list):
+            return Response({"detail": "upsert and delete must be lists."}, status=status.HTTP_400_BAD_REQUEST)
+
+        update_ids = [item.get('id') for item in upserts if isinstance(item, dict) and item.get('id') is not None]
+        existing = Question.objects.filter(exam=exam).in_bulk(update_ids)
+
+        # Validate everything before writing anything
+        errors = []
+        to_create = []
+        to_update = []
+        updated_fields = set()
+        for index, item in enumerate(upserts):
+            if not isinstance(item, dict):
+                errors.append({"index": index, "errors": {"detail": "Expected an object."}})
+                continue
+            question_id = item.get('id')
+            item = {key: value for key, value in item.items() if key not in ('id', 'exam')}
+            if question_id is not None and question_id not in existing:
+                errors.append({"index": index, "errors": {"id": "Question not found in this exam."}})
+                continue
+            serializer = self.get_serializer(data=item, partial=question_id is not None)
+            if not serializer.is_valid():
+                errors.append({"index": index, "errors": serializer.errors})
+                continue
+            if question_id is None:
+                to_create.append(Question(exam=exam, **serializer.validated_data))
+            else:
+                question = existing[question_id]
+                for field, value in serializer.validated_data.items():
+                    setattr(question, field, value)
+                updated_fields.update(serializer.validated_data)
+                to_update.append(question)
+        if errors:
+            return Response({"detail": "Invalid questions.", "errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # bulk_create/bulk_update skip Question.save()
+        for question in to_create + to_update:
+            question.externalize_case_data()
+        if updated_fields & {'test_cases', 'correct_output'}:
+            updated_fields.update({'test_cases', 'correct_output'})
+
+        with transaction.atomic():
+            if delete_ids:
+                Question.objects.filter(exam=exam, id__in=delete_ids).delete()
+            if to_update and updated_fields:
+                Question.objects.bulk_update(to_update, sorted(updated_fields), batch_size=500)
+            Question.objects.bulk_create(to_create, batch_size=500)
+
+        questions = Question.objects.filter(exam=exam).order_by('id')
+        return Response(self.get_serializer(questions, many=True).data, status=status.HTTP_200_OK)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -215,22 +413,60 @@ class SubmissionViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Check if the user has already submitted this exam
-            if Submission.objects.filter(exam=exam, user=request.user).exists():
+            # Promote the autosaved draft when the client does not resend answers
+            data = request.data
+            if 'answers' not in data:
+                draft = SubmissionDraft.objects.filter(exam=exam, user=request.user).first()
+                if draft is None:
+                    return Response(
+                        {"detail": "No answers provided and no saved draft found."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                data = {'exam': exam.id, 'answers': draft.answers}
+                if 'time_taken' in request.data:
+                    data['time_taken'] = request.data['time_taken']
+
+            # Create the submission
+            serializer = self.get_serializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            # Only the questions drawn for this student's attempt are graded
+            attempt = ExamAttempt.draw(exam, request.user)
+            serializer.validated_data['answers'] = attempt.restrict_answers(serializer.validated_data['answers'])
+
+            # Under write-behind ingestion, acknowledge now and grade/insert on flush.
+            # The unique index is only hit at flush time, so check the table here.
+            if is_write_behind():
+                already_submitted = Submission.objects.filter(exam=exam, user=request.user).exists()
+                fields = {name: value for name, value in serializer.validated_data.items() if name != 'exam'}
+                if already_submitted or not enqueue_submission(exam.id, request.user.id, fields):
+                    return Response(
+                        {"detail": "You have already submitted this exam."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                SubmissionDraft.objects.filter(exam=exam, user=request.user).delete()
+                live_stats.record_submitted(exam.id)
+                return Response({"exam": exam.id, "status": "queued"}, status=status.HTTP_202_ACCEPTED)
+
+            # The (user, exam) unique constraint rejects duplicates, including
+            # concurrent double submits
+            try:
+                with transaction.atomic():
+                    self.perform_create(serializer)
+            except IntegrityError:
                 return Response(
                     {"detail": "You have already submitted this exam."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            # Create the submission
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
+            SubmissionDraft.objects.filter(exam=exam, user=request.user).delete()
+            live_stats.record_submitted(exam.id)
             headers = self.get_success_headers(serializer.data)
 
             # Evaluate coding questions if the exam type is CODING
             if exam.exam_type == 'CODING':
-                self.evaluate_coding_exam(exam, serializer.instance)
+                grade_coding_submission(exam, serializer.instance)
+                index_new_submission(serializer.instance)
+            else:
+                live_stats.record_graded(exam.id, [serializer.instance.percentage])
 
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         except Exception as e:
@@ -242,51 +478,60 @@ class SubmissionViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    def evaluate_coding_exam(self, exam, submission):
-        questions = Question.objects.filter(exam=exam)
-        results = []
-        total_test_cases = 0
-        passed_test_cases = 0
+class SubmissionDraftView(APIView):
+    """
+    Autosave endpoint for an in-progress attempt.
 
-        for question in questions:
-            test_cases = question.test_cases
-            correct_outputs = question.correct_output
+    PATCH accepts {"answers": {question_id: answer}} deltas and merges them
+    into the student's single draft row for the exam.
+    """
+    permission_classes = [IsAuthenticated]
 
-            for test_case, expected_output in zip(test_cases, correct_outputs):
-                try:
-                    process = subprocess.run(
-                        ['python', '-c', submission.code],
-                        input=test_case.encode(),
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        timeout=5
-                    )
+    def get(self, request, exam_id):
+        draft = SubmissionDraft.objects.filter(exam_id=exam_id, user=request.user).first()
+        if draft is None:
+            return Response({"exam": exam_id, "answers": {}, "version": 0, "updated_at": None})
+        return Response(SubmissionDraftSerializer(draft).data)
 
-                    # Compare the output with the expected output
-                    if process.stdout.strip() == expected_output.strip():
-                        passed_test_cases += 1
-                        results.append({"test_case": test_case, "status": "Passed"})
-                    else:
-                        results.append({"test_case": test_case, "status": "Failed", "output": process.stdout, "expected": expected_output})
+    def patch(self, request, exam_id):
+        delta = request.data.get('answers')
+        if not isinstance(delta, dict) or not delta:
+            return Response(
+                {"detail": "answers must be a non-empty object of question_id: answer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(str(question_id).isdigit() for question_id in delta):
+            return Response(
+                {"detail": "Question IDs must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                except subprocess.TimeoutExpired:
-                    results.append({"test_case": test_case, "status": "Timeout"})
-                except Exception as e:
-                    results.append({"test_case": test_case, "status": "Error", "error": str(e)})
+        with transaction.atomic():
+            draft = SubmissionDraft.objects.select_for_update().filter(
+                exam_id=exam_id, user=request.user
+            ).first()
+            if draft is None:
+                # Only the first autosave of an attempt pays for these checks
+                if not Exam.objects.filter(id=exam_id).exists():
+                    return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+                if Submission.objects.filter(exam_id=exam_id, user=request.user).exists():
+                    return Response(
+                        {"detail": "You have already submitted this exam."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                draft, _ = SubmissionDraft.objects.get_or_create(exam_id=exam_id, user=request.user)
+                draft = SubmissionDraft.objects.select_for_update().get(pk=draft.pk)
 
-                total_test_cases += 1
+            # Repeated autosaves of unchanged answers do not touch the row
+            if draft.apply_delta(delta):
+                draft.save(update_fields=['answers', 'version', 'updated_at'])
 
-        # Calculate the score
-        score = (passed_test_cases / total_test_cases) * 100 if total_test_cases > 0 else 0
-        submission.score = score
-        submission.correct_answers = passed_test_cases
-        submission.percentage = score
-        submission.save()
+        return Response({"version": draft.version, "answered": len(draft.answers)})
 
 class StudentDashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         try:
             # Get user's profile
@@ -294,7 +539,7 @@ class StudentDashboardView(APIView):
             
             # Get user's submissions with exam details
             try:
-                submissions = Submission.objects.filter(user=request.user).select_related('exam')
+                submissions = Submission.objects.filter(user=request.user).select_related('exam', 'answer_layout')
                 submission_serializer = SubmissionSerializer(submissions, many=True)
                 submission_data = submission_serializer.data
             except Exception as e:
@@ -304,7 +549,7 @@ class StudentDashboardView(APIView):
             # Get available exams (exams not yet taken by the user)
             try:
                 submitted_exam_ids = Submission.objects.filter(user=request.user).values_list('exam_id', flat=True)
-                available_exams = Exam.objects.exclude(id__in=submitted_exam_ids).prefetch_related('question_set')
+                available_exams = Exam.objects.exclude(id__in=submitted_exam_ids).prefetch_related(*question_prefetch(request.user))
                 
                 # Create a context with the request for the serializer
                 context = {'request': request}
@@ -435,93 +680,474 @@ class UploadExamsCsvView(APIView):
         logger.warning("No file provided.")
         return JsonResponse({'error': 'No file provided.'}, status=400)
 
+def ndjson_events(events):
+    for event in events:
+        yield json.dumps(event) + '\n'
+    yield json.dumps({"event": "done"}) + '\n'
+
+async def andjson_events(events):
+    async for event in events:
+        yield json.dumps(event) + '\n'
+    yield json.dumps({"event": "done"}) + '\n'
+
+def execute_question_id(data):
+    """The optional question id of an execute request; ValueError if it is not an integer."""
+    question_id = data.get('question')
+    if question_id in (None, ''):
+        return None
+    if isinstance(question_id, bool) or not isinstance(question_id, (int, str)):
+        raise ValueError(question_id)
+    return int(question_id)
+
+def invalid_case_refs(test_cases, question):
+    """
+    Stored test case references are only accepted for the question they
+    belong to, so a run cannot read arbitrary blobs from the case store.
+    """
+    refs = [test_case for test_case in test_cases if case_store.is_ref(test_case)]
+    if not refs:
+        return False
+    if question is None:
+        return True
+    allowed = {test_case[case_store.REF_KEY] for test_case in question.test_cases if case_store.is_ref(test_case)}
+    return any(ref[case_store.REF_KEY] not in allowed for ref in refs)
+
+def execution_client_key(user):
+    """Who a run counts against for EXECUTION_USER_CONCURRENCY."""
+    return f'user-{user.id}'
+
+def execution_rejected(exc, response_class=Response):
+    response = response_class({"error": exc.detail}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
 class ExecuteCodeView(APIView):
     """
     API endpoint to execute code in Python, Java, or C securely using subprocess.
+
+    With "stream": true (or ?stream=1) the response is NDJSON: a compile
+    event, then one result event per test case as it finishes, then "done".
+    Runs beyond the host's execution capacity get 429 with Retry-After.
     """
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
         code = request.data.get('code')
         language = request.data.get('language')
-        test_cases = request.data.get('test_cases', [])
+        test_cases = request.data.get('test_cases')
 
         if not code or not language:
             return Response({"error": "Code and language are required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        is_windows = platform.system().lower() == "windows"
-
-        # Define file extensions and commands for each language
-        language_config = {
-            'python': {
-                'extension': 'py',
-                'command': lambda file_path: ['python', file_path]
-            },
-            'java': {
-                'extension': 'java',
-                'command': lambda file_path: [
-                    'cmd', '/c', f'javac {file_path} && java -cp {os.path.dirname(file_path)} Solution'
-                ] if is_windows else [
-                    'sh', '-c', f'javac {file_path} && java -cp {os.path.dirname(file_path)} Solution'
-                ]
-            },
-            'c': {
-                'extension': 'c',
-                'command': lambda file_path: [
-                    'cmd', '/c', f'gcc {file_path} -o {file_path[:-2]}.exe && {file_path[:-2]}.exe'
-                ] if is_windows else [
-                    'sh', '-c', f'gcc {file_path} -o {file_path[:-2]} && {file_path[:-2]}'
-                ]
-            }
-        }
-
-        if language not in language_config:
+        if language not in LANGUAGE_CONFIG:
             return Response({"error": "Unsupported language."}, status=status.HTTP_400_BAD_REQUEST)
 
-        results = []
+        # Run under the question's time and memory limits when one is given
+        try:
+            question_id = execute_question_id(request.data)
+        except ValueError:
+            return Response({"error": "Question must be an integer id."}, status=status.HTTP_400_BAD_REQUEST)
+        question = Question.objects.filter(id=question_id).only('id', 'test_cases', 'time_limit', 'memory_limit').first() if question_id else None
+        # Students are not sent test cases; without their own input they run the question's,
+        # and only staff get those inputs back in the results
+        include_inputs = test_cases is not None or request.user.is_staff
+        if test_cases is None:
+            test_cases = question.test_cases if question else []
+        if invalid_case_refs(test_cases, question):
+            return Response({"error": "Unknown test case reference."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                base_name = 'Solution' if language == 'java' else 'solution'
-                file_name = os.path.join(temp_dir, f'{base_name}.{language_config[language]["extension"]}')
+            ticket = admit(execution_client_key(request.user))
+        except ExecutionRejected as e:
+            return execution_rejected(e)
+
+        # With JUDGE_BACKEND = 'queue' a judge worker runs the code
+        queued = use_judge_queue()
+        if request.data.get('stream') or request.query_params.get('stream'):
+            events = (iter_queued_execution if queued else iter_execution)(
+                code, language, test_cases, get_limits(question), include_inputs=include_inputs
+            )
+            return StreamingHttpResponse(
+                ndjson_events(release_after(events, ticket)),
+                content_type='application/x-ndjson'
+            )
 
-                # Write the code to the file
-                with open(file_name, 'w') as code_file:
-                    code_file.write(code)
+        try:
+            with ticket:
+                results = (execute_queued if queued else execute_code)(
+                    code, language, test_cases, get_limits(question), include_inputs=include_inputs
+                )
+        except JudgeJobError as e:
+            return Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                for test_case in test_cases:
-                    try:
-                        process = subprocess.run(
-                            language_config[language]['command'](file_name),
-                            input=test_case,
-                            stdout=subprocess.PIPE,
-                            stderr=subprocess.PIPE,
-                            text=True,
-                            timeout=5,
-                            cwd=temp_dir  # isolate execution to temp dir
-                        )
+        return Response({"results": results}, status=status.HTTP_200_OK)
 
-                        results.append({
-                            "test_case": test_case,
-                            "output": process.stdout,
-                            "error": process.stderr,
-                            "return_code": process.returncode
-                        })
-                    except subprocess.TimeoutExpired:
-                        results.append({
-                            "test_case": test_case,
-                            "output": "",
-                            "error": "Execution timed out.",
-                            "return_code": -1
-                        })
-                    except Exception as e:
-                        results.append({
-                            "test_case": test_case,
-                            "output": "",
-                            "error": str(e),
-                            "return_code": -1
-                        })
+class CaseDataView(APIView):
+    """
+    Download a stored test case input or expected output by its SHA-256.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, digest):
+        ref = {case_store.REF_KEY: digest}
+        try:
+            if not case_store.exists(ref):
+                return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError:
+            return Response({"detail": "Invalid reference."}, status=status.HTTP_400_BAD_REQUEST)
+        return FileResponse(case_store.open_file(ref), content_type='text/plain; charset=utf-8')
+
+def export_response(lines, export_format, filename):
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+class SubmissionExportView(APIView):
+    """
+    Stream every submission for an exam as CSV or JSONL.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": "Unsupported export format."}, status=status.HTTP_400_BAD_REQUEST)
+        using = read_alias_for(request.user)
+        if not Exam.objects.using(using).filter(id=exam_id).exists():
+            return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+        return export_response(
+            iter_submission_export(exam_id, export_format, using), export_format, f'exam-{exam_id}-submissions'
+        )
+
+class GradebookExportView(APIView):
+    """
+    Stream the students x exams percentage matrix as CSV or JSONL.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": "Unsupported export format."}, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(
+            iter_gradebook_export(export_format, read_alias_for(request.user)), export_format, 'gradebook'
+        )
+
+class ProctoringFrameView(APIView):
+    """
+    Webcam frames from ProctoringCamera. Each frame is downscaled,
+    appended to the student's archive for the exam, and its face count
+    verdict folded into the student's ProctoringSession.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        image = request.FILES.get('image')
+        exam_id = request.data.get('exam_id')
+        if image is None or not exam_id:
+            return Response({"detail": "image and exam_id are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if image.size > getattr(settings, 'PROCTORING_MAX_UPLOAD_BYTES', 2 * 1024 * 1024):
+            return Response({"detail": "Frame is too large."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if not Exam.objects.filter(id=exam_id).exists():
+                return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError:
+            return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        frame = frame_archive.recompress(image.read())
+        if frame is None:
+            return Response({"detail": "Could not decode the image."}, status=status.HTTP_400_BAD_REQUEST)
+        timestamp = frame_archive.append_frame(exam_id, request.user.id, frame)
+        verdict = analyze_frame(frame)
+        data = {"timestamp": timestamp, "bytes": len(frame), "verdict": verdict}
+        if verdict is not None:
+            session = record_verdict(exam_id, request.user.id, timestamp, verdict)
+            data["flagged"] = session.flagged
+            if verdict in ALERTS:
+                data["alert"] = ALERTS[verdict]
+        return Response(data, status=status.HTTP_201_CREATED)
+
+class ProctoringFrameListView(APIView):
+    """
+    Timestamps and sizes of a student's archived frames for an exam;
+    ?start= and ?end= (epoch milliseconds) narrow the range.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id, user_id):
+        try:
+            start = int(request.query_params['start']) if 'start' in request.query_params else None
+            end = int(request.query_params['end']) if 'end' in request.query_params else None
+        except ValueError:
+            return Response({"detail": "start and end must be epoch milliseconds."}, status=status.HTTP_400_BAD_REQUEST)
+        frames = frame_archive.list_frames(exam_id, user_id, start, end)
+        return Response({
+            "exam": exam_id,
+            "user": user_id,
+            "frames": [{"timestamp": timestamp, "bytes": size} for timestamp, size in frames],
+        })
+
+class ProctoringFrameImageView(APIView):
+    """
+    The JPEG frame on screen at a timestamp (the last one taken at or before it).
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id, user_id, timestamp):
+        found = frame_archive.read_frame(exam_id, user_id, timestamp)
+        if found is None:
+            return Response({"detail": "No frame at or before this time."}, status=status.HTTP_404_NOT_FOUND)
+        frame_timestamp, frame = found
+        response = HttpResponse(frame, content_type='image/jpeg')
+        response['X-Frame-Timestamp'] = str(frame_timestamp)
+        return response
+
+class ProctoringSessionListView(APIView):
+    """
+    Proctoring summaries for an exam, riskiest first. Only flagged sessions
+    unless ?all=true.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id):
+        sessions = ProctoringSession.objects.filter(exam_id=exam_id).select_related('user')
+        if request.query_params.get('all', '').lower() not in ('1', 'true'):
+            sessions = sessions.filter(flagged=True)
+        serializer = ProctoringSessionSerializer(sessions.order_by('-risk_score', 'user_id'), many=True)
+        return Response(serializer.data)
+
+class ProctoringSessionDetailView(APIView):
+    """
+    One student's proctoring summary and event timeline for an exam.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id, user_id):
+        try:
+            session = ProctoringSession.objects.select_related('user').get(exam_id=exam_id, user_id=user_id)
+        except ProctoringSession.DoesNotExist:
+            return Response({"detail": "No proctoring frames for this student."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ProctoringSessionSerializer(session).data)
+
+class ExamLiveStatsView(APIView):
+    """
+    Live counters for an exam sitting: started, submitted, in progress,
+    graded and the average score so far. Read from the cache, not the
+    Submission table.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request, exam_id):
+        if not live_stats.enabled():
+            return Response({"detail": "Live stats are disabled."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not Exam.objects.filter(id=exam_id).exists():
+            return Response({"detail": "Exam not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(live_stats.snapshot(exam_id))
+
+class ExecutionAdmissionStatsView(APIView):
+    """
+    Host-wide execution slot and queue usage, with this worker's admission
+    counters and slot wait times.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(admission.snapshot())
 
+class ExecutionCacheStatsView(APIView):
+    """
+    Hit/miss counters for this worker's execution result cache.
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    def get(self, request):
+        return Response(execution_cache.stats())
+
+
+class AsyncStudentDashboardView(AsyncAPIView):
+    """
+    Async version of StudentDashboardView for ASGI deployments.
+    """
+    @replica_reads
+    async def get(self, request):
+        try:
+            user_data = UserSerializer(request.user).data
+
+            submissions = [
+                submission async for submission in
+                Submission.objects.filter(user=request.user).select_related('exam', 'answer_layout')
+            ]
+            submission_data = SubmissionSerializer(submissions, many=True).data
+
+            # The submissions above already tell us which exams to hide
+            submitted_exam_ids = {submission.exam_id for submission in submissions}
+            available_exams = [
+                exam async for exam in
+                Exam.objects.exclude(id__in=submitted_exam_ids).prefetch_related(*question_prefetch(request.user))
+            ]
+            context = {'request': request, 'submitted_exam_ids': submitted_exam_ids}
+            exam_data = ExamSerializer(available_exams, many=True, context=context).data
+
+            return json_response({
+                'profile': user_data,
+                'exam_history': submission_data,
+                'available_exams': exam_data
+            })
         except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            logger.exception("Error in AsyncStudentDashboardView")
+            return json_response(
+                {
+                    "detail": "An error occurred while fetching dashboard data",
+                    "error": str(e)
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
 
-        return Response({"results": results}, status=status.HTTP_200_OK)
+class AsyncExamDetailView(AsyncAPIView):
+    """
+    Async exam retrieve; writes fall through to ExamViewSet.
+    """
+    sync_view = staticmethod(ExamViewSet.as_view({'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}))
+
+    async def get(self, request, pk):
+        user = request.user
+        try:
+            if user.is_staff:
+                exam = await Exam.objects.prefetch_related('question_set').aget(pk=pk)
+                has_submitted = await Submission.objects.filter(exam=exam, user=user).aexists()
+                submitted_exam_ids = {exam.id} if has_submitted else set()
+            else:
+                submitted = Submission.objects.filter(user=user).values_list('exam_id', flat=True)
+                try:
+                    exam = await Exam.objects.exclude(id__in=submitted).aget(pk=pk)
+                except Exam.DoesNotExist:
+                    if await Submission.objects.filter(exam_id=pk, user=user).aexists():
+                        return json_response({"detail": "You have already submitted this exam."}, status=400)
+                    raise
+                if is_write_behind() and is_queued(exam.id, user.id):
+                    return json_response({"detail": "You have already submitted this exam."}, status=400)
+                submitted_exam_ids = set()
+                attempt = await sync_to_async(ExamAttempt.draw)(exam, user)
+                attempt_questions = await sync_to_async(attempt.questions)(student_questions())
+        except Exam.DoesNotExist:
+            return json_response({"detail": "No Exam matches the given query."}, status=400)
+
+        context = {'request': request, 'submitted_exam_ids': submitted_exam_ids}
+        if not user.is_staff:
+            context['attempt_questions'] = attempt_questions
+        return json_response(ExamSerializer(exam, context=context).data)
+
+    async def put(self, request, pk):
+        return await self.delegate(self.sync_view, request, pk=pk)
+
+    async def patch(self, request, pk):
+        return await self.delegate(self.sync_view, request, pk=pk)
+
+    async def delete(self, request, pk):
+        return await self.delegate(self.sync_view, request, pk=pk)
+
+class AsyncSubmissionListView(AsyncAPIView):
+    """
+    Async submission list; creating a submission falls through to SubmissionViewSet.
+    """
+    sync_view = staticmethod(SubmissionViewSet.as_view({'post': 'create'}))
+
+    async def get(self, request):
+        submissions = [
+            submission async for submission in
+            Submission.objects.filter(user=request.user).select_related('exam', 'answer_layout')
+        ]
+        return json_response(SubmissionSerializer(submissions, many=True).data)
+
+    async def post(self, request):
+        return await self.delegate(self.sync_view, request)
+
+class AsyncExecuteCodeView(AsyncAPIView):
+    """
+    Async version of ExecuteCodeView. Test cases run as asyncio subprocesses,
+    so one worker can supervise many executions; a disconnecting client
+    cancels the request and kills its running process.
+    """
+    async def post(self, request):
+        # AsyncAPIView only authenticates GETs; running code needs a user, as in ExecuteCodeView
+        try:
+            user = await aauthenticate(request)
+        except (InvalidToken, TokenError):
+            user = None
+        if user is None:
+            return json_response({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return json_response({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+
+        code = data.get('code')
+        language = data.get('language')
+        test_cases = data.get('test_cases')
+
+        if not code or not language:
+            return json_response({"error": "Code and language are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if language not in LANGUAGE_CONFIG:
+            return json_response({"error": "Unsupported language."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Run under the question's time and memory limits when one is given
+        try:
+            question_id = execute_question_id(data)
+        except ValueError:
+            return json_response({"error": "Question must be an integer id."}, status=status.HTTP_400_BAD_REQUEST)
+        question = await Question.objects.filter(id=question_id).only('id', 'test_cases', 'time_limit', 'memory_limit').afirst() if question_id else None
+        # Only staff get the inputs of the question's own test cases back
+        include_inputs = test_cases is not None or user.is_staff
+        if test_cases is None:
+            test_cases = question.test_cases if question else []
+        if invalid_case_refs(test_cases, question):
+            return json_response({"error": "Unknown test case reference."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            ticket = admit(execution_client_key(user))
+        except ExecutionRejected as e:
+            return execution_rejected(e, json_response)
+
+        queued = use_judge_queue()
+        if data.get('stream') or request.GET.get('stream'):
+            events = (aiter_queued_execution if queued else iter_execution_async)(
+                code, language, test_cases, get_limits(question), include_inputs=include_inputs
+            )
+            return StreamingHttpResponse(
+                andjson_events(arelease_after(events, ticket)),
+                content_type='application/x-ndjson'
+            )
 
+        try:
+            with ticket:
+                results = await (execute_queued_async if queued else execute_code_async)(
+                    code, language, test_cases, get_limits(question), include_inputs=include_inputs
+                )
+        except JudgeJobError as e:
+            return json_response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return json_response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return json_response({"results": results}, status=status.HTTP_200_OK)
+
+
+class AsyncExamLiveStatsStreamView(AsyncAPIView):
+    """
+    ExamLiveStatsView as server-sent events: the counters now and again
+    whenever they change. Each open stream only polls the cache. Routed
+    only with ASYNC_READ_VIEWS (ASGI).
+    """
+    async def get(self, request, exam_id):
+        if not request.user.is_staff:
+            return json_response({"detail": "You do not have permission to perform this action."}, status=403)
+        if not live_stats.enabled():
+            return json_response({"detail": "Live stats are disabled."}, status=503)
+        if not await Exam.objects.filter(id=exam_id).aexists():
+            return json_response({"detail": "Exam not found."}, status=404)
+        response = StreamingHttpResponse(live_stats.astream(exam_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import StudentViewSet, StudentAnalyticsView,UploadStudentsCsvView
+from django.conf import settings
+from .views import StudentViewSet, StudentAnalyticsView, AsyncStudentAnalyticsView, UploadStudentsCsvView
 from . import views
 
 router = DefaultRouter()
@@ -8,6 +9,10 @@ router.register(r'students', StudentViewSet, basename='student')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('<int:student_id>/analytics/', StudentAnalyticsView.as_view(), name='student-analytics'),
+    path(
+        '<int:student_id>/analytics/',
+        (AsyncStudentAnalyticsView if settings.ASYNC_READ_VIEWS else StudentAnalyticsView).as_view(),
+        name='student-analytics'
+    ),
     path('upload-students-csv/', UploadStudentsCsvView.as_view(), name='upload_students_csv'),
 ]
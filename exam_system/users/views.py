@@ -6,7 +6,9 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
 from .serializers import UserSerializer
 from exams.models import Submission
-from django.db.models import Avg, Max, Min
+from exams.authentication import AsyncAPIView, json_response
+from exams.db_router import replica_reads
+from django.db.models import Avg, Count, Max, Min
 import csv
 from django.http import JsonResponse
 from django.contrib.auth.models import User
@@ -68,6 +70,7 @@ class StudentViewSet(viewsets.ReadOnlyModelViewSet):
 class StudentAnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request, student_id):
         try:
             student = User.objects.get(id=student_id)
@@ -91,6 +94,34 @@ class StudentAnalyticsView(APIView):
         except User.DoesNotExist:
             return Response({'error': 'Student not found'}, status=404)
 
+class AsyncStudentAnalyticsView(AsyncAPIView):
+    """
+    Async version of StudentAnalyticsView; all stats come from one aggregate query.
+    """
+    @replica_reads
+    async def get(self, request, student_id):
+        try:
+            student = await User.objects.aget(id=student_id)
+        except User.DoesNotExist:
+            return json_response({'error': 'Student not found'}, status=404)
+
+        stats = await Submission.objects.filter(user=student).aaggregate(
+            total_exams=Count('id'),
+            average_score=Avg('score'),
+            highest_score=Max('score'),
+            lowest_score=Min('score'),
+        )
+
+        data = {
+            'name': f"{student.first_name} {student.last_name}",
+            'email': student.email,
+            'totalExams': stats['total_exams'],
+            'averageScore': round(stats['average_score'] or 0, 2),
+            'highestScore': stats['highest_score'] or 0,
+            'lowestScore': stats['lowest_score'] or 0,
+        }
+        return json_response(data, status=200)
+
 class UploadStudentsCsvView(APIView):
     def post(self, request):
         if request.FILES.get('file'):